@@ -7,9 +7,31 @@ import streamlit as st
 import pandas as pd
 import time
 import re
-from db import DatabaseManager, Formazione, Voto
-from calc import calcola_risultato_partita, calcola_bonus_malus_da_eventi
-from excel_import import importa_voti_excel, applica_voti_excel_a_formazione, esporta_template_excel
+from db import CAMPI_EVENTI, DatabaseManager, Formazione, Voto, voto_inserito
+from calc import GiocatorePunteggio, calcola_bonus_malus_da_eventi
+from calc_batch import calcola_risultati_partite
+from calc_incrementale import RegistroLive
+from classifica import partita_conteggiabile, registra_risultato, ricostruisci_classifica, tabella_classifica
+from simulazione import prepara_modello_stagione, simula_stagione, tabella_probabilita
+from formazione_ottima import calcola_formazione_ottima, medie_storico
+from indice_nomi import IndiceNomi
+from import_stagione import applica_voti_giornata, importa_stagione
+from esporta_stagione import esporta_stagione
+from excel_import import (
+    ESTENSIONI_TESTO,
+    ESTENSIONI_VOTI,
+    applica_voti_excel_a_formazione,
+    elenca_fogli,
+    esporta_template_excel,
+    importa_voti_excel,
+    importa_voti_testo
+)
+from regolamento import (
+    REGOLAMENTO_STANDARD,
+    leggi_regolamento_testo,
+    regolamento_a_dict,
+    risolvi_regolamento
+)
 import os
 
 # Configurazione pagina
@@ -26,6 +48,13 @@ def get_db():
 
 db = get_db()
 
+# Partite seguite in diretta: ogni voto salvato aggiorna il risultato in O(1)
+@st.cache_resource
+def get_registro_live():
+    return RegistroLive()
+
+registro_live = get_registro_live()
+
 # Inizializza session state
 if 'page' not in st.session_state:
     st.session_state.page = 'home'
@@ -36,6 +65,95 @@ if 'selected_partita' not in st.session_state:
 
 # ===== FUNZIONI DI UTILITÀ =====
 
+def get_regolamento_attivo():
+    """Restituisce il regolamento attivo compilato (standard se nessuno è salvato)"""
+    return risolvi_regolamento(db.get_regolamento())
+
+
+def aggiorna_voto_live(formazione_id, voto_base, bonus_malus):
+    """Propaga un voto salvato al risultato in diretta e, se la partita è già in classifica, alla classifica"""
+    aggiorna_voti_live([
+        {'formazione_id': formazione_id, 'voto_base': voto_base, 'bonus_malus_totale': bonus_malus}
+    ])
+
+
+def aggiorna_voti_live(aggiornamenti, commit=True):
+    """
+    Propaga più voti al registro in diretta, poi registra in classifica una
+    sola volta ciascuna partita coinvolta che vi è già conteggiata, con un
+    unico commit.
+    """
+    partite_ids = set()
+    for aggiornamento in aggiornamenti:
+        aggiornato = registro_live.aggiorna_voto(
+            aggiornamento['formazione_id'],
+            aggiornamento['voto_base'],
+            aggiornamento['bonus_malus_totale']
+        )
+        if aggiornato is not None:
+            partite_ids.add(aggiornato[0])
+    
+    for partita_id in sorted(partite_ids):
+        partita = db.get_partita(partita_id)
+        if partita is not None and partita.risultato is not None:
+            registra_risultato(db, partita_id, registro_live.partite[partita_id].risultato(), commit=False)
+    
+    if commit:
+        db.session.commit()
+
+
+def salva_voti(aggiornamenti):
+    """Scrive i voti in blocco e ne propaga l'effetto a diretta e classifica in un'unica transazione"""
+    db.aggiorna_voti_batch(aggiornamenti, preserva_manuali=False, commit=False)
+    aggiorna_voti_live(aggiornamenti)
+
+
+def applica_voti_ufficiali_partita(partita_id):
+    """
+    Applica a una formazione appena salvata i voti ufficiali già importati per
+    la sua giornata. Sono scritti solo i nomi identici: gli abbinamenti per
+    somiglianza restano da confermare (render_voti_da_confermare).
+    """
+    esito = db.applica_voti_ufficiali(
+        partita_id=partita_id,
+        regolamento=get_regolamento_attivo(),
+        solo_esatti=True
+    )
+    if esito['esatti']:
+        st.info(f"📊 Voti ufficiali applicati a {esito['esatti']} giocatori")
+    st.session_state[f"voti_da_confermare_{partita_id}"] = esito['da_confermare']
+
+
+def render_voti_da_confermare(partita_id):
+    """Abbinamenti ai voti ufficiali trovati per somiglianza, applicati solo dopo conferma"""
+    chiave = f"voti_da_confermare_{partita_id}"
+    da_confermare = st.session_state.get(chiave)
+    if not da_confermare:
+        return
+    
+    st.warning("🔎 **Voti ufficiali da confermare** (per ora 6 SV): i nomi non coincidono con il file")
+    scelti = [
+        (c['formazione_id'], c['voto_ufficiale_id'])
+        for c in da_confermare
+        if st.checkbox(
+            f"{c['giocatore']} → {c['nome_trovato']} (affidabilità {c['punteggio']:.0%})",
+            key=f"conferma_voto_{partita_id}_{c['formazione_id']}"
+        )
+    ]
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("✅ Applica i voti selezionati", key=f"conferma_voti_{partita_id}", disabled=not scelti):
+            scritti = db.conferma_voti_ufficiali(scelti, regolamento=get_regolamento_attivo())
+            st.session_state[chiave] = None
+            st.success(f"✅ Voti ufficiali applicati a {scritti} giocatori")
+            st.rerun()
+    with col2:
+        if st.button("❌ Lascia 6 SV", key=f"ignora_voti_{partita_id}"):
+            st.session_state[chiave] = None
+            st.rerun()
+
+
 def render_menu():
     """Renderizza il menu principale"""
     st.sidebar.title("⚽ Fantacalcio Manager")
@@ -48,6 +166,9 @@ def render_menu():
         'voti': '📝 Inserimento Voti',
         'excel': '📊 Import da Excel',
         'calcolo': '🧮 Calcolo Risultati',
+        'classifica': '🏆 Classifica',
+        'simulazione': '🎲 Simulazione Stagione',
+        'regolamento': '⚙️ Regolamento',
         'backup': '💾 Backup/Restore'
     }
     
@@ -352,6 +473,8 @@ def render_formazioni():
     
     st.divider()
     
+    render_voti_da_confermare(partita.id)
+    
     # Tab per le due squadre
     tab_casa, tab_trasferta = st.tabs([f"🏠 {partita.squadra_casa}", f"✈️ {partita.squadra_trasferta}"])
     
@@ -393,7 +516,7 @@ def render_formazione_squadra(partita, tipo_squadra, nome_squadra):
     # Metodo di inserimento
     metodo = st.radio(
         "Metodo di inserimento",
-        ["📝 Inserimento Manuale", "📋 Copia/Incolla"],
+        ["📝 Inserimento Manuale", "📋 Copia/Incolla", "🧠 Formazione Ottima"],
         key=f"metodo_{tipo_squadra}",
         horizontal=True
     )
@@ -459,19 +582,15 @@ def render_formazione_squadra(partita, tipo_squadra, nome_squadra):
             
             with col1:
                 if st.button("✅ Conferma e Salva", type="primary", key=f"confirm_{tipo_squadra}", use_container_width=True):
-                    # Cancella formazione esistente
-                    db.clear_formazione(partita.id, tipo_squadra)
-                    
-                    # Inserisci nuova formazione
-                    for i, g in enumerate(st.session_state[preview_key], 1):
-                        db.add_formazione(
-                            partita.id,
-                            tipo_squadra,
-                            g['nome'],
-                            g['ruolo'],
-                            i
-                        )
+                    # Sostituisce la formazione esistente in un'unica transazione
+                    db.add_formazione_bulk(
+                        partita.id,
+                        tipo_squadra,
+                        st.session_state[preview_key],
+                        sostituisci=True
+                    )
                     
+                    applica_voti_ufficiali_partita(partita.id)
                     st.success(f"✅ Formazione {nome_squadra} salvata!")
                     # Pulisci session state
                     st.session_state[preview_key] = None
@@ -483,6 +602,9 @@ def render_formazione_squadra(partita, tipo_squadra, nome_squadra):
                     st.session_state[preview_key] = None
                     st.rerun()
     
+    elif metodo == "🧠 Formazione Ottima":
+        render_formazione_ottima(partita, tipo_squadra, nome_squadra)
+    
     else:  # Inserimento manuale
         st.write("**Inserisci formazione manualmente (11 titolari):**")
         
@@ -524,24 +646,129 @@ def render_formazione_squadra(partita, tipo_squadra, nome_squadra):
                 if len(nomi_validi) != 11:
                     st.error("❌ Inserisci tutti gli 11 giocatori")
                 else:
-                    # Cancella formazione esistente
-                    db.clear_formazione(partita.id, tipo_squadra)
-                    
-                    # Inserisci nuova formazione
-                    for g in giocatori:
-                        db.add_formazione(
-                            partita.id,
-                            tipo_squadra,
-                            g['nome'].strip(),
-                            g['ruolo'],
-                            g['posizione']
-                        )
+                    # Sostituisce la formazione esistente in un'unica transazione
+                    db.add_formazione_bulk(partita.id, tipo_squadra, giocatori, sostituisci=True)
                     
+                    applica_voti_ufficiali_partita(partita.id)
                     st.success(f"✅ Formazione {nome_squadra} salvata!")
                     time.sleep(1)
                     st.rerun()
 
 
+def render_formazione_ottima(partita, tipo_squadra, nome_squadra):
+    """Suggerisce modulo e titolari migliori a partire dalla rosa incollata"""
+    st.write("**Incolla la rosa completa** (un giocatore per riga, es. `D Bastoni`):")
+    st.caption(
+        "Voto e bonus/malus attesi sono le medie dei voti già inseriti "
+        "(6.0 e 0 per chi non ha storico). Se l'avversario ha già la formazione, "
+        "viene considerato anche il modificatore centrocampo. I gol attesi "
+        "comprendono il vantaggio casa."
+    )
+    
+    testo_rosa = st.text_area(
+        "Rosa",
+        height=300,
+        placeholder="P Sommer\nD Bastoni\n...",
+        key=f"rosa_{tipo_squadra}"
+    )
+    
+    ottima_key = f"ottima_{tipo_squadra}_{partita.id}"
+    if ottima_key not in st.session_state:
+        st.session_state[ottima_key] = None
+    
+    if st.button("🧠 Calcola Formazione Ottima", type="primary", key=f"ottimizza_{tipo_squadra}"):
+        giocatori_parsed = parse_formazione_da_testo(testo_rosa)
+        
+        if not giocatori_parsed:
+            st.error("❌ Formato non riconosciuto. Usa una riga per giocatore con il ruolo davanti.")
+        else:
+            medie = medie_storico(db)
+            
+            def con_valori_attesi(giocatori):
+                valori = []
+                for g in giocatori:
+                    voto, bonus = medie.get(g['nome'].strip().lower(), (6.0, 0.0))
+                    valori.append({'nome': g['nome'], 'ruolo': g['ruolo'], 'voto_base': voto, 'bonus_malus': bonus})
+                return valori
+            
+            lato_avversario = 'trasferta' if tipo_squadra == 'casa' else 'casa'
+            formazione_avversaria = db.get_formazione_partita(partita.id, lato_avversario)
+            avversario = None
+            if len(formazione_avversaria) == 11:
+                avversario = con_valori_attesi(
+                    [{'nome': f.giocatore, 'ruolo': f.ruolo} for f in formazione_avversaria]
+                )
+            
+            try:
+                st.session_state[ottima_key] = calcola_formazione_ottima(
+                    con_valori_attesi(giocatori_parsed),
+                    avversario,
+                    regolamento=get_regolamento_attivo(),
+                    casa=tipo_squadra == 'casa'
+                )
+            except ValueError as e:
+                st.error(f"❌ {str(e)}")
+                st.session_state[ottima_key] = None
+    
+    risultato = st.session_state[ottima_key]
+    if risultato is None:
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Modulo", risultato['modulo'])
+    with col2:
+        gol = risultato['gol_attesi']
+        if risultato['gol_subiti_attesi'] is not None:
+            gol = f"{gol} - {risultato['gol_subiti_attesi']}"
+        st.metric("Gol attesi", gol)
+    with col3:
+        st.metric("Punteggio atteso", f"{risultato['punteggio']:.2f}")
+    with col4:
+        st.metric("Margine atteso", f"{risultato['margine']:.2f}")
+    
+    df_ottima = pd.DataFrame([
+        {
+            'Ruolo': g['ruolo'],
+            'Giocatore': g['nome'],
+            'Voto atteso': round(g['voto_base'], 2),
+            'Bonus/Malus atteso': round(g['bonus_malus'], 2)
+        }
+        for g in risultato['titolari']
+    ])
+    st.dataframe(df_ottima, use_container_width=True, hide_index=True)
+    
+    with st.expander("📊 Gol e margine per modulo"):
+        st.dataframe(
+            pd.DataFrame(
+                sorted(
+                    (
+                        (modulo, risultato['gol_moduli'][modulo], margine)
+                        for modulo, margine in risultato['margini_moduli'].items()
+                    ),
+                    key=lambda m: (-m[1], -m[2])
+                ),
+                columns=['Modulo', 'Gol (diff. reti)', 'Margine']
+            ),
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    if st.button("✅ Salva Formazione", type="primary", key=f"salva_ottima_{tipo_squadra}"):
+        db.add_formazione_bulk(
+            partita.id,
+            tipo_squadra,
+            [{'nome': g['nome'], 'ruolo': g['ruolo']} for g in risultato['titolari']],
+            sostituisci=True
+        )
+        
+        applica_voti_ufficiali_partita(partita.id)
+        st.success(f"✅ Formazione {nome_squadra} salvata!")
+        st.session_state[ottima_key] = None
+        time.sleep(1)
+        st.rerun()
+
+
 def parse_formazione_da_testo(testo):
     """
     Parsa una formazione da testo incollato.
@@ -738,19 +965,36 @@ def render_voti_squadra(partita, tipo_squadra, nome_squadra):
                     note=note,
                     is_manual=True
                 )
+                aggiorna_voto_live(giocatore.id, voto_base, bonus_malus)
                 st.success(f"✅ Voto salvato per {giocatore.giocatore}")
                 st.rerun()
             
             # Mostra voto totale
             voto_totale = voto_base + bonus_malus
             st.metric("Voto totale", f"{voto_totale:.1f}")
+    
+    # Salvataggio di tutta la squadra in un'unica transazione
+    if st.button(f"💾 Salva tutti i voti {nome_squadra}", type="primary", key=f"save_voti_{tipo_squadra}"):
+        aggiornamenti = [
+            {
+                'formazione_id': giocatore.id,
+                'voto_base': st.session_state[f"voto_base_{giocatore.id}"],
+                'bonus_malus_totale': st.session_state[f"bonus_malus_{giocatore.id}"],
+                'note': st.session_state[f"note_{giocatore.id}"],
+                'is_manual_override': True
+            }
+            for giocatore in formazione
+        ]
+        salva_voti(aggiornamenti)
+        st.success(f"✅ Voti di {nome_squadra} salvati")
+        st.rerun()
 
 
 def render_excel():
     """Pagina import da Excel"""
     st.title("📊 Import Voti da Excel")
     
-    st.write("Carica un file Excel con i voti ufficiali per importarli automaticamente.")
+    st.write("Carica un file Excel o CSV con i voti ufficiali (oppure incolla la tabella) per importarli automaticamente.")
     
     # Mostra formato richiesto
     with st.expander("ℹ️ Formato file Excel richiesto"):
@@ -781,20 +1025,83 @@ Ass: Assist
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
     
+    with st.expander("📦 Import di più giornate (archivio zip)"):
+        st.write(
+            "Carica un archivio zip con un file Excel per giornata: il numero di "
+            "giornata viene letto dal nome del file (es. *Voti_Giornata_05.xlsx*). "
+            "I voti di tutte le formazioni vengono scritti insieme e la classifica ricalcolata."
+        )
+        archivio = st.file_uploader("Carica archivio zip", type=['zip'], key="excel_zip")
+        
+        if archivio and st.button("📥 Importa tutte le giornate", type="primary"):
+            temp_path = f"/tmp/{archivio.name}"
+            with open(temp_path, 'wb') as f:
+                f.write(archivio.getbuffer())
+            
+            with st.spinner("Import in corso..."):
+                try:
+                    esito = importa_stagione(db, temp_path, regolamento=get_regolamento_attivo())
+                except ValueError as e:
+                    esito = None
+                    st.error(f"❌ {e}")
+            
+            if esito is not None:
+                st.success(f"✅ {esito['voti_scritti']} voti scritti in {len(esito['giornate'])} giornate")
+                if esito['giornate']:
+                    st.dataframe(
+                        pd.DataFrame([
+                            {
+                                'Giornata': numero,
+                                'File': giornata['file'],
+                                'Voti': giornata['aggiornati'],
+                                'Non trovati': ', '.join(giornata['non_trovati']),
+                                'Da confermare': ', '.join(giornata['ambigui'])
+                            }
+                            for numero, giornata in esito['giornate'].items()
+                        ]),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                for errore in esito['errori']:
+                    st.warning(f"⚠️ {errore}")
+    
     st.divider()
     
     # Upload file
-    uploaded_file = st.file_uploader("Carica file Excel", type=['xlsx', 'xls'])
+    uploaded_file = st.file_uploader("Carica file Excel o CSV", type=[e.lstrip('.') for e in ESTENSIONI_VOTI])
     
+    with st.expander("📋 Oppure incolla la tabella dei voti"):
+        testo_voti = st.text_area(
+            "Tabella dei voti con la riga di intestazione (copiata da una pagina web o da un foglio di calcolo)",
+            height=200,
+            key="excel_testo"
+        )
+    
+    result = None
     if uploaded_file:
         # Salva il file temporaneamente
         temp_path = f"/tmp/{uploaded_file.name}"
         with open(temp_path, 'wb') as f:
             f.write(uploaded_file.getbuffer())
         
-        # Importa i voti
-        result = importa_voti_excel(temp_path)
+        # Cartelle di lavoro con più fogli (varianti per lega, voti "Statistico"...)
+        fogli = None
+        if not uploaded_file.name.lower().endswith(ESTENSIONI_TESTO):
+            fogli_file = elenca_fogli(temp_path)
+            if len(fogli_file) > 1:
+                fogli = st.multiselect(
+                    "Fogli da importare",
+                    options=fogli_file,
+                    default=fogli_file[:1],
+                    key="excel_fogli"
+                ) or fogli_file[:1]
         
+        # Importa i voti (lo stesso file non viene riletto a ogni rerun)
+        result = importa_voti_excel(temp_path, regolamento=get_regolamento_attivo(), usa_cache=True, fogli=fogli)
+    elif testo_voti.strip():
+        result = importa_voti_testo(testo_voti, regolamento=get_regolamento_attivo())
+    
+    if result:
         if result['success']:
             st.success(f"✅ {result['message']}")
             
@@ -817,8 +1124,47 @@ Ass: Assist
             
             # Seleziona colonne da mostrare
             cols_to_show = ['nome', 'ruolo', 'voto_base', 'bonus_malus_calcolato', 'voto_totale', 'nota']
+            if 'foglio' in df.columns:
+                cols_to_show.append('foglio')
             st.dataframe(df[cols_to_show], use_container_width=True, hide_index=True)
             
+            # Con più fogli i voti da applicare sono quelli di un foglio solo
+            if 'foglio' in df.columns and df['foglio'].nunique() > 1:
+                foglio = st.selectbox(
+                    "Foglio da applicare",
+                    options=list(df['foglio'].cat.categories),
+                    key="excel_foglio_applica"
+                )
+                df = df[df['foglio'] == foglio].reset_index(drop=True)
+            
+            st.divider()
+            
+            # Salva come voti ufficiali: le formazioni (anche future) li ricevono senza il file
+            st.subheader("💾 Salva come voti ufficiali")
+            numero_giornata = st.number_input("Numero giornata", min_value=1, step=1, key="excel_voti_ufficiali")
+            
+            if st.button("💾 Salva voti ufficiali e applica alle formazioni"):
+                salvati = db.salva_voti_ufficiali(int(numero_giornata), df)
+                esito = db.applica_voti_ufficiali(int(numero_giornata), regolamento=get_regolamento_attivo())
+                st.success(
+                    f"✅ {salvati['salvati']} voti ufficiali salvati per la giornata {int(numero_giornata)}, "
+                    f"applicati a {esito['esatti'] + len(esito['approssimati'])} giocatori"
+                )
+                if salvati['duplicati']:
+                    st.warning(f"⚠️ Nomi ripetuti nel file, non salvati: {', '.join(salvati['duplicati'])}")
+                if esito['approssimati']:
+                    st.info("🔎 Abbinati per somiglianza: " + ", ".join(
+                        f"{giocatore} → {trovato}" for giocatore, trovato in esito['approssimati']
+                    ))
+                if esito['da_confermare']:
+                    st.warning("⚠️ Da confermare (6 SV): " + ", ".join(
+                        f"{c['giocatore']} → {c['nome_trovato']}?" for c in esito['da_confermare']
+                    ))
+                confermare = {c['giocatore'] for c in esito['da_confermare']}
+                non_trovati = [n for n in esito['non_trovati'] if n not in confermare]
+                if non_trovati:
+                    st.warning(f"⚠️ Non trovati (6 SV): {', '.join(non_trovati)}")
+            
             st.divider()
             
             # Applica a una partita
@@ -835,6 +1181,49 @@ Ass: Assist
                     key="excel_giornata"
                 )
                 
+                solo_modifiche = st.checkbox(
+                    "Solo voti modificati (file corretto)",
+                    help="Confronta il file con i voti salvati e aggiorna solo quelli cambiati",
+                    key="excel_solo_modifiche"
+                )
+                
+                if st.button("✅ Applica a tutta la giornata", type="primary"):
+                    numero = db.get_giornata(selected_giornata_id).numero
+                    with st.spinner("Applicazione voti in corso..."):
+                        esito = applica_voti_giornata(
+                            db, numero, df, regolamento=get_regolamento_attivo(), solo_modifiche=solo_modifiche
+                        )
+                    if solo_modifiche:
+                        st.success(
+                            f"✅ {esito['voti_scritti']} voti modificati"
+                            + (f", {esito['ricalcolate']} risultati in classifica ricalcolati" if esito['ricalcolate'] else "")
+                        )
+                        if esito['modifiche']:
+                            st.dataframe(
+                                pd.DataFrame([
+                                    {
+                                        'Giocatore': modifica['giocatore'],
+                                        'Modifiche': ', '.join(
+                                            f"{campo}: {vecchio} → {nuovo}"
+                                            for campo, (vecchio, nuovo) in modifica['campi'].items()
+                                        )
+                                    }
+                                    for modifica in esito['modifiche']
+                                ]),
+                                use_container_width=True,
+                                hide_index=True
+                            )
+                    else:
+                        st.success(
+                            f"✅ Voti applicati a {esito['aggiornati']} giocatori in {esito['partite']} partite"
+                            + (f" ({esito['ricalcolate']} risultati in classifica ricalcolati)" if esito['ricalcolate'] else "")
+                        )
+                    if esito['ambigui']:
+                        st.warning(f"⚠️ Nomi ambigui o da confermare (6 SV): {', '.join(esito['ambigui'])}")
+                    non_trovati = [n for n in esito['non_trovati'] if n not in esito['ambigui']]
+                    if non_trovati:
+                        st.warning(f"⚠️ Non trovati (6 SV): {', '.join(non_trovati)}")
+                
                 partite = db.get_partite_giornata(selected_giornata_id)
                 
                 if partite:
@@ -868,70 +1257,64 @@ def applica_voti_da_excel(partita_id, tipo_squadra, df_excel):
         st.error("❌ Nessuna formazione trovata. Inserisci prima la formazione.")
         return
     
-    # Crea dizionario nome -> dati
-    voti_dict = {}
-    for _, row in df_excel.iterrows():
-        # Salta righe con nome vuoto o NaN
-        if pd.isna(row.get('nome')) or not str(row.get('nome')).strip():
-            continue
-        
-        nome = str(row['nome']).strip().lower()
-        voti_dict[nome] = row
+    # Indice dei nomi dell'Excel (le righe con nome vuoto o NaN vengono ignorate)
+    indice = IndiceNomi(
+        df_excel['nome'],
+        df_excel['ruolo'] if 'ruolo' in df_excel.columns else None
+    )
     
-    # Applica voti
+    # Applica voti: raccolti per tutta la formazione e scritti in un'unica transazione
+    regolamento = get_regolamento_attivo()
     trovati = 0
     non_trovati = []
+    approssimati = []
+    da_confermare = []
+    aggiornamenti = []
     
     for giocatore in formazione:
-        nome_giocatore = giocatore.giocatore.strip().lower()
+        corrispondenza = indice.cerca(giocatore.giocatore, giocatore.ruolo)
+        # Solo le corrispondenze sicure vengono applicate: le altre restano 6 SV
+        if corrispondenza is not None and not corrispondenza.automatica:
+            da_confermare.append(corrispondenza)
+            corrispondenza = None
         
-        if nome_giocatore in voti_dict:
-            row = voti_dict[nome_giocatore]
+        if corrispondenza is not None:
+            row = df_excel.iloc[corrispondenza.indice]
+            if corrispondenza.metodo != 'esatto':
+                approssimati.append(corrispondenza)
+            
+            eventi = {
+                campo: int(row.get(colonna, 0))
+                for colonna, campo in CAMPI_EVENTI.items()
+            }
             
             # Calcola bonus/malus
             bonus_malus = calcola_bonus_malus_da_eventi(
-                gol_fatti=int(row.get('gf', 0)),
-                gol_subiti=int(row.get('gs', 0)),
-                rigori_parati=int(row.get('rp', 0)),
-                rigori_fatti=int(row.get('rf', 0)),
-                rigori_sbagliati=int(row.get('rs', 0)),
-                autogol=int(row.get('au', 0)),
-                ammonizioni=int(row.get('amm', 0)),
-                espulsioni=int(row.get('esp', 0)),
-                assist=int(row.get('ass', 0)),
-                ruolo=giocatore.ruolo
-            )
-            
-            # Aggiorna voto
-            db.update_voto(
-                giocatore.id,
-                voto_base=float(row['voto_base']),
-                bonus_malus=bonus_malus,
-                gol_fatti=int(row.get('gf', 0)),
-                gol_subiti=int(row.get('gs', 0)),
-                rigori_parati=int(row.get('rp', 0)),
-                rigori_fatti=int(row.get('rf', 0)),
-                rigori_sbagliati=int(row.get('rs', 0)),
-                autogol=int(row.get('au', 0)),
-                ammonizioni=int(row.get('amm', 0)),
-                espulsioni=int(row.get('esp', 0)),
-                assist=int(row.get('ass', 0)),
-                note=row.get('nota', ''),
-                is_manual=False
+                **eventi,
+                ruolo=giocatore.ruolo,
+                regolamento=regolamento
             )
             
+            aggiornamenti.append({
+                'formazione_id': giocatore.id,
+                'voto_base': float(row['voto_base']),
+                'bonus_malus_totale': bonus_malus,
+                **eventi,
+                'note': row.get('nota', '')
+            })
             trovati += 1
         else:
             # Fallback: voto 6, bonus 0, nota SV
-            db.update_voto(
-                giocatore.id,
-                voto_base=6.0,
-                bonus_malus=0.0,
-                note='SV',
-                is_manual=False
-            )
+            aggiornamenti.append({
+                'formazione_id': giocatore.id,
+                'voto_base': 6.0,
+                'bonus_malus_totale': 0.0,
+                'note': 'SV'
+            })
             non_trovati.append(giocatore.giocatore)
     
+    salva_voti(aggiornamenti)
+    
     nome_squadra = partita.squadra_casa if tipo_squadra == 'casa' else partita.squadra_trasferta
     
     # Messaggio di successo dettagliato
@@ -944,6 +1327,25 @@ def applica_voti_da_excel(partita_id, tipo_squadra, df_excel):
         st.success(f"✅ **Voti applicati a {nome_squadra}**")
         st.info(f"📊 {trovati}/{len(formazione)} giocatori trovati nell'Excel")
     
+    if approssimati:
+        righe = [
+            f"- {c.nome} → {c.nome_trovato} (affidabilità {c.punteggio:.0%})"
+            for c in approssimati
+        ]
+        st.info("🔎 **Nomi abbinati per somiglianza:**\n\n" + "\n".join(righe))
+    
+    if da_confermare:
+        righe = [
+            f"- {c.nome}: {', '.join([c.nome_trovato] + [nome for nome, _ in c.alternative])}"
+            if c.ambiguo else
+            f"- {c.nome} → {c.nome_trovato}? (affidabilità {c.punteggio:.0%})"
+            for c in da_confermare
+        ]
+        st.warning(
+            "⚠️ **Nomi ambigui o da confermare** (trattati come non trovati: "
+            "correggi il nome in formazione):\n\n" + "\n".join(righe)
+        )
+    
     if non_trovati:
         st.warning(f"⚠️ **Giocatori non trovati nell'Excel** (applicato voto 6.0 con nota SV):\n\n{', '.join(non_trovati)}")
     
@@ -990,8 +1392,18 @@ def render_calcolo():
     
     st.divider()
     
-    if st.button("🧮 Calcola Risultato", type="primary", use_container_width=True):
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        calcola_partita = st.button("🧮 Calcola Risultato", type="primary", use_container_width=True)
+    
+    with col2:
+        calcola_giornata = st.button("📅 Calcola Tutta la Giornata", use_container_width=True)
+    
+    if calcola_partita:
         calcola_e_mostra_risultato(partita)
+    elif calcola_giornata:
+        calcola_e_mostra_giornata(partite)
 
 
 def calcola_e_mostra_risultato(partita):
@@ -1010,26 +1422,24 @@ def calcola_e_mostra_risultato(partita):
         return
     
     # Prepara dati per il calcolo
-    def prepara_formazione(formazione):
-        return [
-            {
-                'nome': f.giocatore,
-                'ruolo': f.ruolo,
-                'voto_base': f.voto.voto_base if f.voto else 6.0,
-                'bonus_malus': f.voto.bonus_malus_totale if f.voto else 0.0,
-                'note': f.voto.note if f.voto else ''
-            }
-            for f in formazione
-        ]
+    form_casa = [GiocatorePunteggio.da_formazione_db(f) for f in formazione_casa]
+    form_trasferta = [GiocatorePunteggio.da_formazione_db(f) for f in formazione_trasferta]
     
-    form_casa = prepara_formazione(formazione_casa)
-    form_trasferta = prepara_formazione(formazione_trasferta)
+    # Calcola risultato (incrementale: riusa le somme parziali già registrate)
+    partita_live = registro_live.ottieni(partita.id, form_casa, form_trasferta, get_regolamento_attivo())
+    risultato = partita_live.risultato()
     
-    # Calcola risultato
-    risultato = calcola_risultato_partita(form_casa, form_trasferta)
-    
-    # Mostra risultato
-    st.success("✅ Calcolo completato!")
+    # Stessa regola della ricostruzione: senza voti la partita non entra in classifica
+    dati = {
+        'formazioni': {'casa': form_casa, 'trasferta': form_trasferta},
+        'con_voti': any(voto_inserito(f.voto) for f in formazione_casa + formazione_trasferta)
+    }
+    if partita_conteggiabile(dati):
+        registra_risultato(db, partita.id, risultato)
+        st.success("✅ Calcolo completato!")
+    else:
+        db.rimuovi_risultato_partita(partita.id)
+        st.warning("⚠️ Nessun voto inserito: risultato calcolato ma non conteggiato in classifica.")
     
     st.header("🏆 Risultato Finale")
     
@@ -1058,6 +1468,66 @@ def calcola_e_mostra_risultato(partita):
         mostra_dettaglio_squadra(formazione_trasferta, risultato['trasferta'])
 
 
+def calcola_e_mostra_giornata(partite):
+    """Calcola con il motore vettoriale e mostra i risultati di tutte le partite di una giornata"""
+    
+    def prepara_formazione(formazione):
+        return [GiocatorePunteggio.da_formazione_db(f) for f in formazione]
+    
+    partite_complete = []
+    formazioni = []
+    incomplete = []
+    con_voti = []
+    
+    for p in partite:
+        formazione_casa = db.get_formazione_partita(p.id, 'casa')
+        formazione_trasferta = db.get_formazione_partita(p.id, 'trasferta')
+        
+        if len(formazione_casa) != 11 or len(formazione_trasferta) != 11:
+            incomplete.append(f"{p.squadra_casa} vs {p.squadra_trasferta}")
+            continue
+        
+        partite_complete.append(p)
+        formazioni.append((prepara_formazione(formazione_casa), prepara_formazione(formazione_trasferta)))
+        con_voti.append(any(voto_inserito(f.voto) for f in formazione_casa + formazione_trasferta))
+    
+    if incomplete:
+        st.warning(f"⚠️ Partite con formazioni incomplete (escluse dal calcolo):\n\n{', '.join(incomplete)}")
+    
+    if not partite_complete:
+        st.error("❌ Nessuna partita con entrambe le formazioni complete.")
+        return
+    
+    # Calcolo vettoriale di tutte le partite in un solo passaggio
+    risultati = calcola_risultati_partite(formazioni, get_regolamento_attivo())
+    
+    senza_voti = []
+    for p, (casa, trasferta), voti, r in zip(partite_complete, formazioni, con_voti, risultati):
+        if partita_conteggiabile({'formazioni': {'casa': casa, 'trasferta': trasferta}, 'con_voti': voti}):
+            registra_risultato(db, p.id, r, commit=False)
+        else:
+            db.rimuovi_risultato_partita(p.id, commit=False)
+            senza_voti.append(f"{p.squadra_casa} vs {p.squadra_trasferta}")
+    db.session.commit()
+    
+    st.success(f"✅ Calcolate {len(partite_complete)} partite! Classifica aggiornata.")
+    if senza_voti:
+        st.warning(f"⚠️ Partite senza voti (non conteggiate in classifica):\n\n{', '.join(senza_voti)}")
+    
+    df_risultati = pd.DataFrame([
+        {
+            'Casa': p.squadra_casa,
+            'Punteggio Casa': f"{r['casa']['punteggio_totale']:.2f}",
+            'Risultato': r['risultato_finale'],
+            'Punteggio Trasferta': f"{r['trasferta']['punteggio_totale']:.2f}",
+            'Trasferta': p.squadra_trasferta
+        }
+        for p, r in zip(partite_complete, risultati)
+    ])
+    
+    st.dataframe(df_risultati, use_container_width=True, hide_index=True)
+
+
 def mostra_dettaglio_squadra(formazione, risultato_squadra):
     """Mostra il dettaglio dei calcoli per una squadra"""
     
@@ -1105,6 +1575,160 @@ def mostra_dettaglio_squadra(formazione, risultato_squadra):
     st.metric("⚽ Gol segnati", risultato_squadra['gol'])
 
 
+def render_classifica():
+    """Pagina classifica del campionato"""
+    st.title("🏆 Classifica")
+    
+    df = tabella_classifica(db)
+    
+    if df.empty:
+        st.info("ℹ️ Nessun risultato in classifica. Calcola i risultati delle partite "
+                "oppure ricostruisci la classifica dalle partite già giocate.")
+    else:
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.caption("Ordine: punti, differenza reti, gol fatti, fantapunti totali.")
+    
+    st.divider()
+    
+    st.write("La classifica si aggiorna a ogni risultato calcolato. Ricostruiscila dopo "
+             "un cambio di regolamento o se hai modificato voti senza ricalcolare.")
+    
+    if st.button("🔄 Ricostruisci Classifica"):
+        with st.spinner("Ricalcolo di tutte le partite..."):
+            num_partite = ricostruisci_classifica(db, get_regolamento_attivo())
+        st.success(f"✅ Classifica ricostruita da {num_partite} partite!")
+        time.sleep(1)
+        st.rerun()
+
+
+def render_simulazione():
+    """Pagina simulazione Monte Carlo del resto della stagione"""
+    st.title("🎲 Simulazione Stagione")
+    
+    st.write(
+        "Simula il calendario rimanente estraendo i voti di ogni giocatore dal suo storico "
+        "e stima le probabilità di ogni posizione finale."
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        num_simulazioni = st.number_input(
+            "Numero simulazioni", min_value=1000, max_value=200000, value=10000, step=1000
+        )
+    with col2:
+        retrocessioni = st.number_input("Squadre retrocesse", min_value=0, max_value=10, value=0)
+    with col3:
+        seed = st.number_input("Seed (0 = casuale)", min_value=0, value=0)
+    
+    if st.button("🎲 Avvia Simulazione", type="primary"):
+        regolamento = get_regolamento_attivo()
+        
+        try:
+            modello, info = prepara_modello_stagione(db, regolamento=regolamento)
+        except ValueError as e:
+            st.error(f"❌ {str(e)}")
+            return
+        
+        if info['partite_escluse']:
+            st.warning(
+                f"⚠️ Partite giocate con formazioni incomplete (escluse dalla classifica):\n\n"
+                f"{', '.join(info['partite_escluse'])}"
+            )
+        
+        if info['partite_senza_voti']:
+            st.info(
+                f"ℹ️ Partite giocate ancora senza voti (escluse da classifica e storico):\n\n"
+                f"{', '.join(info['partite_senza_voti'])}"
+            )
+        
+        if info['partite_da_giocare'] == 0:
+            st.info("ℹ️ Nessuna partita da simulare: il calendario è concluso.")
+            return
+        
+        with st.spinner(f"Simulazione di {num_simulazioni} stagioni in corso..."):
+            inizio = time.time()
+            risultato = simula_stagione(
+                modello,
+                num_simulazioni=int(num_simulazioni),
+                seed=int(seed) or None,
+                regolamento=regolamento
+            )
+            durata = time.time() - inizio
+        
+        st.success(
+            f"✅ {num_simulazioni} stagioni simulate in {durata:.1f}s "
+            f"(dalla giornata {info['dalla_giornata']}, {info['partite_da_giocare']} partite)"
+        )
+        
+        df = tabella_probabilita(risultato, retrocessioni=int(retrocessioni))
+        colonne_probabilita = [c for c in df.columns if c not in ('Squadra', 'Punti medi')]
+        st.dataframe(
+            df.style.format({c: '{:.1%}' for c in colonne_probabilita}),
+            use_container_width=True,
+            hide_index=True
+        )
+
+
+def render_regolamento():
+    """Pagina gestione del regolamento di calcolo"""
+    st.title("⚙️ Regolamento")
+    
+    regolamento = get_regolamento_attivo().regolamento
+    
+    st.write(f"**Regolamento attivo:** {regolamento.nome}")
+    if regolamento.descrizione:
+        st.caption(regolamento.descrizione)
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Gol fatto", f"{regolamento.gol_fatti:+g}")
+        st.metric("Assist", f"{regolamento.assist:+g}")
+    with col2:
+        st.metric("Ammonizione", f"{regolamento.ammonizioni:+g}")
+        st.metric("Espulsione", f"{regolamento.espulsioni:+g}")
+    with col3:
+        st.metric("Vantaggio casa", f"{regolamento.vantaggio_casa:+g}")
+        st.metric("Soglie gol", " / ".join(f"{s:g}" for s in regolamento.tabella_gol.soglie))
+    
+    with st.expander("📄 Regolamento completo (JSON)"):
+        st.json(regolamento_a_dict(regolamento))
+    
+    st.divider()
+    
+    st.subheader("Carica un regolamento personalizzato")
+    st.write("Carica un file TOML o JSON: le voci non indicate mantengono il valore standard.")
+    
+    uploaded_file = st.file_uploader("File regolamento", type=['toml', 'json'], key="regolamento_upload")
+    
+    if uploaded_file is not None:
+        formato = 'json' if uploaded_file.name.lower().endswith('.json') else 'toml'
+        
+        try:
+            nuovo = leggi_regolamento_testo(uploaded_file.getvalue().decode('utf-8'), formato)
+            # Compila subito per validare soglie e valori
+            risolvi_regolamento(nuovo)
+        except Exception as e:
+            st.error(f"❌ Regolamento non valido: {str(e)}")
+        else:
+            st.write(f"**Regolamento letto:** {nuovo.nome}")
+            
+            if st.button("✅ Salva e Attiva", type="primary"):
+                db.salva_regolamento(nuovo, attivo=True)
+                st.success(f"✅ Regolamento '{nuovo.nome}' attivato!")
+                time.sleep(1)
+                st.rerun()
+    
+    st.divider()
+    
+    if st.button("↩️ Ripristina regolamento standard"):
+        db.salva_regolamento(REGOLAMENTO_STANDARD, attivo=True)
+        st.success("✅ Regolamento standard attivato!")
+        time.sleep(1)
+        st.rerun()
+
+
 def render_backup():
     """Pagina gestione backup e restore"""
     st.title("💾 Backup e Restore Database")
@@ -1114,7 +1738,7 @@ def render_backup():
     Tuttavia, è consigliato fare backup periodici per sicurezza.
     """)
     
-    tab1, tab2, tab3 = st.tabs(["📥 Backup", "📤 Restore", "📄 Export JSON"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📥 Backup", "📤 Restore", "📄 Export JSON", "📊 Export Stagione"])
     
     with tab1:
         st.subheader("Crea Backup")
@@ -1216,6 +1840,37 @@ def render_backup():
                         )
             except Exception as e:
                 st.error(f"❌ Errore durante l'export: {str(e)}")
+    
+    with tab4:
+        st.subheader("Export Stagione")
+        st.write(
+            "Esporta giornate, partite, formazioni, voti e risultati: in Excel "
+            "un foglio per giornata, in CSV un unico file."
+        )
+        
+        formato = st.radio("Formato", ["Excel (.xlsx)", "CSV (.csv)"], horizontal=True, key="export_formato")
+        estensione = 'xlsx' if formato.startswith("Excel") else 'csv'
+        
+        if st.button("📊 Esporta stagione", type="primary"):
+            try:
+                os.makedirs('data', exist_ok=True)
+                export_path = f'data/fantacalcio_stagione.{estensione}'
+                with st.spinner("Export in corso..."):
+                    esportate = esporta_stagione(db, export_path)
+                st.success(f"✅ {esportate} righe esportate!")
+                
+                with open(export_path, 'rb') as f:
+                    st.download_button(
+                        label="⬇️ Scarica stagione",
+                        data=f.read(),
+                        file_name=os.path.basename(export_path),
+                        mime=(
+                            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                            if estensione == 'xlsx' else "text/csv"
+                        )
+                    )
+            except Exception as e:
+                st.error(f"❌ Errore durante l'export: {str(e)}")
 
 
 # ===== ROUTING =====
@@ -1240,6 +1895,12 @@ def main():
         render_excel()
     elif st.session_state.page == 'calcolo':
         render_calcolo()
+    elif st.session_state.page == 'classifica':
+        render_classifica()
+    elif st.session_state.page == 'simulazione':
+        render_simulazione()
+    elif st.session_state.page == 'regolamento':
+        render_regolamento()
     elif st.session_state.page == 'backup':
         render_backup()
 
@@ -0,0 +1,95 @@
+"""
+Benchmark del motore di calcolo: formazioni come dict contro GiocatorePunteggio.
+Misura tempo per partita e memoria occupata da una stagione di formazioni.
+
+Uso: python bench_calc.py [numero_partite]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from calc import GiocatorePunteggio, calcola_risultato_partita
+
+
+MODULI = [(3, 4, 3), (3, 5, 2), (4, 3, 3), (4, 4, 2), (4, 5, 1), (5, 3, 2), (5, 4, 1)]
+
+
+def genera_partite(num_partite, seed=0):
+    """Genera partite casuali con formazioni come liste di dict"""
+    rng = random.Random(seed)
+    partite = []
+    for _ in range(num_partite):
+        partita = []
+        for _ in range(2):
+            num_d, num_c, num_a = rng.choice(MODULI)
+            ruoli = ['P'] + ['D'] * num_d + ['C'] * num_c + ['A'] * num_a
+            partita.append([
+                {
+                    'nome': f'Giocatore {i}',
+                    'ruolo': ruolo,
+                    'voto_base': rng.choice([4.5, 5.0, 5.5, 6.0, 6.5, 7.0, 7.5, 8.0]),
+                    'bonus_malus': rng.choice([-1.0, -0.5, 0.0, 0.0, 0.0, 1.0, 3.0]),
+                    'note': ''
+                }
+                for i, ruolo in enumerate(ruoli)
+            ])
+        partite.append(partita)
+    return partite
+
+
+def converti_in_record(partite):
+    """Converte le formazioni in liste di GiocatorePunteggio"""
+    return [
+        [[GiocatorePunteggio.da_dict(g) for g in formazione] for formazione in partita]
+        for partita in partite
+    ]
+
+
+def misura_tempo(partite, ripetizioni=3):
+    """Miglior tempo (secondi) per calcolare tutte le partite"""
+    migliore = float('inf')
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        for casa, trasferta in partite:
+            calcola_risultato_partita(casa, trasferta)
+        migliore = min(migliore, time.perf_counter() - inizio)
+    return migliore
+
+
+def misura_memoria(crea):
+    """Memoria (byte) allocata dall'oggetto restituito da crea()"""
+    tracemalloc.start()
+    oggetto = crea()
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del oggetto
+    return memoria
+
+
+def main():
+    num_partite = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    partite_dict = genera_partite(num_partite)
+    partite_record = converti_in_record(partite_dict)
+
+    # Stessi risultati con le due rappresentazioni
+    for dict_partita, record_partita in zip(partite_dict[:1000], partite_record[:1000]):
+        assert calcola_risultato_partita(*dict_partita) == calcola_risultato_partita(*record_partita)
+
+    tempo_dict = misura_tempo(partite_dict)
+    tempo_record = misura_tempo(partite_record)
+
+    memoria_dict = misura_memoria(lambda: genera_partite(num_partite))
+    memoria_record = misura_memoria(lambda: converti_in_record(partite_dict))
+
+    print(f"Partite: {num_partite}")
+    print(f"{'':12}{'µs/partita':>12}{'MB formazioni':>16}")
+    print(f"{'dict':12}{tempo_dict / num_partite * 1e6:12.1f}{memoria_dict / 1e6:16.1f}")
+    print(f"{'record':12}{tempo_record / num_partite * 1e6:12.1f}{memoria_record / 1e6:16.1f}")
+    print(f"Guadagno: tempo x{tempo_dict / tempo_record:.2f}, memoria x{memoria_dict / memoria_record:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Cache su disco dei voti letti dai file Excel.
+Ogni file caricato è identificato dallo SHA-256 dei suoi byte: ricaricare lo
+stesso file (o rieseguire lo script Streamlit) riusa il DataFrame normalizzato
+salvato in data/ senza rileggere l'Excel. La cache ha una dimensione massima
+e scarta per primi i file usati meno di recente.
+"""
+
+import hashlib
+import os
+import tempfile
+from importlib.util import find_spec
+from typing import List, Optional
+
+import pandas as pd
+
+from excel_import import leggi_excel_fogli, leggi_voti
+
+
+CARTELLA_CACHE = os.path.join('data', 'cache_voti')
+
+# Dimensione massima complessiva dei file in cache
+DIMENSIONE_MASSIMA_CACHE = 64 * 1024 * 1024
+
+# Parquet (colonnare, veloce) se pyarrow è installato, altrimenti pickle
+FORMATO_CACHE = 'parquet' if find_spec('pyarrow') is not None else 'pickle'
+
+
+def chiave_contenuto(dati: bytes) -> str:
+    """
+    Chiave di cache di un file: SHA-256 esadecimale del contenuto.
+
+    Args:
+        dati: byte del file
+
+    Returns:
+        str: hash del contenuto
+    """
+    return hashlib.sha256(dati).hexdigest()
+
+
+def _percorso_cache(chiave: str, cartella: str) -> str:
+    """Percorso del file di cache per una chiave"""
+    return os.path.join(cartella, f"{chiave}.{FORMATO_CACHE}")
+
+
+def leggi_cache(chiave: str, cartella: str = CARTELLA_CACHE) -> Optional[pd.DataFrame]:
+    """
+    Legge un DataFrame dalla cache e lo segna come usato di recente.
+
+    Args:
+        chiave: chiave del contenuto
+        cartella: cartella della cache
+
+    Returns:
+        pd.DataFrame o None se la chiave non è in cache
+    """
+    percorso = _percorso_cache(chiave, cartella)
+    try:
+        if FORMATO_CACHE == 'parquet':
+            df = pd.read_parquet(percorso)
+        else:
+            df = pd.read_pickle(percorso)
+    except FileNotFoundError:
+        return None
+
+    # La data di modifica fa da ordine LRU per la pulizia
+    os.utime(percorso)
+    return df
+
+
+def salva_cache(
+    chiave: str,
+    df: pd.DataFrame,
+    cartella: str = CARTELLA_CACHE,
+    dimensione_massima: int = DIMENSIONE_MASSIMA_CACHE
+):
+    """
+    Salva un DataFrame in cache e riporta la cache entro la dimensione massima.
+    Il file viene scritto a parte e poi rinominato, così una lettura
+    concorrente non vede mai un file a metà.
+
+    Args:
+        chiave: chiave del contenuto
+        df: DataFrame da salvare
+        cartella: cartella della cache
+        dimensione_massima: dimensione massima della cache in byte
+    """
+    os.makedirs(cartella, exist_ok=True)
+
+    descrittore, temporaneo = tempfile.mkstemp(dir=cartella, suffix='.tmp')
+    os.close(descrittore)
+    try:
+        if FORMATO_CACHE == 'parquet':
+            df.to_parquet(temporaneo, index=False)
+        else:
+            df.to_pickle(temporaneo)
+        os.replace(temporaneo, _percorso_cache(chiave, cartella))
+    except BaseException:
+        os.remove(temporaneo)
+        raise
+
+    pulisci_cache(cartella, dimensione_massima)
+
+
+def pulisci_cache(cartella: str = CARTELLA_CACHE, dimensione_massima: int = DIMENSIONE_MASSIMA_CACHE) -> int:
+    """
+    Elimina i file usati meno di recente finché la cache non rientra
+    nella dimensione massima.
+
+    Args:
+        cartella: cartella della cache
+        dimensione_massima: dimensione massima della cache in byte
+
+    Returns:
+        int: numero di file eliminati
+    """
+    if not os.path.isdir(cartella):
+        return 0
+
+    file_cache = []
+    for voce in os.scandir(cartella):
+        if voce.is_file() and voce.name.endswith(f".{FORMATO_CACHE}"):
+            stato = voce.stat()
+            file_cache.append((stato.st_mtime, stato.st_size, voce.path))
+
+    totale = sum(dimensione for _, dimensione, _ in file_cache)
+    eliminati = 0
+    for _, dimensione, percorso in sorted(file_cache):
+        if totale <= dimensione_massima:
+            break
+        try:
+            os.remove(percorso)
+        except FileNotFoundError:
+            pass
+        totale -= dimensione
+        eliminati += 1
+
+    return eliminati
+
+
+def leggi_excel_voti_con_cache(
+    filepath: str,
+    cartella: str = CARTELLA_CACHE,
+    fogli: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Come excel_import.leggi_voti (Excel o CSV), ma riusa il risultato già
+    calcolato per un file con lo stesso contenuto.
+    
+    Args:
+        filepath: percorso del file Excel o CSV
+        cartella: cartella della cache
+        fogli: fogli da leggere con excel_import.leggi_excel_fogli (fanno
+            parte della chiave); default: solo il primo foglio
+    
+    Returns:
+        pd.DataFrame: voti normalizzati
+    """
+    with open(filepath, 'rb') as f:
+        dati = f.read()
+    if fogli is not None:
+        dati += '\0'.join(['fogli', *fogli]).encode()
+    chiave = chiave_contenuto(dati)
+    
+    df = leggi_cache(chiave, cartella)
+    if df is None:
+        df = leggi_voti(filepath) if fogli is None else leggi_excel_fogli(filepath, fogli)
+        salva_cache(chiave, df, cartella)
+    
+    return df
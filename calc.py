@@ -3,7 +3,263 @@ Motore di calcolo del Fantacalcio.
 Implementa tutte le regole di calcolo con funzioni pure e testabili.
 """
 
-from typing import List, Dict, Tuple
+from bisect import bisect_right
+from fractions import Fraction
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from regolamento import (
+    TabellaSoglie,
+    RegolamentoCompilato,
+    REGOLAMENTO_STANDARD,
+    in_punto_fisso,
+    risolvi_regolamento
+)
+
+
+# Tabelle del regolamento standard (per compatibilità: i valori vivono in regolamento.py)
+TABELLA_MODIFICATORE_DIFESA = REGOLAMENTO_STANDARD.tabella_difesa
+TABELLA_MODIFICATORE_CENTROCAMPO = REGOLAMENTO_STANDARD.tabella_centrocampo
+TABELLA_MODIFICATORE_ATTACCO = REGOLAMENTO_STANDARD.tabella_attacco
+TABELLA_GOL = REGOLAMENTO_STANDARD.tabella_gol
+SOGLIA_GOL_EXTRA = REGOLAMENTO_STANDARD.soglia_gol_extra
+PUNTI_PER_GOL_EXTRA = REGOLAMENTO_STANDARD.punti_per_gol_extra
+
+
+class GiocatorePunteggio:
+    """
+    Voto di un giocatore schierato, condiviso da motore di calcolo, import
+    Excel e app. Record compatto con __slots__: occupa circa un terzo di un
+    dict equivalente e l'accesso ai campi è più rapido nel ciclo di calcolo.
+    """
+    __slots__ = ('nome', 'ruolo', 'voto_base', 'bonus_malus', 'note', 'id', 'eventi', 'da_excel')
+
+    def __init__(
+        self,
+        nome: str,
+        ruolo: str,
+        voto_base: float = 6.0,
+        bonus_malus: float = 0.0,
+        note: str = '',
+        id: Optional[int] = None,
+        eventi: Optional[Dict[str, int]] = None,
+        da_excel: bool = False
+    ):
+        self.nome = nome
+        self.ruolo = ruolo
+        self.voto_base = voto_base
+        self.bonus_malus = bonus_malus
+        self.note = note
+        self.id = id
+        self.eventi = eventi
+        self.da_excel = da_excel
+
+    @property
+    def voto_totale(self) -> float:
+        """Voto totale secondo regolamento A"""
+        return self.voto_base + self.bonus_malus
+
+    @classmethod
+    def da_dict(cls, dati: Dict) -> 'GiocatorePunteggio':
+        """Crea il record da un dict nel formato usato finora dal motore"""
+        return cls(
+            nome=dati.get('nome', ''),
+            ruolo=dati['ruolo'],
+            voto_base=dati.get('voto_base', 6.0),
+            bonus_malus=dati.get('bonus_malus', 0.0),
+            note=dati.get('note', dati.get('nota', '')),
+            id=dati.get('id'),
+            eventi=dati.get('eventi'),
+            da_excel=dati.get('from_excel', False)
+        )
+
+    @classmethod
+    def da_formazione_db(cls, formazione) -> 'GiocatorePunteggio':
+        """Crea il record da una riga Formazione del database (voto 6.0 se assente)"""
+        voto = formazione.voto
+        return cls(
+            nome=formazione.giocatore,
+            ruolo=formazione.ruolo,
+            voto_base=voto.voto_base if voto else 6.0,
+            bonus_malus=voto.bonus_malus_totale if voto else 0.0,
+            note=voto.note if voto else '',
+            id=formazione.id
+        )
+
+    def a_dict(self) -> Dict:
+        """Converte il record in dict (per DataFrame ed export)"""
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    def __eq__(self, altro):
+        if not isinstance(altro, GiocatorePunteggio):
+            return NotImplemented
+        return all(getattr(self, c) == getattr(altro, c) for c in self.__slots__)
+
+    def __repr__(self):
+        return f"<GiocatorePunteggio {self.nome} ({self.ruolo}) {self.voto_base} + {self.bonus_malus}>"
+
+
+# Un giocatore per il motore di calcolo: record oppure dict con le stesse chiavi
+Giocatore = Union[GiocatorePunteggio, Dict]
+
+
+def campi_formazione(formazione: List[Giocatore], *campi: str) -> Iterator:
+    """
+    Itera sui giocatori di una formazione restituendo i campi richiesti,
+    sia che siano GiocatorePunteggio sia dict: se la lista è tutta dello
+    stesso tipo i campi vengono estratti con un solo attrgetter/itemgetter,
+    altrimenti (formazione mista) il tipo viene controllato giocatore per
+    giocatore.
+
+    Args:
+        formazione: lista di giocatori
+        campi: nomi dei campi da estrarre
+
+    Returns:
+        Iterator: un valore (o una tupla se più campi) per giocatore
+    """
+    per_chiave = itemgetter(*campi)
+    per_attributo = attrgetter(*campi)
+    # Un controllo per tipo distinto, non per giocatore
+    dizionari = {issubclass(tipo, dict) for tipo in set(map(type, formazione))}
+    if dizionari == {True}:
+        return map(per_chiave, formazione)
+    if True not in dizionari:
+        return map(per_attributo, formazione)
+    return (
+        per_chiave(giocatore) if isinstance(giocatore, dict) else per_attributo(giocatore)
+        for giocatore in formazione
+    )
+
+
+def cerca_in_tabella(tabella: TabellaSoglie, valore: float):
+    """
+    Restituisce il valore della tabella corrispondente a un punteggio scalare.
+    
+    Args:
+        tabella: tabella a soglie
+        valore: punteggio da cercare
+    
+    Returns:
+        valore della fascia in cui cade il punteggio
+    """
+    return tabella.valori[bisect_right(tabella.soglie, valore)]
+
+
+@lru_cache(maxsize=None)
+def _array_tabella(tabella: TabellaSoglie) -> Tuple[np.ndarray, np.ndarray]:
+    """Converte (una sola volta) una tabella in array NumPy per searchsorted"""
+    return np.asarray(tabella.soglie), np.asarray(tabella.valori)
+
+
+def cerca_in_tabella_array(tabella: TabellaSoglie, valori: np.ndarray) -> np.ndarray:
+    """
+    Versione vettoriale di cerca_in_tabella: mappa un array di punteggi
+    sui valori della tabella con una sola chiamata a numpy.searchsorted.
+    
+    Args:
+        tabella: tabella a soglie
+        valori: array di punteggi
+    
+    Returns:
+        np.ndarray: valori della tabella, stessa shape dei punteggi
+    """
+    soglie, valori_tabella = _array_tabella(tabella)
+    return valori_tabella[np.searchsorted(soglie, valori, side='right')]
+
+
+def cerca_media_in_tabella(tabella: TabellaSoglie, somma: float, conteggio: int):
+    """
+    Come cerca_in_tabella sulla media somma / conteggio. Con somma intera
+    (modalità a punto fisso) la media è una frazione esatta: nessun
+    arrotondamento può spostarla dall'altra parte di una soglia.
+    
+    Args:
+        tabella: tabella a soglie
+        somma: somma dei punteggi
+        conteggio: numero di punteggi sommati (> 0)
+    
+    Returns:
+        valore della fascia in cui cade la media
+    """
+    if isinstance(somma, int):
+        return cerca_in_tabella(tabella, Fraction(somma, conteggio))
+    return cerca_in_tabella(tabella, somma / conteggio)
+
+
+def cerca_media_in_tabella_array(
+    tabella: TabellaSoglie,
+    somme: np.ndarray,
+    conteggi: np.ndarray
+) -> np.ndarray:
+    """
+    Versione vettoriale di cerca_media_in_tabella. Con somme intere il
+    confronto media >= soglia diventa somma >= soglia * conteggio, esatto.
+    
+    Args:
+        tabella: tabella a soglie
+        somme: array di somme dei punteggi
+        conteggi: array di conteggi (gli zeri sono trattati come 1)
+    
+    Returns:
+        np.ndarray: valori della tabella, stessa shape delle somme
+    """
+    conteggi = np.maximum(conteggi, 1)
+    if not np.issubdtype(somme.dtype, np.integer):
+        return cerca_in_tabella_array(tabella, somme / conteggi)
+    
+    soglie, valori_tabella = _array_tabella(tabella)
+    soglie = soglie.reshape((-1,) + (1,) * somme.ndim)
+    return valori_tabella[np.count_nonzero(soglie * conteggi <= somme, axis=0)]
+
+
+def _zero(reg: RegolamentoCompilato):
+    """Zero nelle unità del regolamento (int a punto fisso, float altrimenti)"""
+    return 0 if reg.scala > 1 else 0.0
+
+
+def formazione_punto_fisso(formazione: List[Giocatore], scala: int) -> List['GiocatorePunteggio']:
+    """
+    Converte voti base e bonus/malus di una formazione in interi a punto fisso.
+    
+    Args:
+        formazione: lista di GiocatorePunteggio o dict
+        scala: unità per punto
+    
+    Returns:
+        List[GiocatorePunteggio]: giocatori con voti in unità di 1/scala di punto
+    
+    Raises:
+        ValueError: se un voto non è un multiplo di 1/scala di punto
+    """
+    return [
+        GiocatorePunteggio(None, ruolo, in_punto_fisso(voto_base, scala), in_punto_fisso(bonus_malus, scala))
+        for ruolo, voto_base, bonus_malus in campi_formazione(formazione, 'ruolo', 'voto_base', 'bonus_malus')
+    ]
+
+
+def formazioni_punto_fisso_array(valori: np.ndarray, scala: int) -> np.ndarray:
+    """
+    Versione vettoriale di formazione_punto_fisso per gli array del motore batch.
+    
+    Args:
+        valori: array di voti in punti
+        scala: unità per punto
+    
+    Returns:
+        np.ndarray: array int32 in unità di 1/scala di punto
+    
+    Raises:
+        ValueError: se un voto non è un multiplo di 1/scala di punto
+    """
+    unita = np.asarray(valori, dtype=np.float64) * scala
+    interi = np.rint(unita)
+    if not np.array_equal(interi, unita):
+        raise ValueError(f"Alcuni voti non sono multipli di 1/{scala} di punto")
+    return interi.astype(np.int32)
 
 
 def calcola_bonus_malus_da_eventi(
@@ -16,7 +272,8 @@ def calcola_bonus_malus_da_eventi(
     ammonizioni: int = 0,
     espulsioni: int = 0,
     assist: int = 0,
-    ruolo: str = ""
+    ruolo: str = "",
+    regolamento: RegolamentoCompilato = None
 ) -> float:
     """
     Calcola il bonus/malus totale da eventi secondo il regolamento B.
@@ -32,44 +289,37 @@ def calcola_bonus_malus_da_eventi(
         espulsioni: numero di espulsioni
         assist: numero di assist
         ruolo: ruolo del giocatore (P, D, C, A)
+        regolamento: regolamento da applicare (default: standard)
     
     Returns:
         float: bonus/malus totale
     """
-    bonus_malus = 0.0
-    
-    # +3 per gol fatto
-    bonus_malus += gol_fatti * 3
-    
-    # +1 per assist
-    bonus_malus += assist * 1
-    
-    # +3 per rigore segnato
-    bonus_malus += rigori_fatti * 3
-    
-    # +3 per rigore parato
-    bonus_malus += rigori_parati * 3
-    
-    # -3 per rigore sbagliato
-    bonus_malus -= rigori_sbagliati * 3
-    
-    # -2 per autogol
-    bonus_malus -= autogol * 2
-    
-    # -0.5 per ammonizione
-    bonus_malus -= ammonizioni * 0.5
+    reg = risolvi_regolamento(regolamento)
+    
+    # Eventi nello stesso ordine dei pesi del regolamento (gol, assist, rigori, ...)
+    eventi = (
+        gol_fatti,
+        assist,
+        rigori_fatti,
+        rigori_parati,
+        rigori_sbagliati,
+        autogol,
+        ammonizioni,
+        espulsioni
+    )
     
-    # -1 per espulsione
-    bonus_malus -= espulsioni * 1
+    bonus_malus = 0.0
+    for numero, peso in zip(eventi, reg.pesi_eventi):
+        bonus_malus += numero * peso
     
     # Bonus/malus specifici per portiere
     if ruolo == 'P':
-        # -1 per ogni gol subito
-        bonus_malus -= gol_subiti * 1
+        # Malus per ogni gol subito
+        bonus_malus += gol_subiti * reg.gol_subiti_portiere
         
-        # +1 porta inviolata se gol subiti = 0
+        # Bonus porta inviolata se gol subiti = 0
         if gol_subiti == 0:
-            bonus_malus += 1
+            bonus_malus += reg.porta_inviolata
     
     return bonus_malus
 
@@ -102,9 +352,35 @@ def calcola_voto_totale_squadra(voti_giocatori: List[float]) -> float:
     return sum(voti_giocatori)
 
 
+def correzione_numero_difensori(numero_difensori: int, regolamento: RegolamentoCompilato = None) -> float:
+    """
+    Restituisce la correzione del modificatore difesa per numero di difensori
+    (regolamento D): correzione per modulo e penalità oltre il quarto difensore.
+    
+    Args:
+        numero_difensori: numero di difensori schierati
+        regolamento: regolamento da applicare (default: standard)
+    
+    Returns:
+        float: correzione da sommare al modificatore base
+    """
+    reg = risolvi_regolamento(regolamento)
+    
+    if numero_difensori < len(reg.correzioni_difesa):
+        return reg.correzioni_difesa[numero_difensori]
+    
+    regole = reg.regolamento
+    difensori_extra = numero_difensori - regole.difensori_senza_penalita
+    correzione = -difensori_extra * regole.penalita_difensore_extra
+    if reg.scala > 1:
+        return in_punto_fisso(correzione, reg.scala)
+    return correzione
+
+
 def calcola_modificatore_difesa(
     voti_base_difensori: List[float],
-    numero_difensori: int
+    numero_difensori: int,
+    regolamento: RegolamentoCompilato = None
 ) -> float:
     """
     Calcola il modificatore difesa secondo regolamento D.
@@ -112,57 +388,44 @@ def calcola_modificatore_difesa(
     Args:
         voti_base_difensori: voti base dei difensori titolari
         numero_difensori: numero di difensori schierati
+        regolamento: regolamento da applicare (default: standard)
     
     Returns:
         float: modificatore difesa (da applicare alla squadra avversaria)
     """
-    if not voti_base_difensori:
-        return 0.0
-    
-    # Calcola la media dei voti base dei difensori
-    media = sum(voti_base_difensori) / len(voti_base_difensori)
-    
-    # Tabella del modificatore base
-    if media < 5.00:
-        modificatore = 4
-    elif media < 5.25:
-        modificatore = 3
-    elif media < 5.50:
-        modificatore = 2
-    elif media < 5.75:
-        modificatore = 1
-    elif media < 6.00:
-        modificatore = 0
-    elif media < 6.25:
-        modificatore = -1
-    elif media < 6.50:
-        modificatore = -2
-    elif media < 6.75:
-        modificatore = -3
-    elif media < 7.00:
-        modificatore = -4
-    else:
-        modificatore = -5
+    return _modificatore_difesa(
+        sum(voti_base_difensori),
+        len(voti_base_difensori),
+        numero_difensori,
+        risolvi_regolamento(regolamento)
+    )
+
+
+def _modificatore_difesa(
+    somma_voti: float,
+    num_voti: int,
+    numero_difensori: int,
+    reg: RegolamentoCompilato
+) -> float:
+    """Modificatore difesa dalla somma dei voti base (senza costruire liste)"""
+    if num_voti == 0:
+        return _zero(reg)
     
-    # Correzioni in base al numero di difensori
-    if numero_difensori == 3:
-        modificatore += 1
-    elif numero_difensori == 4:
-        modificatore += 0
-    elif numero_difensori == 5:
-        modificatore -= 1
+    # Tabella del modificatore base sulla media dei voti base dei difensori
+    modificatore = cerca_media_in_tabella(reg.tabella_difesa, somma_voti, num_voti)
     
-    # Penalità per difensori oltre il quarto
-    if numero_difensori > 4:
-        difensori_extra = numero_difensori - 4
-        modificatore -= difensori_extra
+    # Correzioni in base al numero di difensori (con penalità oltre il quarto)
+    modificatore += correzione_numero_difensori(numero_difensori, reg)
     
+    if reg.scala > 1:
+        return modificatore
     return float(modificatore)
 
 
 def calcola_modificatore_centrocampo(
     voti_base_centrocampisti_casa: List[float],
-    voti_base_centrocampisti_trasferta: List[float]
+    voti_base_centrocampisti_trasferta: List[float],
+    regolamento: RegolamentoCompilato = None
 ) -> Tuple[float, float]:
     """
     Calcola il modificatore centrocampo secondo regolamento E.
@@ -170,50 +433,40 @@ def calcola_modificatore_centrocampo(
     Args:
         voti_base_centrocampisti_casa: voti base centrocampisti squadra casa
         voti_base_centrocampisti_trasferta: voti base centrocampisti trasferta
+        regolamento: regolamento da applicare (default: standard)
     
     Returns:
         Tuple[float, float]: (modificatore casa, modificatore trasferta)
     """
-    num_casa = len(voti_base_centrocampisti_casa)
-    num_trasferta = len(voti_base_centrocampisti_trasferta)
-    
-    # Se numero diverso, aggiungi 5 d'ufficio
-    voti_casa = voti_base_centrocampisti_casa.copy()
-    voti_trasferta = voti_base_centrocampisti_trasferta.copy()
-    
-    if num_casa < num_trasferta:
-        diff = num_trasferta - num_casa
-        voti_casa.extend([5.0] * diff)
-    elif num_trasferta < num_casa:
-        diff = num_casa - num_trasferta
-        voti_trasferta.extend([5.0] * diff)
-    
-    # Calcola somme
-    somma_casa = sum(voti_casa)
-    somma_trasferta = sum(voti_trasferta)
+    return _modificatore_centrocampo(
+        sum(voti_base_centrocampisti_casa),
+        len(voti_base_centrocampisti_casa),
+        sum(voti_base_centrocampisti_trasferta),
+        len(voti_base_centrocampisti_trasferta),
+        risolvi_regolamento(regolamento)
+    )
+
+
+def _modificatore_centrocampo(
+    somma_casa: float,
+    num_casa: int,
+    somma_trasferta: float,
+    num_trasferta: int,
+    reg: RegolamentoCompilato
+) -> Tuple[float, float]:
+    """Modificatore centrocampo dalle somme dei voti base (senza copiare liste)"""
+    # Se numero diverso, aggiungi il voto d'ufficio (5) per ogni mancante:
+    # sommati uno alla volta, come se fossero in coda alla lista dei voti
+    for _ in range(num_trasferta - num_casa):
+        somma_casa += reg.voto_ufficio_centrocampo
+    for _ in range(num_casa - num_trasferta):
+        somma_trasferta += reg.voto_ufficio_centrocampo
     
     # Calcola differenza assoluta
     differenza = abs(somma_casa - somma_trasferta)
     
     # Tabella del modificatore
-    if differenza < 1:
-        mod_value = 0.0
-    elif differenza < 2:
-        mod_value = 0.5
-    elif differenza < 3:
-        mod_value = 1.0
-    elif differenza < 4:
-        mod_value = 1.5
-    elif differenza < 5:
-        mod_value = 2.0
-    elif differenza < 6:
-        mod_value = 2.5
-    elif differenza < 7:
-        mod_value = 3.0
-    elif differenza < 8:
-        mod_value = 3.5
-    else:
-        mod_value = 4.0
+    mod_value = cerca_in_tabella(reg.tabella_centrocampo, differenza)
     
     # Applica positivo a chi ha somma maggiore, negativo all'altro
     if somma_casa > somma_trasferta:
@@ -221,162 +474,234 @@ def calcola_modificatore_centrocampo(
     elif somma_trasferta > somma_casa:
         return (-mod_value, mod_value)
     else:
-        return (0.0, 0.0)
+        return (_zero(reg), _zero(reg))
 
 
 def calcola_modificatore_attacco(
-    attaccanti: List[Dict[str, float]]
+    attaccanti: List[Giocatore],
+    regolamento: RegolamentoCompilato = None
 ) -> float:
     """
     Calcola il modificatore attacco secondo regolamento F.
     
     Args:
-        attaccanti: lista di dict con 'voto_base' e 'bonus_malus' per ogni attaccante
+        attaccanti: GiocatorePunteggio (o dict con 'voto_base' e 'bonus_malus') per ogni attaccante
+        regolamento: regolamento da applicare (default: standard)
     
     Returns:
         float: modificatore attacco
     """
+    reg = risolvi_regolamento(regolamento)
+    
+    if attaccanti and isinstance(attaccanti[0], dict):
+        voti = ((att.get('voto_base', 6.0), att.get('bonus_malus', 0.0)) for att in attaccanti)
+    else:
+        voti = campi_formazione(attaccanti, 'voto_base', 'bonus_malus')
+    
     modificatore = 0.0
     
-    for att in attaccanti:
-        voto_base = att.get('voto_base', 6.0)
-        bonus_malus = att.get('bonus_malus', 0.0)
-        
+    for voto_base, bonus_malus in voti:
         # Solo se bonus_malus totale = 0
         if bonus_malus == 0:
-            if 6.50 <= voto_base < 7.00:
-                modificatore += 0.5
-            elif 7.00 <= voto_base < 7.50:
-                modificatore += 1.0
-            elif voto_base >= 7.50:
-                modificatore += 1.5
+            modificatore += cerca_in_tabella(reg.tabella_attacco, voto_base)
     
     return modificatore
 
 
-def calcola_gol_da_punteggio(punteggio: float) -> int:
+def calcola_gol_da_punteggio(punteggio: float, regolamento: RegolamentoCompilato = None) -> int:
     """
     Calcola i gol segnati in base al punteggio totale secondo regolamento H.
     
     Args:
         punteggio: punteggio totale della squadra
+        regolamento: regolamento da applicare (default: standard)
     
     Returns:
         int: numero di gol segnati
     """
-    if punteggio < 66:
-        return 0
-    elif punteggio < 72:
-        return 1
-    elif punteggio < 77:
-        return 2
-    elif punteggio < 81:
-        return 3
-    elif punteggio < 85:
-        return 4
-    else:
-        # Oltre 85: +1 gol ogni 4 punti aggiuntivi
-        punti_extra = punteggio - 85
-        gol_extra = int(punti_extra / 4)
-        return 4 + gol_extra
+    reg = risolvi_regolamento(regolamento)
+    
+    gol = cerca_in_tabella(reg.tabella_gol, punteggio)
+    
+    # Oltre la soglia extra: +1 gol ogni punti_per_gol_extra punti aggiuntivi
+    if punteggio >= reg.soglia_gol_extra:
+        punti_extra = punteggio - reg.soglia_gol_extra
+        if reg.scala > 1:
+            # Interi a punto fisso: divisione intera esatta
+            gol += punti_extra // reg.punti_per_gol_extra
+        else:
+            gol += int(punti_extra / reg.punti_per_gol_extra)
+    
+    return gol
+
+
+def calcola_gol_da_punteggio_array(
+    punteggi: np.ndarray,
+    regolamento: RegolamentoCompilato = None
+) -> np.ndarray:
+    """
+    Versione vettoriale di calcola_gol_da_punteggio (regolamento H).
+    
+    Args:
+        punteggi: array di punteggi totali
+        regolamento: regolamento da applicare (default: standard)
+    
+    Returns:
+        np.ndarray: numero di gol per ogni punteggio
+    """
+    reg = risolvi_regolamento(regolamento)
+    
+    if reg.scala > 1:
+        punteggi = np.asarray(punteggi, dtype=np.int64)
+        gol = cerca_in_tabella_array(reg.tabella_gol, punteggi).astype(np.int64)
+        punti_extra = np.maximum(punteggi - reg.soglia_gol_extra, 0)
+        return gol + punti_extra // reg.punti_per_gol_extra
+    
+    punteggi = np.asarray(punteggi, dtype=np.float64)
+    gol = cerca_in_tabella_array(reg.tabella_gol, punteggi).astype(np.int64)
+    
+    punti_extra = np.maximum(punteggi - reg.soglia_gol_extra, 0.0)
+    return gol + np.trunc(punti_extra / reg.punti_per_gol_extra).astype(np.int64)
+
+
+class AggregatiSquadra(NamedTuple):
+    """Somme di una formazione calcolate in un solo passaggio"""
+    voto_squadra: float
+    somma_difensori: float
+    num_difensori: int
+    somma_centrocampisti: float
+    num_centrocampisti: int
+    modificatore_attacco: float
+    num_attaccanti: int
+
+
+def aggrega_squadra(formazione: List[Giocatore], regolamento: RegolamentoCompilato = None) -> AggregatiSquadra:
+    """
+    Scorre una formazione una sola volta accumulando voto squadra, somme dei
+    voti base di difensori e centrocampisti e modificatore attacco, senza
+    costruire liste né record intermedi: i campi vengono letti da ogni
+    giocatore, record o dict (anche in una formazione mista). Le somme
+    seguono l'ordine della formazione.
+    
+    Args:
+        formazione: lista di GiocatorePunteggio (o dict con ruolo, voto_base, bonus_malus)
+        regolamento: regolamento da applicare (default: standard)
+    
+    Returns:
+        AggregatiSquadra: somme e conteggi per reparto
+    """
+    reg = risolvi_regolamento(regolamento)
+    tabella_attacco = reg.tabella_attacco
+    
+    voto_squadra = 0
+    somma_difensori = 0
+    num_difensori = 0
+    somma_centrocampisti = 0
+    num_centrocampisti = 0
+    mod_attacco = _zero(reg)
+    num_attaccanti = 0
+    
+    for giocatore in formazione:
+        if isinstance(giocatore, dict):
+            ruolo = giocatore['ruolo']
+            voto_base = giocatore['voto_base']
+            bonus_malus = giocatore['bonus_malus']
+        else:
+            ruolo = giocatore.ruolo
+            voto_base = giocatore.voto_base
+            bonus_malus = giocatore.bonus_malus
+        
+        voto_squadra += voto_base + bonus_malus
+        
+        if ruolo == 'D':
+            somma_difensori += voto_base
+            num_difensori += 1
+        elif ruolo == 'C':
+            somma_centrocampisti += voto_base
+            num_centrocampisti += 1
+        elif ruolo == 'A':
+            num_attaccanti += 1
+            # Modificatore attacco solo se bonus_malus totale = 0
+            if bonus_malus == 0:
+                mod_attacco += cerca_in_tabella(tabella_attacco, voto_base)
+    
+    return AggregatiSquadra(
+        voto_squadra,
+        somma_difensori,
+        num_difensori,
+        somma_centrocampisti,
+        num_centrocampisti,
+        mod_attacco,
+        num_attaccanti
+    )
 
 
 def calcola_risultato_partita(
-    formazione_casa: List[Dict],
-    formazione_trasferta: List[Dict]
+    formazione_casa: List[Giocatore],
+    formazione_trasferta: List[Giocatore],
+    regolamento: RegolamentoCompilato = None,
+    punto_fisso: bool = False
 ) -> Dict:
     """
     Calcola il risultato completo di una partita.
     
+    Con punto_fisso=True voti e regolamento vengono convertiti in interi
+    (quarti di punto) e somme, medie e soglie sono confrontate in modo
+    esatto; il risultato resta in punti, nello stesso formato.
+    
     Args:
-        formazione_casa: lista di giocatori casa con voto_base, bonus_malus, ruolo
-        formazione_trasferta: lista di giocatori trasferta con voto_base, bonus_malus, ruolo
+        formazione_casa: giocatori casa (GiocatorePunteggio o dict con voto_base, bonus_malus, ruolo)
+        formazione_trasferta: giocatori trasferta (come sopra)
+        regolamento: regolamento da applicare (default: standard)
+        punto_fisso: calcola con aritmetica intera a punto fisso
     
     Returns:
         Dict: risultato dettagliato con tutti i calcoli
+    
+    Raises:
+        ValueError: a punto fisso, se un voto o un valore del regolamento
+            non è un multiplo di un quarto di punto
     """
+    reg = risolvi_regolamento(regolamento, punto_fisso)
+    scala = reg.scala
+    if scala > 1:
+        formazione_casa = formazione_punto_fisso(formazione_casa, scala)
+        formazione_trasferta = formazione_punto_fisso(formazione_trasferta, scala)
     
-    # ===== CASA =====
+    # ===== SOMME PER SQUADRA =====
     
-    # Calcola voti totali giocatori casa
-    voti_totali_casa = []
-    voti_base_difensori_casa = []
-    voti_base_centrocampisti_casa = []
-    attaccanti_casa = []
+    casa = aggrega_squadra(formazione_casa, reg)
+    trasferta = aggrega_squadra(formazione_trasferta, reg)
     
-    for giocatore in formazione_casa:
-        voto_tot = calcola_voto_totale(
-            giocatore['voto_base'],
-            giocatore['bonus_malus']
-        )
-        voti_totali_casa.append(voto_tot)
-        
-        if giocatore['ruolo'] == 'D':
-            voti_base_difensori_casa.append(giocatore['voto_base'])
-        elif giocatore['ruolo'] == 'C':
-            voti_base_centrocampisti_casa.append(giocatore['voto_base'])
-        elif giocatore['ruolo'] == 'A':
-            attaccanti_casa.append({
-                'voto_base': giocatore['voto_base'],
-                'bonus_malus': giocatore['bonus_malus']
-            })
-    
-    # Voto totale squadra casa
-    voto_squadra_casa = calcola_voto_totale_squadra(voti_totali_casa)
-    
-    # ===== TRASFERTA =====
-    
-    # Calcola voti totali giocatori trasferta
-    voti_totali_trasferta = []
-    voti_base_difensori_trasferta = []
-    voti_base_centrocampisti_trasferta = []
-    attaccanti_trasferta = []
-    
-    for giocatore in formazione_trasferta:
-        voto_tot = calcola_voto_totale(
-            giocatore['voto_base'],
-            giocatore['bonus_malus']
-        )
-        voti_totali_trasferta.append(voto_tot)
-        
-        if giocatore['ruolo'] == 'D':
-            voti_base_difensori_trasferta.append(giocatore['voto_base'])
-        elif giocatore['ruolo'] == 'C':
-            voti_base_centrocampisti_trasferta.append(giocatore['voto_base'])
-        elif giocatore['ruolo'] == 'A':
-            attaccanti_trasferta.append({
-                'voto_base': giocatore['voto_base'],
-                'bonus_malus': giocatore['bonus_malus']
-            })
-    
-    # Voto totale squadra trasferta
-    voto_squadra_trasferta = calcola_voto_totale_squadra(voti_totali_trasferta)
+    voto_squadra_casa = casa.voto_squadra
+    voto_squadra_trasferta = trasferta.voto_squadra
     
     # ===== MODIFICATORI =====
     
     # Modificatore difesa (si applica alla squadra avversaria)
-    mod_difesa_casa = calcola_modificatore_difesa(
-        voti_base_difensori_casa,
-        len(voti_base_difensori_casa)
+    mod_difesa_casa = _modificatore_difesa(
+        casa.somma_difensori, casa.num_difensori, casa.num_difensori, reg
     )
-    mod_difesa_trasferta = calcola_modificatore_difesa(
-        voti_base_difensori_trasferta,
-        len(voti_base_difensori_trasferta)
+    mod_difesa_trasferta = _modificatore_difesa(
+        trasferta.somma_difensori, trasferta.num_difensori, trasferta.num_difensori, reg
     )
     
     # Modificatore centrocampo
-    mod_centro_casa, mod_centro_trasferta = calcola_modificatore_centrocampo(
-        voti_base_centrocampisti_casa,
-        voti_base_centrocampisti_trasferta
+    mod_centro_casa, mod_centro_trasferta = _modificatore_centrocampo(
+        casa.somma_centrocampisti,
+        casa.num_centrocampisti,
+        trasferta.somma_centrocampisti,
+        trasferta.num_centrocampisti,
+        reg
     )
     
     # Modificatore attacco
-    mod_attacco_casa = calcola_modificatore_attacco(attaccanti_casa)
-    mod_attacco_trasferta = calcola_modificatore_attacco(attaccanti_trasferta)
+    mod_attacco_casa = casa.modificatore_attacco
+    mod_attacco_trasferta = trasferta.modificatore_attacco
     
     # Vantaggio casa: +2 alla squadra di casa
-    vantaggio_casa = 2.0
-    vantaggio_trasferta = 0.0
+    vantaggio_casa = reg.vantaggio_casa
+    vantaggio_trasferta = _zero(reg)
     
     # ===== PUNTEGGI FINALI =====
     
@@ -399,37 +724,37 @@ def calcola_risultato_partita(
     )
     
     # Calcola gol
-    gol_casa = calcola_gol_da_punteggio(punteggio_casa)
-    gol_trasferta = calcola_gol_da_punteggio(punteggio_trasferta)
+    gol_casa = calcola_gol_da_punteggio(punteggio_casa, reg)
+    gol_trasferta = calcola_gol_da_punteggio(punteggio_trasferta, reg)
     
     # ===== RISULTATO =====
     
     return {
         'casa': {
-            'voto_squadra': round(voto_squadra_casa, 2),
-            'modificatore_difesa_generato': round(mod_difesa_casa, 2),
-            'modificatore_difesa_subito': round(mod_difesa_trasferta, 2),
-            'modificatore_centrocampo': round(mod_centro_casa, 2),
-            'modificatore_attacco': round(mod_attacco_casa, 2),
-            'vantaggio_casa': round(vantaggio_casa, 2),
-            'punteggio_totale': round(punteggio_casa, 2),
+            'voto_squadra': round(voto_squadra_casa / scala, 2),
+            'modificatore_difesa_generato': round(mod_difesa_casa / scala, 2),
+            'modificatore_difesa_subito': round(mod_difesa_trasferta / scala, 2),
+            'modificatore_centrocampo': round(mod_centro_casa / scala, 2),
+            'modificatore_attacco': round(mod_attacco_casa / scala, 2),
+            'vantaggio_casa': round(vantaggio_casa / scala, 2),
+            'punteggio_totale': round(punteggio_casa / scala, 2),
             'gol': gol_casa,
-            'num_difensori': len(voti_base_difensori_casa),
-            'num_centrocampisti': len(voti_base_centrocampisti_casa),
-            'num_attaccanti': len(attaccanti_casa)
+            'num_difensori': casa.num_difensori,
+            'num_centrocampisti': casa.num_centrocampisti,
+            'num_attaccanti': casa.num_attaccanti
         },
         'trasferta': {
-            'voto_squadra': round(voto_squadra_trasferta, 2),
-            'modificatore_difesa_generato': round(mod_difesa_trasferta, 2),
-            'modificatore_difesa_subito': round(mod_difesa_casa, 2),
-            'modificatore_centrocampo': round(mod_centro_trasferta, 2),
-            'modificatore_attacco': round(mod_attacco_trasferta, 2),
-            'vantaggio_casa': round(vantaggio_trasferta, 2),
-            'punteggio_totale': round(punteggio_trasferta, 2),
+            'voto_squadra': round(voto_squadra_trasferta / scala, 2),
+            'modificatore_difesa_generato': round(mod_difesa_trasferta / scala, 2),
+            'modificatore_difesa_subito': round(mod_difesa_casa / scala, 2),
+            'modificatore_centrocampo': round(mod_centro_trasferta / scala, 2),
+            'modificatore_attacco': round(mod_attacco_trasferta / scala, 2),
+            'vantaggio_casa': round(vantaggio_trasferta / scala, 2),
+            'punteggio_totale': round(punteggio_trasferta / scala, 2),
             'gol': gol_trasferta,
-            'num_difensori': len(voti_base_difensori_trasferta),
-            'num_centrocampisti': len(voti_base_centrocampisti_trasferta),
-            'num_attaccanti': len(attaccanti_trasferta)
+            'num_difensori': trasferta.num_difensori,
+            'num_centrocampisti': trasferta.num_centrocampisti,
+            'num_attaccanti': trasferta.num_attaccanti
         },
         'risultato_finale': f"{gol_casa} - {gol_trasferta}"
     }
@@ -0,0 +1,307 @@
+"""
+Motore di calcolo vettoriale del Fantacalcio.
+Calcola in un unico passaggio NumPy i risultati di tutte le partite di una
+giornata (o di un'intera stagione), con risultati identici a
+calc.calcola_risultato_partita.
+"""
+
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from calc import (
+    Giocatore,
+    campi_formazione,
+    cerca_in_tabella_array,
+    cerca_media_in_tabella_array,
+    calcola_gol_da_punteggio_array,
+    formazioni_punto_fisso_array
+)
+from regolamento import RegolamentoCompilato, risolvi_regolamento
+
+
+# Codici numerici dei ruoli usati negli array delle formazioni
+RUOLO_VUOTO = -1
+RUOLO_P = 0
+RUOLO_D = 1
+RUOLO_C = 2
+RUOLO_A = 3
+# Ruolo non riconosciuto: conta nel voto squadra ma in nessun modificatore,
+# come nel calcolo scalare
+RUOLO_ALTRO = 4
+
+CODICI_RUOLO = {'P': RUOLO_P, 'D': RUOLO_D, 'C': RUOLO_C, 'A': RUOLO_A}
+
+# Indici dell'asse squadra negli array (partite, 2, giocatori)
+CASA = 0
+TRASFERTA = 1
+
+
+def codifica_formazioni(
+    partite: List[Tuple[List[Giocatore], List[Giocatore]]],
+    num_giocatori: int = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Converte una lista di partite (coppie di formazioni come liste di
+    GiocatorePunteggio o dict) negli array usati dal motore vettoriale.
+
+    Le formazioni più corte di num_giocatori vengono completate con slot
+    vuoti (ruolo RUOLO_VUOTO, voti 0) che non influenzano il calcolo; i
+    giocatori con un ruolo non riconosciuto diventano RUOLO_ALTRO.
+
+    Args:
+        partite: lista di tuple (formazione_casa, formazione_trasferta)
+        num_giocatori: numero di slot per squadra (default: formazione più lunga)
+
+    Returns:
+        Tuple: (voti_base, bonus_malus, ruoli) con shape (partite, 2, giocatori)
+    """
+    if num_giocatori is None:
+        num_giocatori = max(
+            (len(formazione) for partita in partite for formazione in partita),
+            default=0
+        )
+
+    shape = (len(partite), 2, num_giocatori)
+    voti_base = np.zeros(shape, dtype=np.float64)
+    bonus_malus = np.zeros(shape, dtype=np.float64)
+    ruoli = np.full(shape, RUOLO_VUOTO, dtype=np.int8)
+
+    for i, partita in enumerate(partite):
+        for lato, formazione in enumerate(partita):
+            campi = campi_formazione(formazione, 'voto_base', 'bonus_malus', 'ruolo')
+            for k, (voto_base, bonus, ruolo) in enumerate(campi):
+                voti_base[i, lato, k] = voto_base
+                bonus_malus[i, lato, k] = bonus
+                ruoli[i, lato, k] = CODICI_RUOLO.get(ruolo, RUOLO_ALTRO)
+
+    return voti_base, bonus_malus, ruoli
+
+
+def calcola_partite_batch(
+    voti_base: np.ndarray,
+    bonus_malus: np.ndarray,
+    ruoli: np.ndarray,
+    regolamento: RegolamentoCompilato = None,
+    punto_fisso: bool = False
+) -> Dict[str, np.ndarray]:
+    """
+    Calcola i risultati di molte partite in un solo passaggio vettoriale.
+
+    Gli array hanno shape (..., 2, giocatori): le dimensioni iniziali sono
+    libere (es. (partite,) oppure (giornate, partite)), l'asse 2 distingue
+    casa (0) e trasferta (1). Le somme sono accumulate giocatore per giocatore
+    nello stesso ordine di calc.calcola_risultato_partita, così i risultati
+    coincidono bit per bit con il calcolo scalare.
+
+    Con punto_fisso=True i voti (sempre passati in punti) diventano interi
+    in quarti di punto e tutto il calcolo procede su array interi: somme e
+    soglie esatte, metà memoria per i voti rispetto a float64.
+
+    Args:
+        voti_base: voti base dei giocatori
+        bonus_malus: bonus/malus totali dei giocatori
+        ruoli: codici ruolo (RUOLO_P, RUOLO_D, RUOLO_C, RUOLO_A, RUOLO_ALTRO, RUOLO_VUOTO)
+        regolamento: regolamento da applicare (default: standard)
+        punto_fisso: calcola con aritmetica intera a punto fisso
+
+    Returns:
+        Dict[str, np.ndarray]: array con shape (..., 2) per ogni voce del
+        risultato (stesse chiavi del dict per squadra di calcola_risultato_partita).
+        A punto fisso i punteggi sono interi in unità di 1/scala di punto
+        (scala del regolamento compilato, vedi risultato_partita_da_batch)
+    """
+    reg = risolvi_regolamento(regolamento, punto_fisso)
+
+    if reg.scala > 1:
+        voti_base = formazioni_punto_fisso_array(voti_base, reg.scala)
+        bonus_malus = formazioni_punto_fisso_array(bonus_malus, reg.scala)
+    else:
+        voti_base = np.asarray(voti_base, dtype=np.float64)
+        bonus_malus = np.asarray(bonus_malus, dtype=np.float64)
+    ruoli = np.asarray(ruoli)
+    tipo = voti_base.dtype
+
+    forma_iniziale = voti_base.shape[:-2]
+    num_giocatori = voti_base.shape[-1]
+    voti_base = voti_base.reshape(-1, 2, num_giocatori)
+    bonus_malus = bonus_malus.reshape(-1, 2, num_giocatori)
+    ruoli = ruoli.reshape(-1, 2, num_giocatori)
+
+    forma = voti_base.shape[:2]
+
+    # ===== CONTRIBUTI DEI GIOCATORI =====
+
+    # Asse dei giocatori in testa: i contributi calcolati sotto risultano
+    # contigui giocatore per giocatore e l'accumulo scorre memoria sequenziale
+    voti_base = np.moveaxis(voti_base, -1, 0)
+    bonus_malus = np.moveaxis(bonus_malus, -1, 0)
+    ruoli = np.moveaxis(ruoli, -1, 0)
+
+    presente = ruoli != RUOLO_VUOTO
+    is_dif = ruoli == RUOLO_D
+    is_cen = ruoli == RUOLO_C
+    conta_attacco = (ruoli == RUOLO_A) & (bonus_malus == 0)
+
+    num_difensori = np.count_nonzero(is_dif, axis=0)
+    num_centrocampisti = np.count_nonzero(is_cen, axis=0)
+    num_attaccanti = np.count_nonzero(ruoli == RUOLO_A, axis=0)
+
+    # Contributo di ogni giocatore a ciascuna somma (0 se il ruolo non c'entra)
+    totali = np.where(presente, voti_base + bonus_malus, 0)
+    base_difensori = np.where(is_dif, voti_base, 0)
+    base_centrocampisti = np.where(is_cen, voti_base, 0)
+
+    # Tabella attacco consultata solo per gli attaccanti senza bonus/malus
+    bonus_attacco = np.zeros(voti_base.shape, dtype=tipo)
+    bonus_attacco[conta_attacco] = cerca_in_tabella_array(
+        reg.tabella_attacco, voti_base[conta_attacco]
+    )
+
+    # ===== ACCUMULO PER GIOCATORE =====
+
+    # Un giocatore alla volta, vettorialmente su tutte le partite: mantiene
+    # l'ordine delle somme del calcolo scalare (sommare 0.0 è esatto)
+    voto_squadra = np.zeros(forma, dtype=tipo)
+    somma_difensori = np.zeros(forma, dtype=tipo)
+    somma_centrocampisti = np.zeros(forma, dtype=tipo)
+    mod_attacco = np.zeros(forma, dtype=tipo)
+
+    for k in range(num_giocatori):
+        voto_squadra += totali[k]
+        somma_difensori += base_difensori[k]
+        somma_centrocampisti += base_centrocampisti[k]
+        mod_attacco += bonus_attacco[k]
+
+    # ===== MODIFICATORE DIFESA =====
+
+    mod_difesa = cerca_media_in_tabella_array(
+        reg.tabella_difesa, somma_difensori, num_difensori
+    ).astype(tipo)
+    # Correzioni per numero di difensori, precalcolate nel regolamento compilato
+    indice_correzione = np.minimum(num_difensori, len(reg.correzioni_difesa_array) - 1)
+    mod_difesa = mod_difesa + reg.correzioni_difesa_array[indice_correzione]
+    mod_difesa = np.where(num_difensori > 0, mod_difesa, 0)
+
+    # ===== MODIFICATORE CENTROCAMPO =====
+
+    # Il reparto con meno centrocampisti riceve il voto d'ufficio per ogni mancante
+    num_avversari = num_centrocampisti[:, ::-1]
+    mancanti = np.maximum(num_avversari - num_centrocampisti, 0)
+    for j in range(int(mancanti.max(initial=0))):
+        somma_centrocampisti += np.where(j < mancanti, reg.voto_ufficio_centrocampo, 0).astype(tipo)
+
+    somma_casa = somma_centrocampisti[:, CASA]
+    somma_trasferta = somma_centrocampisti[:, TRASFERTA]
+    differenza = np.abs(somma_casa - somma_trasferta)
+    valore = cerca_in_tabella_array(reg.tabella_centrocampo, differenza)
+
+    mod_centro_casa = np.where(
+        somma_casa > somma_trasferta, valore,
+        np.where(somma_trasferta > somma_casa, -valore, 0)
+    )
+    mod_centro_trasferta = np.where(
+        somma_casa > somma_trasferta, -valore,
+        np.where(somma_trasferta > somma_casa, valore, 0)
+    )
+    mod_centrocampo = np.stack([mod_centro_casa, mod_centro_trasferta], axis=1)
+
+    # ===== PUNTEGGI FINALI =====
+
+    # Il modificatore difesa si applica alla squadra avversaria
+    mod_difesa_subito = mod_difesa[:, ::-1]
+    vantaggio = np.zeros(forma, dtype=tipo)
+    vantaggio[:, CASA] = reg.vantaggio_casa
+
+    punteggio = (
+        voto_squadra +
+        mod_difesa_subito +
+        mod_centrocampo +
+        mod_attacco +
+        vantaggio
+    )
+
+    # ===== GOL =====
+
+    gol = calcola_gol_da_punteggio_array(punteggio, reg)
+
+    risultati = {
+        'voto_squadra': voto_squadra,
+        'modificatore_difesa_generato': mod_difesa,
+        'modificatore_difesa_subito': mod_difesa_subito,
+        'modificatore_centrocampo': mod_centrocampo,
+        'modificatore_attacco': mod_attacco,
+        'vantaggio_casa': vantaggio,
+        'punteggio_totale': punteggio,
+        'gol': gol,
+        'num_difensori': num_difensori,
+        'num_centrocampisti': num_centrocampisti,
+        'num_attaccanti': num_attaccanti
+    }
+
+    return {
+        chiave: valori.reshape(forma_iniziale + (2,))
+        for chiave, valori in risultati.items()
+    }
+
+
+def risultato_partita_da_batch(risultati: Dict[str, np.ndarray], indice, scala: int = 1) -> Dict:
+    """
+    Estrae il risultato di una singola partita dagli array del calcolo batch,
+    nello stesso formato di calc.calcola_risultato_partita.
+
+    Args:
+        risultati: output di calcola_partite_batch
+        indice: indice della partita nelle dimensioni iniziali degli array
+        scala: unità per punto dei punteggi (SCALA_PUNTO_FISSO se calcolati
+            a punto fisso)
+
+    Returns:
+        Dict: risultato dettagliato della partita
+    """
+    chiavi_float = [
+        'voto_squadra',
+        'modificatore_difesa_generato',
+        'modificatore_difesa_subito',
+        'modificatore_centrocampo',
+        'modificatore_attacco',
+        'vantaggio_casa',
+        'punteggio_totale'
+    ]
+    chiavi_int = ['gol', 'num_difensori', 'num_centrocampisti', 'num_attaccanti']
+
+    risultato = {}
+    for lato, nome in ((CASA, 'casa'), (TRASFERTA, 'trasferta')):
+        squadra = {}
+        for chiave in chiavi_float:
+            squadra[chiave] = round(float(risultati[chiave][indice][lato]) / scala, 2)
+        for chiave in chiavi_int:
+            squadra[chiave] = int(risultati[chiave][indice][lato])
+        risultato[nome] = squadra
+
+    risultato['risultato_finale'] = f"{risultato['casa']['gol']} - {risultato['trasferta']['gol']}"
+    return risultato
+
+
+def calcola_risultati_partite(
+    partite: List[Tuple[List[Giocatore], List[Giocatore]]],
+    regolamento: RegolamentoCompilato = None,
+    punto_fisso: bool = False
+) -> List[Dict]:
+    """
+    Calcola i risultati di una lista di partite con il motore vettoriale.
+
+    Args:
+        partite: lista di tuple (formazione_casa, formazione_trasferta)
+        regolamento: regolamento da applicare (default: standard)
+        punto_fisso: calcola con aritmetica intera a punto fisso
+
+    Returns:
+        List[Dict]: un risultato per partita, come calcola_risultato_partita
+    """
+    if not partite:
+        return []
+
+    reg = risolvi_regolamento(regolamento, punto_fisso)
+    risultati = calcola_partite_batch(*codifica_formazioni(partite), regolamento=reg)
+    return [risultato_partita_da_batch(risultati, i, reg.scala) for i in range(len(partite))]
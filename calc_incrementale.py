@@ -0,0 +1,396 @@
+"""
+Calcolo incrementale dei risultati.
+Mantiene per ogni squadra le somme parziali usate dal motore di calcolo, così
+la correzione di un singolo voto aggiorna il risultato della partita in O(1)
+invece di ricalcolare tutto da capo. I risultati coincidono con
+calc.calcola_risultato_partita, anche con un regolamento a punto fisso
+(compila_regolamento_punto_fisso): le somme restano in unità intere e il
+risultato viene riportato in punti.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from calc import (
+    Giocatore,
+    campi_formazione,
+    cerca_in_tabella,
+    cerca_media_in_tabella,
+    correzione_numero_difensori,
+    calcola_gol_da_punteggio
+)
+from regolamento import RegolamentoCompilato, in_punto_fisso, risolvi_regolamento
+
+
+LATI = ('casa', 'trasferta')
+AVVERSARIO = {'casa': 'trasferta', 'trasferta': 'casa'}
+
+
+def _multiplo_di_quarto(valore: float) -> bool:
+    """
+    True se il valore è un multiplo di 0.25: somme e differenze di questi
+    valori sono esatte in virgola mobile, in qualunque ordine.
+    """
+    return float(valore * 4).is_integer()
+
+
+class ParzialiSquadra:
+    """
+    Somme parziali di una formazione: voti totali, voti base di difensori e
+    centrocampisti e contributi al modificatore attacco, nelle unità del
+    regolamento (interi in 1/scala di punto a punto fisso).
+    """
+
+    __slots__ = (
+        'reg', 'zero', 'ruoli', 'voti_base', 'bonus_malus',
+        'num_difensori', 'num_centrocampisti', 'num_attaccanti',
+        'voto_squadra', 'somma_difensori', 'somma_centrocampisti', 'mod_attacco', 'esatto'
+    )
+
+    def __init__(self, formazione: List[Giocatore], reg: RegolamentoCompilato):
+        self.reg = reg
+        self.zero = 0 if reg.scala > 1 else 0.0
+        self.ruoli = list(campi_formazione(formazione, 'ruolo'))
+        self.voti_base = [self.in_unita(v) for v in campi_formazione(formazione, 'voto_base')]
+        self.bonus_malus = [self.in_unita(v) for v in campi_formazione(formazione, 'bonus_malus')]
+        self.num_difensori = self.ruoli.count('D')
+        self.num_centrocampisti = self.ruoli.count('C')
+        self.num_attaccanti = self.ruoli.count('A')
+        self.ricalcola()
+
+    def in_unita(self, valore: float):
+        """
+        Converte un voto nelle unità del regolamento.
+
+        Raises:
+            ValueError: a punto fisso, se il voto non è un multiplo di 1/scala di punto
+        """
+        if self.reg.scala > 1:
+            return in_punto_fisso(valore, self.reg.scala)
+        return valore
+
+    def _contributo_attacco(self, indice: int) -> float:
+        if self.ruoli[indice] != 'A' or self.bonus_malus[indice] != 0:
+            return self.zero
+        return cerca_in_tabella(self.reg.tabella_attacco, self.voti_base[indice])
+
+    def ricalcola(self):
+        """Ricalcola tutte le somme nell'ordine della formazione (come calc.py)"""
+        self.voto_squadra = 0
+        self.somma_difensori = 0
+        self.somma_centrocampisti = 0
+        self.mod_attacco = self.zero
+
+        for i, ruolo in enumerate(self.ruoli):
+            self.voto_squadra += self.voti_base[i] + self.bonus_malus[i]
+            if ruolo == 'D':
+                self.somma_difensori += self.voti_base[i]
+            elif ruolo == 'C':
+                self.somma_centrocampisti += self.voti_base[i]
+            elif ruolo == 'A':
+                self.mod_attacco += self._contributo_attacco(i)
+
+        # Finché tutti i valori sono multipli di 0.25 gli aggiornamenti
+        # sottrai/somma restano esatti
+        self.esatto = all(
+            _multiplo_di_quarto(v) for v in self.voti_base + self.bonus_malus
+        )
+
+    def aggiorna(self, indice: int, voto_base: float = None, bonus_malus: float = None):
+        """
+        Aggiorna il voto di un giocatore correggendo solo le somme coinvolte.
+
+        Se il vecchio o il nuovo valore non è un multiplo di 0.25 le somme
+        vengono ricalcolate nell'ordine della formazione, per restare
+        identiche al calcolo completo.
+
+        Args:
+            indice: posizione del giocatore nella formazione (da 0)
+            voto_base: nuovo voto base in punti (None = invariato)
+            bonus_malus: nuovo bonus/malus in punti (None = invariato)
+        """
+        vecchio_base = self.voti_base[indice]
+        vecchio_bonus = self.bonus_malus[indice]
+        nuovo_base = vecchio_base if voto_base is None else self.in_unita(voto_base)
+        nuovo_bonus = vecchio_bonus if bonus_malus is None else self.in_unita(bonus_malus)
+
+        if nuovo_base == vecchio_base and nuovo_bonus == vecchio_bonus:
+            return
+
+        vecchio_attacco = self._contributo_attacco(indice)
+        self.voti_base[indice] = nuovo_base
+        self.bonus_malus[indice] = nuovo_bonus
+
+        if not (self.esatto and _multiplo_di_quarto(nuovo_base) and _multiplo_di_quarto(nuovo_bonus)):
+            self.ricalcola()
+            return
+
+        ruolo = self.ruoli[indice]
+        self.voto_squadra += (nuovo_base + nuovo_bonus) - (vecchio_base + vecchio_bonus)
+        if ruolo == 'D':
+            self.somma_difensori += nuovo_base - vecchio_base
+        elif ruolo == 'C':
+            self.somma_centrocampisti += nuovo_base - vecchio_base
+        elif ruolo == 'A':
+            self.mod_attacco += self._contributo_attacco(indice) - vecchio_attacco
+
+    def modificatore_difesa(self) -> float:
+        """Modificatore difesa generato (regolamento D)"""
+        if self.num_difensori == 0:
+            return self.zero
+        modificatore = cerca_media_in_tabella(self.reg.tabella_difesa, self.somma_difensori, self.num_difensori)
+        modificatore += correzione_numero_difensori(self.num_difensori, self.reg)
+        if self.reg.scala > 1:
+            return modificatore
+        return float(modificatore)
+
+
+class PartitaIncrementale:
+    """
+    Risultato di una partita aggiornabile un voto alla volta.
+
+    Le formazioni sono liste di GiocatorePunteggio (o dict con 'ruolo',
+    'voto_base' e 'bonus_malus'), come per calc.calcola_risultato_partita.
+    """
+
+    def __init__(
+        self,
+        formazione_casa: List[Giocatore],
+        formazione_trasferta: List[Giocatore],
+        regolamento: RegolamentoCompilato = None
+    ):
+        self.reg = risolvi_regolamento(regolamento)
+        self.squadre = {
+            'casa': ParzialiSquadra(formazione_casa, self.reg),
+            'trasferta': ParzialiSquadra(formazione_trasferta, self.reg)
+        }
+        self._risultato = None
+        self._aggiorna_punteggi()
+
+    def aggiorna_voto(
+        self,
+        lato: str,
+        indice: int,
+        voto_base: float = None,
+        bonus_malus: float = None
+    ) -> Tuple[int, int]:
+        """
+        Aggiorna il voto di un giocatore e restituisce i nuovi gol.
+        Il risultato dettagliato si ottiene con risultato().
+
+        Args:
+            lato: 'casa' o 'trasferta'
+            indice: posizione del giocatore nella formazione (da 0)
+            voto_base: nuovo voto base (None = invariato)
+            bonus_malus: nuovo bonus/malus (None = invariato)
+
+        Returns:
+            Tuple[int, int]: (gol casa, gol trasferta)
+        """
+        if lato not in self.squadre:
+            raise ValueError(f"Lato non valido: {lato}")
+
+        self.squadre[lato].aggiorna(indice, voto_base, bonus_malus)
+        self._aggiorna_punteggi()
+        return self.gol['casa'], self.gol['trasferta']
+
+    def _modificatori_centrocampo(self) -> Tuple[float, float]:
+        """Modificatore centrocampo (regolamento E) dalle somme parziali"""
+        casa = self.squadre['casa']
+        trasferta = self.squadre['trasferta']
+
+        somma_casa = casa.somma_centrocampisti
+        somma_trasferta = trasferta.somma_centrocampisti
+
+        # Voto d'ufficio per ogni centrocampista mancante, sommato uno alla volta
+        for _ in range(trasferta.num_centrocampisti - casa.num_centrocampisti):
+            somma_casa += self.reg.voto_ufficio_centrocampo
+        for _ in range(casa.num_centrocampisti - trasferta.num_centrocampisti):
+            somma_trasferta += self.reg.voto_ufficio_centrocampo
+
+        valore = cerca_in_tabella(self.reg.tabella_centrocampo, abs(somma_casa - somma_trasferta))
+
+        if somma_casa > somma_trasferta:
+            return (valore, -valore)
+        elif somma_trasferta > somma_casa:
+            return (-valore, valore)
+        return (casa.zero, casa.zero)
+
+    def _aggiorna_punteggi(self):
+        """Ricompone modificatori, punteggi e gol dalle somme parziali"""
+        self.mod_difesa = {lato: self.squadre[lato].modificatore_difesa() for lato in LATI}
+        self.mod_centrocampo = dict(zip(LATI, self._modificatori_centrocampo()))
+        self.vantaggio = {'casa': self.reg.vantaggio_casa, 'trasferta': self.squadre['trasferta'].zero}
+
+        self.punteggi = {}
+        self.gol = {}
+        for lato in LATI:
+            squadra = self.squadre[lato]
+            self.punteggi[lato] = (
+                squadra.voto_squadra +
+                self.mod_difesa[AVVERSARIO[lato]] +
+                self.mod_centrocampo[lato] +
+                squadra.mod_attacco +
+                self.vantaggio[lato]
+            )
+            self.gol[lato] = calcola_gol_da_punteggio(self.punteggi[lato], self.reg)
+
+        self._risultato = None
+
+    def risultato(self) -> Dict:
+        """
+        Restituisce il risultato della partita nello stesso formato di
+        calc.calcola_risultato_partita.
+
+        Returns:
+            Dict: risultato dettagliato con tutti i calcoli
+        """
+        if self._risultato is not None:
+            return self._risultato
+
+        # Somme e modificatori sono nelle unità del regolamento: il risultato è in punti
+        scala = self.reg.scala
+        risultato = {}
+        for lato in LATI:
+            squadra = self.squadre[lato]
+            risultato[lato] = {
+                'voto_squadra': round(squadra.voto_squadra / scala, 2),
+                'modificatore_difesa_generato': round(self.mod_difesa[lato] / scala, 2),
+                'modificatore_difesa_subito': round(self.mod_difesa[AVVERSARIO[lato]] / scala, 2),
+                'modificatore_centrocampo': round(self.mod_centrocampo[lato] / scala, 2),
+                'modificatore_attacco': round(squadra.mod_attacco / scala, 2),
+                'vantaggio_casa': round(self.vantaggio[lato] / scala, 2),
+                'punteggio_totale': round(self.punteggi[lato] / scala, 2),
+                'gol': self.gol[lato],
+                'num_difensori': squadra.num_difensori,
+                'num_centrocampisti': squadra.num_centrocampisti,
+                'num_attaccanti': squadra.num_attaccanti
+            }
+
+        risultato['risultato_finale'] = f"{self.gol['casa']} - {self.gol['trasferta']}"
+        self._risultato = risultato
+        return risultato
+
+
+class RegistroLive:
+    """
+    Registro delle partite seguite in diretta: collega l'id di ogni riga di
+    formazione alla sua partita, così un voto salvato aggiorna subito il
+    risultato senza rileggere le formazioni.
+    """
+
+    def __init__(self):
+        self.partite: Dict[int, PartitaIncrementale] = {}
+        self.formazioni: Dict[int, Dict[str, List[int]]] = {}
+        self.posizioni: Dict[int, Tuple[int, str, int]] = {}
+
+    def registra_partita(
+        self,
+        partita_id: int,
+        formazione_casa: List[Giocatore],
+        formazione_trasferta: List[Giocatore],
+        regolamento: RegolamentoCompilato = None
+    ) -> PartitaIncrementale:
+        """
+        Registra (o sostituisce) una partita.
+
+        Args:
+            partita_id: id della partita
+            formazione_casa: giocatori casa (con 'id' della riga di formazione)
+            formazione_trasferta: giocatori trasferta (come sopra)
+            regolamento: regolamento da applicare (default: standard)
+
+        Returns:
+            PartitaIncrementale: la partita registrata
+        """
+        self.rimuovi_partita(partita_id)
+
+        partita = PartitaIncrementale(formazione_casa, formazione_trasferta, regolamento)
+        self.partite[partita_id] = partita
+        self.formazioni[partita_id] = {}
+
+        for lato, formazione in zip(LATI, (formazione_casa, formazione_trasferta)):
+            self.formazioni[partita_id][lato] = list(campi_formazione(formazione, 'id'))
+            for indice, formazione_id in enumerate(self.formazioni[partita_id][lato]):
+                self.posizioni[formazione_id] = (partita_id, lato, indice)
+
+        return partita
+
+    def rimuovi_partita(self, partita_id: int):
+        """Dimentica una partita (es. dopo la modifica di una formazione)"""
+        if partita_id not in self.partite:
+            return
+        for ids in self.formazioni.pop(partita_id).values():
+            for formazione_id in ids:
+                self.posizioni.pop(formazione_id, None)
+        del self.partite[partita_id]
+
+    def aggiorna_voto(
+        self,
+        formazione_id: int,
+        voto_base: float = None,
+        bonus_malus: float = None
+    ) -> Optional[Tuple[int, Tuple[int, int]]]:
+        """
+        Applica un voto salvato alla partita che contiene il giocatore.
+
+        Args:
+            formazione_id: id della riga di formazione aggiornata
+            voto_base: nuovo voto base (None = invariato)
+            bonus_malus: nuovo bonus/malus (None = invariato)
+
+        Returns:
+            Tuple (partita_id, (gol casa, gol trasferta)) oppure None se la
+            partita non è registrata
+        """
+        posizione = self.posizioni.get(formazione_id)
+        if posizione is None:
+            return None
+
+        partita_id, lato, indice = posizione
+        gol = self.partite[partita_id].aggiorna_voto(lato, indice, voto_base, bonus_malus)
+        return partita_id, gol
+
+    def ottieni(
+        self,
+        partita_id: int,
+        formazione_casa: List[Giocatore],
+        formazione_trasferta: List[Giocatore],
+        regolamento: RegolamentoCompilato = None
+    ) -> PartitaIncrementale:
+        """
+        Restituisce la partita registrata allineata alle formazioni indicate.
+
+        Se giocatori o regolamento sono cambiati la partita viene registrata
+        di nuovo; altrimenti eventuali voti diversi (salvati senza passare dal
+        registro) vengono applicati incrementalmente.
+
+        Args:
+            partita_id: id della partita
+            formazione_casa: giocatori casa (con 'id', 'ruolo', 'voto_base', 'bonus_malus')
+            formazione_trasferta: giocatori trasferta (come sopra)
+            regolamento: regolamento da applicare (default: standard)
+
+        Returns:
+            PartitaIncrementale: partita aggiornata
+        """
+        reg = risolvi_regolamento(regolamento)
+        partita = self.partite.get(partita_id)
+        formazioni = {'casa': formazione_casa, 'trasferta': formazione_trasferta}
+
+        stessi_giocatori = partita is not None and partita.reg is reg and all(
+            self.formazioni[partita_id][lato] == list(campi_formazione(formazioni[lato], 'id')) and
+            partita.squadre[lato].ruoli == list(campi_formazione(formazioni[lato], 'ruolo'))
+            for lato in LATI
+        )
+        if not stessi_giocatori:
+            return self.registra_partita(partita_id, formazione_casa, formazione_trasferta, reg)
+
+        for lato in LATI:
+            squadra = partita.squadre[lato]
+            voti = campi_formazione(formazioni[lato], 'voto_base', 'bonus_malus')
+            for indice, (voto_base, bonus_malus) in enumerate(voti):
+                if (squadra.voti_base[indice] != squadra.in_unita(voto_base) or
+                        squadra.bonus_malus[indice] != squadra.in_unita(bonus_malus)):
+                    partita.aggiorna_voto(lato, indice, voto_base, bonus_malus)
+
+        return partita
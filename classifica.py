@@ -0,0 +1,188 @@
+"""
+Modulo per la classifica del campionato.
+La classifica è materializzata nel database e aggiornata in modo incrementale
+a ogni risultato: ricalcolare una partita storna il vecchio risultato e somma
+il nuovo, senza ripercorrere la stagione.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+from calc import calcola_risultato_partita
+from calc_batch import calcola_partite_batch, codifica_formazioni
+from regolamento import RegolamentoCompilato
+
+
+def partita_conteggiabile(dati: Dict) -> bool:
+    """
+    True se una partita entra in classifica: entrambe le formazioni complete
+    e almeno un voto inserito. È l'unica regola usata sia dagli aggiornamenti
+    incrementali sia dalla ricostruzione, così le due classifiche coincidono.
+
+    Args:
+        dati: partita nel formato di DatabaseManager.get_formazioni_stagione
+            (almeno 'formazioni' e 'con_voti')
+
+    Returns:
+        bool: True se la partita va conteggiata
+    """
+    return dati['con_voti'] and all(len(f) == 11 for f in dati['formazioni'].values())
+
+
+def registra_risultato(db, partita_id: int, risultato: Dict, commit: bool = True):
+    """
+    Aggiorna la classifica con il risultato di una partita.
+
+    Args:
+        db: DatabaseManager
+        partita_id: ID della partita
+        risultato: risultato nel formato di calc.calcola_risultato_partita
+        commit: se False lascia la transazione aperta (più partite in blocco)
+
+    Returns:
+        RisultatoPartita: risultato registrato
+    """
+    return db.registra_risultato_partita(
+        partita_id,
+        risultato['casa']['gol'],
+        risultato['trasferta']['gol'],
+        risultato['casa']['punteggio_totale'],
+        risultato['trasferta']['punteggio_totale'],
+        commit=commit
+    )
+
+
+def ricalcola_partita(
+    db,
+    partita_id: int,
+    regolamento: RegolamentoCompilato = None
+) -> Optional[Dict]:
+    """
+    Ricalcola una partita e ne aggiorna il contributo in classifica.
+    Se la partita non è conteggiabile (formazione incompleta o nessun voto
+    inserito) viene tolta dalla classifica.
+
+    Args:
+        db: DatabaseManager
+        partita_id: ID della partita
+        regolamento: regolamento da applicare (default: standard)
+
+    Returns:
+        Dict: risultato della partita, oppure None se non conteggiata
+    """
+    partite = db.get_formazioni_stagione(partite_ids=[partita_id])
+
+    if not partite or not partita_conteggiabile(partite[0]):
+        db.rimuovi_risultato_partita(partita_id)
+        return None
+
+    formazioni = partite[0]['formazioni']
+    risultato = calcola_risultato_partita(formazioni['casa'], formazioni['trasferta'], regolamento)
+    registra_risultato(db, partita_id, risultato)
+    return risultato
+
+
+def ricalcola_partite(
+    db,
+    partite_ids: Iterable[int],
+    regolamento: RegolamentoCompilato = None,
+    commit: bool = True
+) -> int:
+    """
+    Ricalcola in blocco, con il motore vettoriale, le partite indicate e ne
+    aggiorna il contributo in classifica in un'unica transazione. Come
+    ricalcola_partita, le partite non conteggiabili escono dalla classifica.
+
+    Args:
+        db: DatabaseManager
+        partite_ids: ID delle partite da ricalcolare
+        regolamento: regolamento da applicare (default: standard)
+        commit: se False lascia la transazione aperta
+
+    Returns:
+        int: numero di partite conteggiate
+    """
+    partite = []
+    for dati in db.get_formazioni_stagione(partite_ids=partite_ids):
+        if partita_conteggiabile(dati):
+            partite.append(dati)
+        else:
+            db.rimuovi_risultato_partita(dati['partita_id'], commit=False)
+
+    if partite:
+        calcolati = calcola_partite_batch(
+            *codifica_formazioni([(d['formazioni']['casa'], d['formazioni']['trasferta']) for d in partite]),
+            regolamento=regolamento
+        )
+        for i, dati in enumerate(partite):
+            gol_casa, gol_trasferta = calcolati['gol'][i]
+            punteggio_casa, punteggio_trasferta = calcolati['punteggio_totale'][i]
+            db.registra_risultato_partita(
+                dati['partita_id'], gol_casa, gol_trasferta, punteggio_casa, punteggio_trasferta, commit=False
+            )
+
+    if commit:
+        db.session.commit()
+    return len(partite)
+
+
+def ricostruisci_classifica(db, regolamento: RegolamentoCompilato = None) -> int:
+    """
+    Ricostruisce la classifica da zero con il motore vettoriale.
+    Conta le partite conteggiabili (partita_conteggiabile). Serve dopo un cambio di regolamento o per i database creati
+    prima della classifica; negli altri casi basta ricalcola_partita.
+
+    Args:
+        db: DatabaseManager
+        regolamento: regolamento da applicare (default: standard)
+
+    Returns:
+        int: numero di partite conteggiate
+    """
+    partite = [dati for dati in db.get_formazioni_stagione() if partita_conteggiabile(dati)]
+
+    risultati = []
+    if partite:
+        calcolati = calcola_partite_batch(
+            *codifica_formazioni([(d['formazioni']['casa'], d['formazioni']['trasferta']) for d in partite]),
+            regolamento=regolamento
+        )
+        for i, dati in enumerate(partite):
+            gol_casa, gol_trasferta = calcolati['gol'][i]
+            punteggio_casa, punteggio_trasferta = calcolati['punteggio_totale'][i]
+            risultati.append((dati['partita_id'], gol_casa, gol_trasferta, punteggio_casa, punteggio_trasferta))
+
+    return db.ricostruisci_classifica(risultati)
+
+
+def tabella_classifica(db) -> pd.DataFrame:
+    """
+    Restituisce la classifica come tabella pronta da mostrare.
+
+    Args:
+        db: DatabaseManager
+
+    Returns:
+        pd.DataFrame: una riga per squadra in ordine di classifica
+    """
+    righe = db.get_classifica()
+    return pd.DataFrame(
+        [
+            {
+                'Pos': posizione,
+                'Squadra': r.squadra,
+                'Pt': r.punti,
+                'G': r.giocate,
+                'V': r.vinte,
+                'N': r.pareggiate,
+                'P': r.perse,
+                'GF': r.gol_fatti,
+                'GS': r.gol_subiti,
+                'DR': r.differenza_reti,
+                'Fantapunti': round(r.punteggio_totale, 2)
+            }
+            for posizione, r in enumerate(righe, 1)
+        ],
+        columns=['Pos', 'Squadra', 'Pt', 'G', 'V', 'N', 'P', 'GF', 'GS', 'DR', 'Fantapunti']
+    )
@@ -3,12 +3,23 @@ Modulo per la gestione del database SQLite.
 Gestisce la persistenza di giornate, partite, formazioni e voti.
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import (
+    create_engine, event, insert, update, case, func, select,
+    Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, Index, UniqueConstraint
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+import json
 import os
 
+from calc import GiocatorePunteggio, calcola_bonus_malus_da_eventi
+from indice_nomi import IndiceNomi, normalizza_nome
+from regolamento import (
+    EVENTI_BONUS_MALUS, PUNTI_VITTORIA, PUNTI_PAREGGIO,
+    regolamento_a_dict, regolamento_da_dict, risolvi_regolamento
+)
+
 Base = declarative_base()
 
 
@@ -40,6 +51,7 @@ class Partita(Base):
     # Relazioni
     giornata = relationship("Giornata", back_populates="partite")
     formazioni = relationship("Formazione", back_populates="partita", cascade="all, delete-orphan")
+    risultato = relationship("RisultatoPartita", uselist=False, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Partita {self.squadra_casa} vs {self.squadra_trasferta}>"
@@ -101,13 +113,245 @@ class Voto(Base):
         return f"<Voto {self.voto_base} + {self.bonus_malus_totale}>"
 
 
+class RisultatoPartita(Base):
+    """Ultimo risultato di una partita conteggiato in classifica"""
+    __tablename__ = 'risultati_partite'
+    
+    id = Column(Integer, primary_key=True)
+    partita_id = Column(Integer, ForeignKey('partite.id'), nullable=False, unique=True)
+    gol_casa = Column(Integer, nullable=False)
+    gol_trasferta = Column(Integer, nullable=False)
+    punteggio_casa = Column(Float, nullable=False)
+    punteggio_trasferta = Column(Float, nullable=False)
+    data_calcolo = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<RisultatoPartita {self.partita_id}: {self.gol_casa} - {self.gol_trasferta}>"
+
+
+class Classifica(Base):
+    """Riga della classifica di una squadra, aggiornata a ogni risultato"""
+    __tablename__ = 'classifica'
+    
+    id = Column(Integer, primary_key=True)
+    squadra = Column(String(100), nullable=False, unique=True)
+    punti = Column(Integer, nullable=False, default=0)
+    giocate = Column(Integer, nullable=False, default=0)
+    vinte = Column(Integer, nullable=False, default=0)
+    pareggiate = Column(Integer, nullable=False, default=0)
+    perse = Column(Integer, nullable=False, default=0)
+    gol_fatti = Column(Integer, nullable=False, default=0)
+    gol_subiti = Column(Integer, nullable=False, default=0)
+    differenza_reti = Column(Integer, nullable=False, default=0)
+    punteggio_totale = Column(Float, nullable=False, default=0.0)
+    
+    # Indice nell'ordine della classifica: la lettura non richiede ordinamenti
+    __table_args__ = (
+        Index(
+            'ix_classifica_ordine',
+            punti.desc(),
+            differenza_reti.desc(),
+            gol_fatti.desc(),
+            punteggio_totale.desc(),
+            squadra
+        ),
+    )
+    
+    def __repr__(self):
+        return f"<Classifica {self.squadra}: {self.punti} punti>"
+
+
+class RegolamentoLega(Base):
+    """Rappresenta un regolamento di calcolo salvato (in formato JSON)"""
+    __tablename__ = 'regolamenti'
+    
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(100), nullable=False, unique=True)
+    contenuto = Column(Text, nullable=False)
+    attivo = Column(Boolean, default=False)
+    data_modifica = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __repr__(self):
+        return f"<RegolamentoLega {self.nome}{' (attivo)' if self.attivo else ''}>"
+
+
+class VotoUfficiale(Base):
+    """
+    Voto ufficiale di un giocatore in una giornata, come letto dal file dei voti.
+    Legato al numero di giornata (non all'ID) e al nome normalizzato: i voti
+    possono essere importati prima di creare giornata e formazioni.
+    """
+    __tablename__ = 'voti_ufficiali'
+    
+    id = Column(Integer, primary_key=True)
+    giornata = Column(Integer, nullable=False)  # numero della giornata
+    nome = Column(String(100), nullable=False)
+    nome_normalizzato = Column(String(100), nullable=False)
+    ruolo = Column(String(1))
+    
+    voto_base = Column(Float, nullable=False, default=6.0)
+    gol_fatti = Column(Integer, nullable=False, default=0)
+    gol_subiti = Column(Integer, nullable=False, default=0)
+    rigori_parati = Column(Integer, nullable=False, default=0)
+    rigori_fatti = Column(Integer, nullable=False, default=0)
+    rigori_sbagliati = Column(Integer, nullable=False, default=0)
+    autogol = Column(Integer, nullable=False, default=0)
+    ammonizioni = Column(Integer, nullable=False, default=0)
+    espulsioni = Column(Integer, nullable=False, default=0)
+    assist = Column(Integer, nullable=False, default=0)
+    note = Column(String(50), default="")
+    
+    # Indice della join con le formazioni: (giornata, normalizza_nome(giocatore), ruolo);
+    # due omonimi di ruoli diversi sono righe distinte
+    __table_args__ = (
+        UniqueConstraint('giornata', 'nome_normalizzato', 'ruolo', name='uq_voti_ufficiali_giornata_nome_ruolo'),
+    )
+    
+    def __repr__(self):
+        return f"<VotoUfficiale G{self.giornata} {self.nome}: {self.voto_base}>"
+
+
+# Colonne degli eventi del file dei voti -> campi di Voto e VotoUfficiale
+CAMPI_EVENTI = {
+    'gf': 'gol_fatti',
+    'gs': 'gol_subiti',
+    'rp': 'rigori_parati',
+    'rf': 'rigori_fatti',
+    'rs': 'rigori_sbagliati',
+    'au': 'autogol',
+    'amm': 'ammonizioni',
+    'esp': 'espulsioni',
+    'ass': 'assist'
+}
+
+
+# Pragma applicati a ogni nuova connessione SQLite. Con il WAL i lettori
+# (le altre sessioni Streamlit) non aspettano chi scrive i voti e, con
+# synchronous=NORMAL, il commit non attende più l'fsync del file principale.
+PROFILO_SQLITE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -32000,       # in KiB se negativo: 32 MB
+    'mmap_size': 268435456,     # 256 MB
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000        # ms di attesa se il database è bloccato
+}
+
+
+def _crea_engine(db_path, profilo=None):
+    """
+    Engine SQLite con la funzione normalizza_nome disponibile nelle query
+    e i pragma del profilo applicati a ogni connessione.
+    
+    Args:
+        db_path: percorso del file del database
+        profilo: dict pragma -> valore (default: PROFILO_SQLITE; {} per i
+            valori predefiniti di SQLite)
+    """
+    profilo = PROFILO_SQLITE if profilo is None else profilo
+    engine = create_engine(f'sqlite:///{db_path}')
+    
+    @event.listens_for(engine, 'connect')
+    def _configura_connessione(connessione, _):
+        connessione.create_function('normalizza_nome', 1, normalizza_nome, deterministic=True)
+        cursore = connessione.cursor()
+        for pragma, valore in profilo.items():
+            cursore.execute(f"PRAGMA {pragma}={valore}")
+        cursore.close()
+    
+    return engine
+
+
+def _bonus_malus_sql(reg, ruolo):
+    """
+    Espressione SQL del bonus/malus di un VotoUfficiale: stessi pesi e stesso
+    ordine di somma di calcola_bonus_malus_da_eventi, con il ruolo della formazione.
+    """
+    termini = [getattr(VotoUfficiale, evento) * peso for evento, peso in zip(EVENTI_BONUS_MALUS, reg.pesi_eventi)]
+    bonus_malus = termini[0]
+    for termine in termini[1:]:
+        bonus_malus = bonus_malus + termine
+    
+    portiere = bonus_malus + VotoUfficiale.gol_subiti * reg.gol_subiti_portiere
+    return case(
+        (ruolo != 'P', bonus_malus),
+        (VotoUfficiale.gol_subiti == 0, portiere + reg.porta_inviolata),
+        else_=portiere
+    )
+
+
+def voto_inserito(voto) -> bool:
+    """True se il voto è stato importato o inserito (non è quello di default)"""
+    return voto is not None and (
+        voto.voto_base != 6.0 or
+        (voto.bonus_malus_totale or 0.0) != 0.0 or
+        bool(voto.note) or
+        bool(voto.is_manual_override)
+    )
+
+
+# Esito di ciascuna riga di DatabaseManager.aggiorna_voti_batch
+VOTO_AGGIORNATO = 'aggiornato'
+VOTO_CREATO = 'creato'
+VOTO_MANUALE = 'manuale'
+VOTO_NON_TROVATO = 'non_trovato'
+
+# Nomi dei parametri di update_voto accettati anche nelle scritture in blocco
+ALIAS_CAMPI_VOTO = {'bonus_malus': 'bonus_malus_totale', 'is_manual': 'is_manual_override'}
+
+
+def _valori_voto(aggiornamento):
+    """
+    Separa formazione_id dai campi di Voto da scrivere, scartando i valori
+    None o NaN e convertendo i tipi numpy in tipi Python.
+    
+    Returns:
+        Tuple: (formazione_id, dict campo -> valore)
+    """
+    valori = {}
+    formazione_id = None
+    for campo, valore in aggiornamento.items():
+        if hasattr(valore, 'item'):
+            valore = valore.item()
+        if campo == 'formazione_id':
+            formazione_id = int(valore)
+            continue
+        if valore is None or valore != valore:
+            continue
+        campo = ALIAS_CAMPI_VOTO.get(campo, campo)
+        if campo not in Voto.__table__.columns or campo in ('id', 'formazione_id'):
+            raise ValueError(f"Campo del voto sconosciuto: {campo}")
+        valori[campo] = valore
+    
+    if formazione_id is None:
+        raise ValueError("Ogni aggiornamento deve indicare 'formazione_id'")
+    return formazione_id, valori
+
+
+def _voto_da_ufficiale(voto, formazione_id, ruolo, reg):
+    """Aggiornamento (formato aggiorna_voti_bulk) con un VotoUfficiale e il ruolo in formazione"""
+    eventi = {campo: getattr(voto, campo) for campo in CAMPI_EVENTI.values()}
+    return dict(
+        eventi,
+        formazione_id=formazione_id,
+        voto_base=voto.voto_base,
+        bonus_malus_totale=calcola_bonus_malus_da_eventi(**eventi, ruolo=ruolo, regolamento=reg),
+        note=voto.note or ''
+    )
+
+
 class DatabaseManager:
     """Gestisce le operazioni sul database"""
     
-    def __init__(self, db_path='fantacalcio.db'):
+    def __init__(self, db_path='fantacalcio.db', profilo_sqlite=None):
         """
         Inizializza la connessione al database.
         Rileva automaticamente l'ambiente e salva nel percorso corretto.
+        
+        Args:
+            db_path: nome o percorso del file del database
+            profilo_sqlite: pragma applicati a ogni connessione
+                (default: PROFILO_SQLITE)
         """
         # Rileva se siamo su Streamlit Cloud
         is_streamlit_cloud = (
@@ -133,7 +377,8 @@ class DatabaseManager:
             db_path = f'data/{db_path}'
         
         self.db_path = db_path
-        self.engine = create_engine(f'sqlite:///{db_path}')
+        self.profilo_sqlite = profilo_sqlite
+        self.engine = _crea_engine(db_path, profilo_sqlite)
         Base.metadata.create_all(self.engine)
         Session = sessionmaker(bind=self.engine)
         self.session = Session()
@@ -163,6 +408,11 @@ class DatabaseManager:
         # Chiudi e riapri la connessione per assicurare flush
         self.session.close()
         
+        # In modalità WAL i commit recenti sono ancora nel file -wal:
+        # vanno riportati nel file principale prima di copiarlo
+        with self.engine.connect() as connessione:
+            connessione.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        
         # Copia il file database
         shutil.copy2(self.db_path, backup_path)
         
@@ -191,11 +441,16 @@ class DatabaseManager:
         self.session.close()
         self.engine.dispose()
         
+        # Un file -wal rimasto verrebbe applicato al database ripristinato
+        for suffisso in ('-wal', '-shm'):
+            if os.path.exists(self.db_path + suffisso):
+                os.remove(self.db_path + suffisso)
+        
         # Ripristina il database
         shutil.copy2(backup_path, self.db_path)
         
         # Riapri la connessione
-        self.engine = create_engine(f'sqlite:///{self.db_path}')
+        self.engine = _crea_engine(self.db_path, self.profilo_sqlite)
         Session = sessionmaker(bind=self.engine)
         self.session = Session()
         
@@ -315,6 +570,97 @@ class DatabaseManager:
         self.session.commit()
         return formazione
     
+    def add_formazione_bulk(self, partita_id, squadra, giocatori, sostituisci=False, commit=True):
+        """
+        Inserisce in blocco la formazione di una squadra (vedi add_formazioni_giornata).
+        
+        Args:
+            partita_id: ID della partita
+            squadra: 'casa' o 'trasferta'
+            giocatori: lista di dict con 'nome', 'ruolo' e, opzionale,
+                'posizione' (default: ordine della lista, da 1)
+            sostituisci: se True elimina prima la formazione esistente
+            commit: se False lascia la transazione aperta
+        
+        Returns:
+            List[int]: ID delle righe di formazione create, in ordine
+        """
+        return self.add_formazioni_giornata(
+            [(partita_id, squadra, giocatori)], sostituisci=sostituisci, commit=commit
+        )
+    
+    def add_formazioni_giornata(self, formazioni, sostituisci=False, commit=True):
+        """
+        Inserisce più formazioni (es. tutte quelle di una giornata) in
+        un'unica transazione: un INSERT in executemany per le formazioni e
+        uno per i voti vuoti associati, invece di un commit per giocatore.
+        
+        Args:
+            formazioni: lista di tuple (partita_id, squadra, giocatori), con
+                giocatori come in add_formazione_bulk
+            sostituisci: se True elimina prima le formazioni esistenti delle
+                stesse squadre (e ne toglie i risultati dalla classifica, come
+                clear_formazione)
+            commit: se False lascia la transazione aperta
+        
+        Returns:
+            List[int]: ID delle righe di formazione create, nell'ordine ricevuto
+        """
+        righe = []
+        for partita_id, squadra, giocatori in formazioni:
+            for i, giocatore in enumerate(giocatori, 1):
+                righe.append({
+                    'partita_id': partita_id,
+                    'squadra': squadra,
+                    'giocatore': giocatore['nome'].strip(),
+                    'ruolo': giocatore['ruolo'],
+                    'posizione': giocatore.get('posizione', i)
+                })
+        
+        if sostituisci:
+            self._elimina_formazioni({(partita_id, squadra) for partita_id, squadra, _ in formazioni})
+        
+        ids = []
+        if righe:
+            ids = list(self.session.scalars(
+                insert(Formazione).returning(Formazione.id, sort_by_parameter_order=True),
+                righe
+            ))
+            self.session.execute(insert(Voto), [{'formazione_id': formazione_id} for formazione_id in ids])
+        
+        if commit:
+            self.session.commit()
+        return ids
+    
+    def _elimina_formazioni(self, squadre):
+        """
+        Elimina in blocco formazioni e voti di più squadre (coppie
+        (partita_id, squadra)) e toglie le partite dalla classifica.
+        """
+        partite_ids = {partita_id for partita_id, _ in squadre}
+        ids = [
+            formazione_id
+            for formazione_id, partita_id, squadra in self.session.query(
+                Formazione.id, Formazione.partita_id, Formazione.squadra
+            ).filter(Formazione.partita_id.in_(partite_ids))
+            if (partita_id, squadra) in squadre
+        ]
+        
+        if ids:
+            voti_ids = [voto_id for voto_id, in self.session.query(Voto.id).filter(Voto.formazione_id.in_(ids))]
+            self.session.query(Voto).filter(Voto.id.in_(voti_ids)).delete(synchronize_session=False)
+            self.session.query(Formazione).filter(Formazione.id.in_(ids)).delete(synchronize_session=False)
+            # Le righe eliminate escono anche dalla sessione: gli ID possono essere riusati
+            eliminati = {(Formazione, i) for i in ids} | {(Voto, i) for i in voti_ids}
+            for chiave, oggetto in list(self.session.identity_map.items()):
+                # (il voto può essere già uscito insieme alla sua formazione)
+                if (chiave[0], chiave[1][0]) in eliminati and oggetto in self.session:
+                    self.session.expunge(oggetto)
+            self.session.expire_all()
+        
+        for partita_id in partite_ids:
+            self.rimuovi_risultato_partita(partita_id, commit=False)
+    
     def get_formazione_partita(self, partita_id, squadra):
         """Restituisce la formazione di una squadra in una partita"""
         return self.session.query(Formazione).filter_by(
@@ -368,10 +714,348 @@ class DatabaseManager:
         self.session.commit()
         return voto
     
+    def aggiorna_voti_bulk(self, aggiornamenti, preserva_manuali=True, commit=True):
+        """
+        Aggiorna molti voti in un'unica transazione (vedi aggiorna_voti_batch).
+        
+        Args:
+            aggiornamenti: lista di dict con 'formazione_id' e i campi di Voto
+                da scrivere (voto_base, bonus_malus_totale, gol_fatti, ..., note)
+            preserva_manuali: se True non tocca i voti con override manuale
+            commit: se False lascia la transazione aperta
+        
+        Returns:
+            int: numero di voti scritti
+        """
+        stati = self.aggiorna_voti_batch(aggiornamenti, preserva_manuali=preserva_manuali, commit=commit)
+        return sum(stato in (VOTO_AGGIORNATO, VOTO_CREATO) for stato in stati)
+    
+    def aggiorna_voti_batch(self, aggiornamenti, preserva_manuali=True, commit=True):
+        """
+        Aggiorna molti voti in un'unica transazione: una query per leggere i
+        voti esistenti, poi UPDATE per chiave primaria in executemany (e INSERT
+        per i voti mancanti), invece di una query e un commit per giocatore
+        come update_voto.
+        
+        Come in update_voto, i campi assenti o None (NaN in un DataFrame) non
+        vengono modificati e is_manual_override torna False se non indicato.
+        
+        Args:
+            aggiornamenti: lista di dict, o DataFrame, con 'formazione_id' e i
+                campi di Voto da scrivere (voto_base, bonus_malus_totale,
+                gol_fatti, ..., note, is_manual_override); sono accettati anche
+                i nomi di update_voto 'bonus_malus' e 'is_manual'
+            preserva_manuali: se True non tocca i voti con override manuale
+            commit: se False lascia la transazione aperta
+        
+        Returns:
+            List[str]: esito di ogni riga, nell'ordine ricevuto: VOTO_AGGIORNATO,
+            VOTO_CREATO, VOTO_MANUALE (non toccato) o VOTO_NON_TROVATO
+            (formazione inesistente)
+        """
+        if hasattr(aggiornamenti, 'to_dict'):
+            aggiornamenti = aggiornamenti.to_dict('records')
+        if not len(aggiornamenti):
+            return []
+        
+        righe = [_valori_voto(aggiornamento) for aggiornamento in aggiornamenti]
+        
+        ids = {formazione_id for formazione_id, _ in righe}
+        esistenti = {
+            formazione_id: (voto_id, manuale)
+            for formazione_id, voto_id, manuale in self.session.query(
+                Formazione.id, Voto.id, Voto.is_manual_override
+            ).outerjoin(Voto, Voto.formazione_id == Formazione.id).filter(Formazione.id.in_(ids))
+        }
+        
+        stati = []
+        da_aggiornare = []
+        da_inserire = {}
+        for formazione_id, valori in righe:
+            valori.setdefault('is_manual_override', False)
+            if formazione_id not in esistenti:
+                stati.append(VOTO_NON_TROVATO)
+                continue
+            
+            voto_id, manuale = esistenti[formazione_id]
+            if voto_id is None:
+                # Più righe per lo stesso giocatore senza voto: un solo INSERT
+                da_inserire.setdefault(formazione_id, {'formazione_id': formazione_id}).update(valori)
+                stati.append(VOTO_CREATO)
+            elif preserva_manuali and manuale:
+                stati.append(VOTO_MANUALE)
+            else:
+                da_aggiornare.append(dict(valori, id=voto_id))
+                stati.append(VOTO_AGGIORNATO)
+        
+        if da_aggiornare:
+            self.session.execute(update(Voto), da_aggiornare)
+        if da_inserire:
+            self.session.execute(insert(Voto), list(da_inserire.values()))
+        
+        if commit:
+            self.session.commit()
+        else:
+            # I Voto già caricati in sessione non vedono l'UPDATE in blocco
+            self.session.expire_all()
+        return stati
+    
+    def get_voti_formazioni(self, formazione_ids):
+        """
+        Legge con una sola query i voti attuali di più giocatori schierati.
+        
+        Args:
+            formazione_ids: ID delle righe di formazione
+        
+        Returns:
+            Dict: formazione_id -> dict con voto_base, bonus_malus_totale, note,
+            gli eventi e is_manual_override
+        """
+        campi = ['voto_base', 'bonus_malus_totale', 'note', *CAMPI_EVENTI.values(), 'is_manual_override']
+        righe = self.session.query(
+            Voto.formazione_id, *(getattr(Voto, campo) for campo in campi)
+        ).filter(Voto.formazione_id.in_(list(formazione_ids)))
+        return {riga[0]: dict(zip(campi, riga[1:])) for riga in righe}
+    
+    def salva_voti_ufficiali(self, numero, df, commit=True):
+        """
+        Salva i voti ufficiali di una giornata, sostituendo quelli già salvati.
+        Le righe sono distinte per (nome normalizzato, ruolo): due omonimi di
+        ruoli diversi vengono salvati entrambi. Sono ambigui, e non vengono
+        salvati, i nomi ripetuti con lo stesso ruolo e quelli ripetuti in cui
+        una delle righe non ha ruolo.
+        
+        Args:
+            numero: numero della giornata
+            df: voti normalizzati (excel_import.leggi_excel_voti)
+            commit: se False lascia la transazione aperta
+        
+        Returns:
+            Dict con 'salvati' (numero di voti) e 'duplicati' (nomi scartati)
+        """
+        righe = {}
+        duplicati = set()
+        ruoli_per_nome = {}
+        eventi = {campo: df[colonna].to_numpy() for colonna, campo in CAMPI_EVENTI.items()}
+        
+        for i, (nome, ruolo, voto_base, nota) in enumerate(
+            zip(df['nome'], df['ruolo'], df['voto_base'], df['nota'])
+        ):
+            if not isinstance(nome, str) or not nome.strip():
+                continue
+            normalizzato = normalizza_nome(nome)
+            ruolo = ruolo if isinstance(ruolo, str) and ruolo.strip() else None
+            chiave = (normalizzato, ruolo)
+            if chiave in righe:
+                duplicati.add(chiave)
+                continue
+            ruoli_per_nome.setdefault(normalizzato, []).append(ruolo)
+            
+            riga = {
+                'giornata': numero,
+                'nome': nome.strip(),
+                'nome_normalizzato': normalizzato,
+                'ruolo': ruolo,
+                'voto_base': float(voto_base),
+                'note': nota if isinstance(nota, str) else ''
+            }
+            for campo, valori in eventi.items():
+                riga[campo] = int(valori[i])
+            righe[chiave] = riga
+        
+        # Una riga senza ruolo si abbinerebbe anche all'omonimo con il ruolo
+        for normalizzato, ruolo in righe:
+            ruoli = ruoli_per_nome[normalizzato]
+            if len(ruoli) > 1 and None in ruoli:
+                duplicati.add((normalizzato, ruolo))
+        
+        self.session.query(VotoUfficiale).filter(VotoUfficiale.giornata == numero).delete()
+        salvate = [riga for chiave, riga in righe.items() if chiave not in duplicati]
+        if salvate:
+            self.session.execute(insert(VotoUfficiale), salvate)
+        
+        if commit:
+            self.session.commit()
+        return {
+            'salvati': len(salvate),
+            'duplicati': sorted({righe[chiave]['nome'] for chiave in duplicati})
+        }
+    
+    def get_voti_ufficiali(self, numero):
+        """Restituisce i voti ufficiali salvati per una giornata, ordinati per nome"""
+        return (
+            self.session.query(VotoUfficiale)
+            .filter(VotoUfficiale.giornata == numero)
+            .order_by(VotoUfficiale.nome_normalizzato)
+            .all()
+        )
+    
+    def applica_voti_ufficiali(self, numero=None, partita_id=None, regolamento=None,
+                               preserva_manuali=True, fallback_sv=True, solo_esatti=False,
+                               commit=True):
+        """
+        Applica i voti ufficiali salvati alle formazioni con una join indicizzata
+        su (giornata, nome normalizzato, ruolo), calcolando il bonus/malus in SQL
+        con il regolamento indicato: un voto senza ruolo vale per qualunque ruolo. Le formazioni inserite dopo l'import ricevono i
+        voti senza rileggere nessun file.
+        
+        I pochi giocatori senza corrispondenza esatta vengono cercati con
+        IndiceNomi fra i voti della loro giornata e ricevono il voto solo se
+        la corrispondenza è sicura (Corrispondenza.automatica); quelli non
+        trovati, ambigui o da confermare ricevono 6 SV se fallback_sv è True.
+        Le giornate senza voti ufficiali non vengono toccate.
+        
+        Args:
+            numero: numero della giornata (default: tutte)
+            partita_id: limita l'applicazione a una partita
+            regolamento: regolamento per i bonus/malus (default: standard)
+            preserva_manuali: se True non tocca i voti con override manuale
+            fallback_sv: se True assegna 6 SV ai giocatori non trovati
+            solo_esatti: se True scrive solo i voti della join: anche le
+                corrispondenze sicure finiscono in 'da_confermare'
+            commit: se False lascia la transazione aperta
+        
+        Returns:
+            Dict con 'esatti' (voti scritti dalla join), 'approssimati' (lista di
+            (giocatore, nome trovato)), 'non_trovati', 'ambigui' e 'da_confermare'
+            (corrispondenze non applicate: dict con formazione_id, giocatore,
+            nome_trovato, voto_ufficiale_id e punteggio)
+        """
+        reg = risolvi_regolamento(regolamento)
+        
+        filtri = [Formazione.partita_id == Partita.id, Partita.giornata_id == Giornata.id]
+        if numero is not None:
+            filtri.append(Giornata.numero == numero)
+        if partita_id is not None:
+            filtri.append(Partita.id == partita_id)
+        
+        abbinato = (
+            (VotoUfficiale.giornata == Giornata.numero) &
+            (VotoUfficiale.nome_normalizzato == func.normalizza_nome(Formazione.giocatore)) &
+            ((VotoUfficiale.ruolo == Formazione.ruolo) | VotoUfficiale.ruolo.is_(None))
+        )
+        condizioni = [Voto.formazione_id == Formazione.id, *filtri, abbinato]
+        if preserva_manuali:
+            condizioni.append(Voto.is_manual_override.is_not(True))
+        
+        valori = {campo: getattr(VotoUfficiale, campo) for campo in CAMPI_EVENTI.values()}
+        esatti = self.session.execute(
+            update(Voto)
+            .where(*condizioni)
+            .values(
+                voto_base=VotoUfficiale.voto_base,
+                bonus_malus_totale=_bonus_malus_sql(reg, Formazione.ruolo),
+                note=VotoUfficiale.note,
+                is_manual_override=False,
+                **valori
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        
+        # Giocatori delle giornate con voti ufficiali rimasti senza corrispondenza esatta
+        con_voti = select(VotoUfficiale.id).where(VotoUfficiale.giornata == Giornata.numero).exists()
+        residui = (
+            self.session.query(Giornata.numero, Formazione.id, Formazione.giocatore, Formazione.ruolo)
+            .filter(*filtri, con_voti, ~select(VotoUfficiale.id).where(abbinato).exists())
+            .order_by(Giornata.numero, Formazione.id)
+            .all()
+        )
+        
+        aggiornamenti = []
+        approssimati = []
+        non_trovati = []
+        ambigui = []
+        da_confermare = []
+        indici = {}
+        
+        for numero_giornata, formazione_id, giocatore, ruolo in residui:
+            if numero_giornata not in indici:
+                voti = self.get_voti_ufficiali(numero_giornata)
+                indici[numero_giornata] = (voti, IndiceNomi([v.nome for v in voti], [v.ruolo for v in voti]))
+            voti, indice = indici[numero_giornata]
+            
+            corrispondenza = indice.cerca(giocatore, ruolo)
+            if corrispondenza is not None and (solo_esatti or not corrispondenza.automatica):
+                if corrispondenza.ambiguo:
+                    ambigui.append(giocatore)
+                da_confermare.append({
+                    'formazione_id': formazione_id,
+                    'giocatore': giocatore,
+                    'nome_trovato': corrispondenza.nome_trovato,
+                    'voto_ufficiale_id': voti[corrispondenza.indice].id,
+                    'punteggio': corrispondenza.punteggio
+                })
+                corrispondenza = None
+            
+            if corrispondenza is None:
+                non_trovati.append(giocatore)
+                if fallback_sv:
+                    aggiornamenti.append({
+                        'formazione_id': formazione_id,
+                        'voto_base': 6.0,
+                        'bonus_malus_totale': 0.0,
+                        'note': 'SV'
+                    })
+                continue
+            
+            voto = voti[corrispondenza.indice]
+            aggiornamenti.append(_voto_da_ufficiale(voto, formazione_id, ruolo, reg))
+            approssimati.append((giocatore, voto.nome))
+        
+        self.aggiorna_voti_bulk(aggiornamenti, preserva_manuali=preserva_manuali, commit=False)
+        
+        if commit:
+            self.session.commit()
+        else:
+            # I Voto già caricati in sessione non vedono l'UPDATE con join
+            self.session.expire_all()
+        return {
+            'esatti': esatti,
+            'approssimati': approssimati,
+            'non_trovati': non_trovati,
+            'ambigui': ambigui,
+            'da_confermare': da_confermare
+        }
+    
+    def conferma_voti_ufficiali(self, abbinamenti, regolamento=None, preserva_manuali=True, commit=True):
+        """
+        Applica i voti ufficiali scelti a mano per le corrispondenze rimaste
+        da confermare in applica_voti_ufficiali.
+        
+        Args:
+            abbinamenti: lista di coppie (formazione_id, voto_ufficiale_id)
+            regolamento: regolamento per i bonus/malus (default: standard)
+            preserva_manuali: se True non tocca i voti con override manuale
+            commit: se False lascia la transazione aperta
+        
+        Returns:
+            int: numero di voti scritti
+        """
+        reg = risolvi_regolamento(regolamento)
+        abbinamenti = list(abbinamenti)
+        voti = {
+            voto.id: voto
+            for voto in self.session.query(VotoUfficiale).filter(
+                VotoUfficiale.id.in_([voto_id for _, voto_id in abbinamenti])
+            )
+        }
+        ruoli = dict(self.session.query(Formazione.id, Formazione.ruolo).filter(
+            Formazione.id.in_([formazione_id for formazione_id, _ in abbinamenti])
+        ))
+        
+        aggiornamenti = [
+            _voto_da_ufficiale(voti[voto_id], formazione_id, ruoli[formazione_id], reg)
+            for formazione_id, voto_id in abbinamenti
+            if voto_id in voti and formazione_id in ruoli
+        ]
+        return self.aggiorna_voti_bulk(aggiornamenti, preserva_manuali=preserva_manuali, commit=commit)
+    
     def delete_giornata(self, giornata_id):
         """Elimina una giornata e tutte le partite associate"""
         giornata = self.get_giornata(giornata_id)
         if giornata:
+            for partita in giornata.partite:
+                self.rimuovi_risultato_partita(partita.id, commit=False)
             self.session.delete(giornata)
             self.session.commit()
             return True
@@ -381,6 +1065,7 @@ class DatabaseManager:
         """Elimina una partita"""
         partita = self.get_partita(partita_id)
         if partita:
+            self.rimuovi_risultato_partita(partita_id, commit=False)
             self.session.delete(partita)
             self.session.commit()
             return True
@@ -391,7 +1076,309 @@ class DatabaseManager:
         formazioni = self.get_formazione_partita(partita_id, squadra)
         for f in formazioni:
             self.session.delete(f)
+        # Il risultato conteggiato non vale più: esce dalla classifica fino al ricalcolo
+        self.rimuovi_risultato_partita(partita_id, commit=False)
+        self.session.commit()
+    
+    def salva_regolamento(self, regolamento, attivo=True):
+        """
+        Salva (o aggiorna) un regolamento nel database.
+        
+        Args:
+            regolamento: Regolamento da salvare (identificato dal nome)
+            attivo: se True diventa il regolamento usato nei calcoli
+        
+        Returns:
+            RegolamentoLega: record salvato
+        """
+        record = self.session.query(RegolamentoLega).filter_by(nome=regolamento.nome).first()
+        if not record:
+            record = RegolamentoLega(nome=regolamento.nome)
+            self.session.add(record)
+        
+        record.contenuto = json.dumps(regolamento_a_dict(regolamento), ensure_ascii=False)
+        
+        if attivo:
+            self.session.query(RegolamentoLega).update({RegolamentoLega.attivo: False})
+            record.attivo = True
+        
         self.session.commit()
+        return record
+    
+    def get_regolamento(self, nome=None):
+        """
+        Restituisce un regolamento salvato.
+        
+        Args:
+            nome: nome del regolamento (default: quello attivo)
+        
+        Returns:
+            Regolamento: regolamento trovato, oppure None
+        """
+        query = self.session.query(RegolamentoLega)
+        if nome is None:
+            record = query.filter_by(attivo=True).first()
+        else:
+            record = query.filter_by(nome=nome).first()
+        
+        if not record:
+            return None
+        return regolamento_da_dict(json.loads(record.contenuto))
+    
+    def get_all_regolamenti(self):
+        """Restituisce tutti i regolamenti salvati ordinati per nome"""
+        return self.session.query(RegolamentoLega).order_by(RegolamentoLega.nome).all()
+    
+    def get_formazioni_stagione(self, numero=None, partite_ids=None):
+        """
+        Legge con una sola query tutte le partite della stagione con
+        formazioni e voti, in ordine di giornata.
+        
+        Args:
+            numero: limita la lettura a una giornata (numero)
+            partite_ids: limita la lettura a queste partite
+        
+        Returns:
+            List[dict]: una voce per partita con 'partita_id', 'numero'
+            (giornata), 'casa', 'trasferta', 'formazioni' (dict casa/trasferta
+            di liste di GiocatorePunteggio) e 'con_voti' (almeno un voto inserito)
+        """
+        query = (
+            self.session.query(Giornata.numero, Partita, Formazione, Voto)
+            .join(Partita, Partita.giornata_id == Giornata.id)
+            .outerjoin(Formazione, Formazione.partita_id == Partita.id)
+            .outerjoin(Voto, Voto.formazione_id == Formazione.id)
+        )
+        if numero is not None:
+            query = query.filter(Giornata.numero == numero)
+        if partite_ids is not None:
+            query = query.filter(Partita.id.in_(list(partite_ids)))
+        righe = query.order_by(Giornata.numero, Partita.id, Formazione.posizione).all()
+        
+        partite = {}
+        for numero, partita, formazione, voto in righe:
+            dati = partite.setdefault(partita.id, {
+                'partita_id': partita.id,
+                'numero': numero,
+                'casa': partita.squadra_casa,
+                'trasferta': partita.squadra_trasferta,
+                'formazioni': {'casa': [], 'trasferta': []},
+                'con_voti': False
+            })
+            if formazione is None:
+                continue
+            dati['formazioni'][formazione.squadra].append(GiocatorePunteggio(
+                nome=formazione.giocatore,
+                ruolo=formazione.ruolo,
+                voto_base=voto.voto_base if voto else 6.0,
+                bonus_malus=voto.bonus_malus_totale if voto else 0.0,
+                note=(voto.note or '') if voto else '',
+                id=formazione.id
+            ))
+            if voto_inserito(voto):
+                dati['con_voti'] = True
+        
+        return list(partite.values())
+    
+    def righe_export_stagione(self, yield_per=1000):
+        """
+        Una riga per giocatore schierato con partita, voto e risultato
+        registrato, letta con una sola query in streaming (senza caricare
+        oggetti ORM), in ordine di giornata, partita, lato e posizione.
+        
+        Args:
+            yield_per: righe lette dal database per volta
+        
+        Returns:
+            Result: tuple (numero, partita_id, squadra_casa, squadra_trasferta,
+            lato, posizione, ruolo, giocatore, voto_base, bonus_malus_totale,
+            note, eventi nell'ordine di CAMPI_EVENTI, gol_casa, gol_trasferta,
+            punteggio_casa, punteggio_trasferta); voto e risultato sono None
+            se mancanti
+        """
+        query = (
+            select(
+                Giornata.numero, Partita.id, Partita.squadra_casa, Partita.squadra_trasferta,
+                Formazione.squadra, Formazione.posizione, Formazione.ruolo, Formazione.giocatore,
+                Voto.voto_base, Voto.bonus_malus_totale, Voto.note,
+                *(getattr(Voto, campo) for campo in CAMPI_EVENTI.values()),
+                RisultatoPartita.gol_casa, RisultatoPartita.gol_trasferta,
+                RisultatoPartita.punteggio_casa, RisultatoPartita.punteggio_trasferta
+            )
+            .join(Partita, Partita.giornata_id == Giornata.id)
+            .join(Formazione, Formazione.partita_id == Partita.id)
+            .outerjoin(Voto, Voto.formazione_id == Formazione.id)
+            .outerjoin(RisultatoPartita, RisultatoPartita.partita_id == Partita.id)
+            .order_by(Giornata.numero, Partita.id, Formazione.squadra, Formazione.posizione)
+        )
+        return self.session.execute(query.execution_options(yield_per=yield_per))
+    
+    def _aggiorna_classifica(self, partita, risultato, segno, righe=None):
+        """
+        Somma (segno=1) o storna (segno=-1) un risultato dalla classifica.
+        righe è una cache opzionale squadra -> Classifica per gli aggiornamenti in blocco.
+        """
+        if righe is None:
+            righe = {}
+        
+        lati = (
+            (partita.squadra_casa, risultato.gol_casa, risultato.gol_trasferta, risultato.punteggio_casa),
+            (partita.squadra_trasferta, risultato.gol_trasferta, risultato.gol_casa, risultato.punteggio_trasferta)
+        )
+        
+        for squadra, fatti, subiti, punteggio in lati:
+            riga = righe.get(squadra)
+            if riga is None:
+                riga = self.session.query(Classifica).filter_by(squadra=squadra).first()
+            if riga is None:
+                riga = Classifica(
+                    squadra=squadra, punti=0, giocate=0, vinte=0, pareggiate=0, perse=0,
+                    gol_fatti=0, gol_subiti=0, differenza_reti=0, punteggio_totale=0.0
+                )
+                self.session.add(riga)
+            righe[squadra] = riga
+            
+            riga.giocate += segno
+            if fatti > subiti:
+                riga.vinte += segno
+                riga.punti += segno * PUNTI_VITTORIA
+            elif fatti == subiti:
+                riga.pareggiate += segno
+                riga.punti += segno * PUNTI_PAREGGIO
+            else:
+                riga.perse += segno
+            riga.gol_fatti += segno * fatti
+            riga.gol_subiti += segno * subiti
+            riga.differenza_reti += segno * (fatti - subiti)
+            # Arrotondato ai centesimi per non accumulare errori di somma/storno
+            riga.punteggio_totale = round(riga.punteggio_totale + segno * punteggio, 2)
+    
+    def registra_risultato_partita(self, partita_id, gol_casa, gol_trasferta,
+                                   punteggio_casa, punteggio_trasferta, commit=True):
+        """
+        Registra il risultato di una partita e aggiorna la classifica in modo
+        incrementale: il risultato precedente viene stornato e sostituito.
+        
+        Args:
+            partita_id: ID della partita
+            gol_casa: gol della squadra di casa
+            gol_trasferta: gol della squadra in trasferta
+            punteggio_casa: punteggio totale (fantapunti) casa
+            punteggio_trasferta: punteggio totale (fantapunti) trasferta
+            commit: se False lascia la transazione aperta (aggiornamenti in blocco)
+        
+        Returns:
+            RisultatoPartita: risultato registrato, oppure None se la partita non esiste
+        """
+        partita = self.get_partita(partita_id)
+        if not partita:
+            return None
+        
+        nuovo = (int(gol_casa), int(gol_trasferta), round(float(punteggio_casa), 2), round(float(punteggio_trasferta), 2))
+        
+        risultato = partita.risultato
+        if risultato is not None:
+            attuale = (risultato.gol_casa, risultato.gol_trasferta, risultato.punteggio_casa, risultato.punteggio_trasferta)
+            if attuale == nuovo:
+                return risultato
+            self._aggiorna_classifica(partita, risultato, -1)
+        else:
+            risultato = RisultatoPartita(partita_id=partita_id)
+            partita.risultato = risultato
+        
+        risultato.gol_casa, risultato.gol_trasferta, risultato.punteggio_casa, risultato.punteggio_trasferta = nuovo
+        self._aggiorna_classifica(partita, risultato, 1)
+        
+        if commit:
+            self.session.commit()
+        return risultato
+    
+    def rimuovi_risultato_partita(self, partita_id, commit=True):
+        """
+        Toglie dalla classifica il risultato di una partita (se registrato).
+        
+        Args:
+            partita_id: ID della partita
+            commit: se False lascia la transazione aperta
+        
+        Returns:
+            bool: True se un risultato è stato rimosso
+        """
+        partita = self.get_partita(partita_id)
+        if not partita or partita.risultato is None:
+            return False
+        
+        self._aggiorna_classifica(partita, partita.risultato, -1)
+        partita.risultato = None
+        
+        if commit:
+            self.session.commit()
+        return True
+    
+    def svuota_classifica(self, commit=True):
+        """Elimina classifica e risultati registrati (prima di una ricostruzione)"""
+        self.session.query(RisultatoPartita).delete()
+        self.session.query(Classifica).delete()
+        # Le righe eliminate escono anche dalla sessione: gli ID possono essere riusati
+        for oggetto in list(self.session.identity_map.values()):
+            if isinstance(oggetto, (RisultatoPartita, Classifica)):
+                self.session.expunge(oggetto)
+        self.session.expire_all()
+        if commit:
+            self.session.commit()
+    
+    def ricostruisci_classifica(self, risultati):
+        """
+        Ricostruisce da zero classifica e risultati in un'unica transazione.
+        
+        Args:
+            risultati: lista di tuple (partita_id, gol_casa, gol_trasferta,
+                punteggio_casa, punteggio_trasferta)
+        
+        Returns:
+            int: numero di partite conteggiate
+        """
+        self.svuota_classifica(commit=False)
+        
+        ids = [r[0] for r in risultati]
+        partite = {p.id: p for p in self.session.query(Partita).filter(Partita.id.in_(ids))}
+        righe = {}
+        
+        for partita_id, gol_casa, gol_trasferta, punteggio_casa, punteggio_trasferta in risultati:
+            partita = partite[partita_id]
+            risultato = RisultatoPartita(
+                partita_id=partita_id,
+                gol_casa=int(gol_casa),
+                gol_trasferta=int(gol_trasferta),
+                punteggio_casa=round(float(punteggio_casa), 2),
+                punteggio_trasferta=round(float(punteggio_trasferta), 2)
+            )
+            partita.risultato = risultato
+            self._aggiorna_classifica(partita, risultato, 1, righe)
+        
+        self.session.commit()
+        return len(risultati)
+    
+    def get_classifica(self):
+        """
+        Restituisce la classifica ordinata per punti, differenza reti, gol
+        fatti e punteggio totale (una sola query sull'indice della classifica).
+        
+        Returns:
+            List[Classifica]: righe della classifica (senza squadre a 0 partite)
+        """
+        return (
+            self.session.query(Classifica)
+            .filter(Classifica.giocate > 0)
+            .order_by(
+                Classifica.punti.desc(),
+                Classifica.differenza_reti.desc(),
+                Classifica.gol_fatti.desc(),
+                Classifica.punteggio_totale.desc(),
+                Classifica.squadra
+            )
+            .all()
+        )
     
     def close(self):
         """Chiude la connessione al database"""
@@ -0,0 +1,155 @@
+"""
+Export della stagione completa in Excel o CSV.
+Giornate, partite, formazioni, voti e risultati registrati vengono letti con
+una sola query in streaming e scritti riga per riga: il file Excel è creato
+in modalità write_only (un foglio per giornata), quindi la memoria resta
+costante qualunque sia la lunghezza della stagione.
+
+Uso da riga di comando:
+    python esporta_stagione.py stagione.xlsx --db fantacalcio.db
+"""
+
+import argparse
+import csv
+from typing import Iterator, Tuple
+
+from db import CAMPI_EVENTI, DatabaseManager
+
+
+# Intestazione delle righe esportate (una riga per giocatore schierato)
+COLONNE_EXPORT = (
+    'Giornata', 'Partita', 'Squadra', 'Lato', 'Pos', 'Ruolo', 'Giocatore',
+    'Voto', 'Bonus/Malus', 'Fantavoto', 'Note',
+    'Gf', 'Gs', 'Rp', 'Rf', 'Rs', 'Au', 'Amm', 'Esp', 'Ass',
+    'Gol', 'Gol subiti', 'Punteggio'
+)
+
+
+def righe_stagione(db) -> Iterator[Tuple[int, list]]:
+    """
+    Righe da esportare, una per giocatore schierato, in ordine di giornata.
+    Gol e punteggio sono quelli del risultato registrato in classifica
+    (vuoti se la partita non è ancora stata calcolata).
+
+    Args:
+        db: DatabaseManager
+
+    Yields:
+        Tuple: (numero di giornata, valori nell'ordine di COLONNE_EXPORT)
+    """
+    num_eventi = len(CAMPI_EVENTI)
+
+    for riga in db.righe_export_stagione():
+        (numero, _, casa, trasferta, lato, posizione, ruolo, giocatore,
+         voto_base, bonus_malus, note) = riga[:11]
+        eventi = riga[11:11 + num_eventi]
+        gol_casa, gol_trasferta, punteggio_casa, punteggio_trasferta = riga[11 + num_eventi:]
+
+        if lato == 'casa':
+            squadra, gol, subiti, punteggio = casa, gol_casa, gol_trasferta, punteggio_casa
+        else:
+            squadra, gol, subiti, punteggio = trasferta, gol_trasferta, gol_casa, punteggio_trasferta
+
+        fantavoto = round(voto_base + (bonus_malus or 0.0), 2) if voto_base is not None else None
+
+        yield numero, [
+            numero, f"{casa} - {trasferta}", squadra, lato, posizione, ruolo, giocatore,
+            voto_base, bonus_malus, fantavoto, note or '',
+            *eventi,
+            gol, subiti, punteggio
+        ]
+
+
+def esporta_stagione_excel(db, filepath: str) -> int:
+    """
+    Esporta la stagione in un file Excel con un foglio per giornata.
+
+    Args:
+        db: DatabaseManager
+        filepath: percorso del file .xlsx da creare
+
+    Returns:
+        int: numero di righe esportate
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    foglio = None
+    giornata = None
+    esportate = 0
+
+    for numero, valori in righe_stagione(db):
+        if numero != giornata:
+            giornata = numero
+            foglio = workbook.create_sheet(f"Giornata {numero}")
+            foglio.freeze_panes = 'A2'
+            foglio.append(COLONNE_EXPORT)
+        foglio.append(valori)
+        esportate += 1
+
+    # Una cartella di lavoro deve avere almeno un foglio
+    if foglio is None:
+        workbook.create_sheet("Stagione").append(COLONNE_EXPORT)
+
+    workbook.save(filepath)
+    return esportate
+
+
+def esporta_stagione_csv(db, filepath: str, separatore: str = ',') -> int:
+    """
+    Esporta la stagione in un unico file CSV (la giornata è la prima colonna).
+
+    Args:
+        db: DatabaseManager
+        filepath: percorso del file .csv da creare
+        separatore: separatore delle colonne
+
+    Returns:
+        int: numero di righe esportate
+    """
+    esportate = 0
+    # BOM UTF-8: Excel riconosce accenti e caratteri speciali
+    with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, delimiter=separatore)
+        writer.writerow(COLONNE_EXPORT)
+        for _, valori in righe_stagione(db):
+            writer.writerow(['' if v is None else v for v in valori])
+            esportate += 1
+    return esportate
+
+
+def esporta_stagione(db, filepath: str) -> int:
+    """
+    Esporta la stagione in Excel o CSV secondo l'estensione del file.
+
+    Args:
+        db: DatabaseManager
+        filepath: percorso del file (.xlsx, oppure .csv)
+
+    Returns:
+        int: numero di righe esportate
+    """
+    if filepath.lower().endswith('.csv'):
+        return esporta_stagione_csv(db, filepath)
+    if filepath.lower().endswith('.xlsx'):
+        return esporta_stagione_excel(db, filepath)
+    raise ValueError(f"{filepath}: formato non supportato (usa .xlsx o .csv)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Esporta la stagione completa in Excel o CSV")
+    parser.add_argument('filepath', help="file da creare (.xlsx o .csv)")
+    parser.add_argument('--db', default='fantacalcio.db', help="database (default: fantacalcio.db)")
+    argomenti = parser.parse_args()
+
+    db = DatabaseManager(argomenti.db)
+    try:
+        esportate = esporta_stagione(db, argomenti.filepath)
+    finally:
+        db.close()
+
+    print(f"Righe esportate: {esportate} -> {argomenti.filepath}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,22 @@
 """
-Modulo per l'import dei voti da file Excel.
+Modulo per l'import dei voti da file Excel, CSV/TSV o testo incollato.
 Gestisce il parsing del file e il calcolo automatico dei bonus/malus.
 """
 
+import csv
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import numpy as np
 import pandas as pd
-from typing import Dict, List
-from calc import calcola_bonus_malus_da_eventi
+from typing import Dict, Iterable, Iterator, List, Optional
+from calc import Giocatore, GiocatorePunteggio, calcola_bonus_malus_da_eventi
+from db import CAMPI_EVENTI
+from indice_nomi import Corrispondenza, IndiceNomi
+from regolamento import EVENTI_BONUS_MALUS, RegolamentoCompilato, risolvi_regolamento
 
 
 def parse_voto_excel(voto_str) -> tuple:
@@ -43,11 +54,130 @@ def parse_voto_excel(voto_str) -> tuple:
     return (voto, nota)
 
 
+def parse_voti_colonna(voti: pd.Series) -> pd.DataFrame:
+    """
+    Versione vettoriale di parse_voto_excel per un'intera colonna di voti.
+    Usa gli accessor .str e pd.to_numeric; le sole celle che la conversione
+    vettoriale non riconosce passano da parse_voto_excel, così il risultato
+    coincide sempre con il parsing riga per riga.
+    
+    Args:
+        voti: colonna dei voti (numeri, stringhe come "6*", celle vuote)
+    
+    Returns:
+        pd.DataFrame: colonne 'voto_base' (float) e 'nota' ("SV" o ""), stesso indice
+    """
+    mancanti = voti.isna()
+    
+    if pd.api.types.is_numeric_dtype(voti) and not pd.api.types.is_bool_dtype(voti):
+        # Colonna già numerica: solo le celle vuote diventano 6 SV
+        voto_base = voti.astype(np.float64).fillna(6.0)
+        nota = np.where(mancanti, "SV", "")
+        return pd.DataFrame({'voto_base': voto_base, 'nota': nota}, index=voti.index)
+    
+    testo = voti.astype(str).str.strip()
+    asterisco = testo.str.contains('*', regex=False)
+    voto_base = pd.to_numeric(testo.str.replace('*', '', regex=False), errors='coerce').astype(np.float64)
+    voto_base[mancanti] = 6.0
+    nota = pd.Series(np.where(mancanti | asterisco, "SV", ""), index=voti.index, dtype=object)
+    
+    # Celle non convertite (testo non numerico): stessa regola di parse_voto_excel
+    da_rivedere = voto_base.isna() & ~mancanti
+    if da_rivedere.any():
+        rivisti = [parse_voto_excel(v) for v in voti[da_rivedere]]
+        voto_base[da_rivedere] = [v for v, _ in rivisti]
+        nota[da_rivedere] = [n for _, n in rivisti]
+    
+    return pd.DataFrame({'voto_base': voto_base, 'nota': nota}, index=voti.index)
+
+
+# Colonne standard di un DataFrame di voti normalizzato (leggi_excel_voti)
+COLONNE_VOTI = (
+    'ruolo', 'nome', 'voto_base', 'nota',
+    'gf', 'gs', 'rp', 'rf', 'rs', 'au', 'amm', 'esp', 'ass'
+)
+
+# Contatori degli eventi (gol, ammonizioni, ...): interi piccoli, salvati come int8
+COLONNE_EVENTI = tuple(CAMPI_EVENTI)
+
+# Colonna del file per ogni evento del regolamento
+_COLONNA_EVENTO = {campo: colonna for colonna, campo in CAMPI_EVENTI.items()}
+
+# Righe iniziali del foglio in cui cercare l'intestazione dei file Fantacalcio.it
+RIGHE_RICERCA_HEADER = 10
+
+
+def _righe_foglio(filepath: str) -> Iterator[tuple]:
+    """
+    Scorre le righe del primo foglio come tuple di valori (None per le celle vuote).
+    I file .xlsx sono letti in streaming con openpyxl in sola lettura; il vecchio
+    formato .xls, che openpyxl non supporta, viene letto una volta con pandas.
+    """
+    if str(filepath).lower().endswith('.xls'):
+        df = pd.read_excel(filepath, header=None)
+        df = df.astype(object).where(df.notna(), None)
+        yield from df.itertuples(index=False, name=None)
+        return
+    
+    # openpyxl è il modulo più lento da caricare: solo quando serve davvero
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _trova_riga_header(righe: List[tuple]) -> int:
+    """
+    Indice della riga di intestazione fra le prime righe non vuote del foglio.
+    Nei file standard è la prima riga; nei file Fantacalcio.it (titolo
+    "Voti Fantacalcio", prima cella vuota o riga "Cod." sotto il titolo) è la
+    prima riga che contiene sia "Ruolo" sia "Nome".
+    """
+    prima_cella = righe[0][0] if righe[0] else None
+    file_fantacalcio = (
+        prima_cella is None or
+        'voti fantacalcio' in str(prima_cella).lower() or
+        (len(righe) > 1 and len(righe[1]) > 0 and righe[1][0] == 'Cod.')
+    )
+    if not file_fantacalcio:
+        return 0
+    
+    for i, riga in enumerate(righe):
+        valori = [str(v).lower() for v in riga if v is not None]
+        if 'ruolo' in valori and 'nome' in valori:
+            return i
+    
+    raise ValueError("Impossibile trovare l'header nel file Excel. Assicurati che contenga le colonne Ruolo, Nome, Voto.")
+
+
+def _nomi_colonne(intestazione: tuple, num_colonne: int) -> List[str]:
+    """Nomi delle colonne come li assegna pandas (Unnamed: i per le celle vuote, duplicati numerati)"""
+    nomi = []
+    visti = {}
+    for i in range(num_colonne):
+        valore = intestazione[i] if i < len(intestazione) else None
+        nome = f"Unnamed: {i}" if valore is None else str(valore)
+        if nome in visti:
+            visti[nome] += 1
+            nome = f"{nome}.{visti[nome]}"
+        else:
+            visti[nome] = 0
+        nomi.append(nome)
+    return nomi
+
+
 def leggi_excel_voti(filepath: str) -> pd.DataFrame:
     """
     Legge un file Excel con i voti dei giocatori.
     Supporta sia file standard che file Fantacalcio.it ufficiali.
     
+    Il file viene letto una sola volta: l'intestazione si cerca fra le prime
+    righe mentre il foglio scorre e il DataFrame si costruisce dalle righe
+    successive, senza rileggere il file.
+    
     Colonne attese:
     - Ruolo (P, D, C, A)
     - Nome (nome del giocatore)
@@ -63,35 +193,251 @@ def leggi_excel_voti(filepath: str) -> pd.DataFrame:
     - Ass (assist)
     
     Args:
-        filepath: percorso del file Excel
+        filepath: percorso del file Excel (.xlsx, o .xls letto con pandas)
     
     Returns:
         pd.DataFrame: DataFrame con i dati processati
     """
+    return _df_voti_da_righe(_righe_foglio(filepath))
+
+
+def _df_voti_da_righe(righe: Iterable[tuple]) -> pd.DataFrame:
+    """
+    Costruisce il DataFrame normalizzato dalle righe di un foglio o di un CSV
+    (tuple di valori, None per le celle vuote): cerca l'intestazione fra le
+    prime righe e consuma le altre una sola volta.
+    """
+    # Le righe completamente vuote vengono ignorate, come fa pandas
+    righe = (riga for riga in righe if any(v is not None for v in riga))
     
-    # Prova prima a leggere il file normalmente
-    df = pd.read_excel(filepath)
+    iniziali = list(islice(righe, RIGHE_RICERCA_HEADER))
+    if not iniziali:
+        raise ValueError("Il file dei voti è vuoto")
     
-    # Se la prima colonna contiene "Voti Fantacalcio" o header strani, è un file Fantacalcio.it
-    first_col_name = str(df.columns[0]).lower()
-    if 'voti fantacalcio' in first_col_name or 'unnamed' in first_col_name or df.iloc[0, 0] == 'Cod.':
-        # File Fantacalcio.it: cerca la riga con "Cod.", "Ruolo", "Nome"
-        df_raw = pd.read_excel(filepath, header=None)
-        
-        # Trova la riga header (quella con "Ruolo")
-        header_row = None
-        for i in range(min(10, len(df_raw))):
-            row_values = [str(v).lower() for v in df_raw.iloc[i].tolist() if pd.notna(v)]
-            if 'ruolo' in row_values and 'nome' in row_values:
-                header_row = i
-                break
+    riga_header = _trova_riga_header(iniziali)
+    intestazione = iniziali[riga_header]
+    dati = iniziali[riga_header + 1:]
+    dati.extend(righe)
+    
+    num_colonne = max(len(intestazione), max(map(len, dati), default=0))
+    if any(len(riga) < num_colonne for riga in dati):
+        dati = [riga + (None,) * (num_colonne - len(riga)) for riga in dati]
+    
+    df = pd.DataFrame.from_records(dati, columns=_nomi_colonne(intestazione, num_colonne))
+    
+    return _normalizza_df_voti(df)
+
+
+def elenca_fogli(filepath: str) -> List[str]:
+    """
+    Nomi dei fogli di una cartella di lavoro, nell'ordine del file.
+    
+    Args:
+        filepath: percorso del file Excel
+    
+    Returns:
+        List[str]: nomi dei fogli
+    """
+    if str(filepath).lower().endswith('.xls'):
+        with pd.ExcelFile(filepath) as cartella:
+            return list(cartella.sheet_names)
+    
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(filepath, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _righe_fogli(filepath: str, fogli: Optional[List[str]]) -> Iterator[tuple]:
+    """
+    Apre la cartella di lavoro una sola volta e restituisce, foglio per foglio,
+    (nome, righe) con le righe già lette come tuple di valori.
+    """
+    if str(filepath).lower().endswith('.xls'):
+        letti = pd.read_excel(filepath, sheet_name=fogli if fogli is not None else None, header=None)
+        for nome, df in letti.items():
+            df = df.astype(object).where(df.notna(), None)
+            yield nome, list(df.itertuples(index=False, name=None))
+        return
+    
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        for nome in (fogli if fogli is not None else workbook.sheetnames):
+            if nome not in workbook.sheetnames:
+                raise ValueError(f"Foglio '{nome}' non presente nel file")
+            yield nome, list(workbook[nome].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def leggi_excel_fogli(filepath: str, fogli: List[str] = None, num_thread: int = None) -> pd.DataFrame:
+    """
+    Legge più fogli di una cartella di lavoro (es. varianti per lega, voti
+    "Fantacalcio" e "Statistico") in un unico DataFrame con la colonna 'foglio'.
+    
+    Il file viene aperto una sola volta; mentre si leggono le righe di un
+    foglio, quelli già letti vengono normalizzati in parallelo (intestazione
+    cercata una volta per foglio, stessa normalizzazione di leggi_excel_voti).
+    
+    Args:
+        filepath: percorso del file Excel
+        fogli: fogli da leggere (default: tutti quelli con un'intestazione di voti)
+        num_thread: thread per la normalizzazione (default: numero di core)
+    
+    Returns:
+        pd.DataFrame: voti normalizzati di tutti i fogli, con la colonna 'foglio'
+    """
+    if num_thread is None:
+        num_thread = os.cpu_count() or 1
+    
+    with ThreadPoolExecutor(max_workers=max(num_thread, 1)) as executor:
+        letture = [
+            (nome, executor.submit(_df_voti_da_righe, righe))
+            for nome, righe in _righe_fogli(filepath, fogli)
+        ]
         
-        if header_row is not None:
-            # Rileggi usando quella riga come header
-            df = pd.read_excel(filepath, header=header_row)
-        else:
-            raise ValueError("Impossibile trovare l'header nel file Excel. Assicurati che contenga le colonne Ruolo, Nome, Voto.")
+        parti = []
+        for nome, lettura in letture:
+            try:
+                df = lettura.result()
+            except ValueError as e:
+                # Fogli scelti esplicitamente devono essere validi; gli altri
+                # (note, classifiche, ...) vengono saltati
+                if fogli is not None:
+                    raise ValueError(f"Foglio '{nome}': {e}") from e
+                continue
+            parti.append(df.assign(foglio=nome))
+    
+    if not parti:
+        raise ValueError("Nessun foglio con le colonne Ruolo, Nome, Voto")
+    
+    df = compatta_df_voti(pd.concat(parti, ignore_index=True))
+    df['foglio'] = pd.Categorical(df['foglio'], categories=[parte['foglio'].iat[0] for parte in parti if len(parte)])
+    return df
+
+
+# Estensioni lette come testo delimitato invece che come Excel
+ESTENSIONI_TESTO = ('.csv', '.tsv', '.txt')
+
+# Tutte le estensioni accettate da leggi_voti
+ESTENSIONI_VOTI = ('.xlsx', '.xls') + ESTENSIONI_TESTO
+
+# Separatori riconosciuti nei CSV e nel testo incollato (tab per le tabelle copiate dal web)
+SEPARATORI = '\t;,|'
+
+# Numero con la virgola decimale, eventualmente con l'asterisco dei SV ("6,5", "6,5*")
+_RE_VIRGOLA_DECIMALE = re.compile(r'^([+-]?\d+),(\d+\*?)$')
+
+
+def _separatore(campione: str) -> str:
+    """Separatore di un testo delimitato, dedotto dalle prime righe"""
+    try:
+        return csv.Sniffer().sniff(campione, delimiters=SEPARATORI).delimiter
+    except csv.Error:
+        for separatore in SEPARATORI:
+            if separatore in campione:
+                return separatore
+        return ','
+
+
+def _righe_testo(sorgente: Iterable[str], separatore: Optional[str] = None) -> Iterator[tuple]:
+    """
+    Scorre le righe di un testo delimitato come tuple di valori, come
+    _righe_foglio: celle vuote a None e virgola decimale convertita in punto
+    ("6,5" -> "6.5"), così numeri e voti passano dalla stessa normalizzazione.
+    """
+    linee = iter(sorgente)
+    iniziali = list(islice(linee, RIGHE_RICERCA_HEADER))
+    if separatore is None:
+        separatore = _separatore(''.join(iniziali))
+    
+    def cella(valore):
+        valore = valore.strip()
+        if not valore:
+            return None
+        return _RE_VIRGOLA_DECIMALE.sub(r'\1.\2', valore)
+    
+    for riga in csv.reader(_concatena(iniziali, linee), delimiter=separatore):
+        yield tuple(cella(valore) for valore in riga)
+
+
+def _concatena(iniziali: List[str], altre: Iterator[str]) -> Iterator[str]:
+    """Rimette in testa le righe già lette per dedurre il separatore"""
+    yield from iniziali
+    yield from altre
+
+
+def leggi_csv_voti(filepath: str, separatore: Optional[str] = None) -> pd.DataFrame:
+    """
+    Legge un file CSV/TSV con i voti dei giocatori, con le stesse colonne e la
+    stessa normalizzazione di leggi_excel_voti ma senza openpyxl: le righe
+    vengono lette in streaming con il modulo csv. Separatore (tab, punto e
+    virgola, virgola, barra) e virgola decimale vengono riconosciuti.
     
+    Args:
+        filepath: percorso del file di testo
+        separatore: separatore delle colonne (default: dedotto dal file)
+    
+    Returns:
+        pd.DataFrame: DataFrame con i dati processati
+    """
+    # UTF-8 (anche con BOM, come lo salva Excel); altrimenti la codifica Windows
+    for codifica in ('utf-8-sig', 'cp1252'):
+        try:
+            with open(filepath, newline='', encoding=codifica) as f:
+                return _df_voti_da_righe(_righe_testo(f, separatore))
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"Codifica del file {os.path.basename(filepath)} non riconosciuta")
+
+
+def leggi_testo_voti(testo: str, separatore: Optional[str] = None) -> pd.DataFrame:
+    """
+    Legge i voti da una tabella incollata come testo (es. copiata da una
+    pagina web o da un foglio di calcolo), come leggi_csv_voti.
+    
+    Args:
+        testo: tabella con una riga per giocatore e la riga di intestazione
+        separatore: separatore delle colonne (default: dedotto dal testo)
+    
+    Returns:
+        pd.DataFrame: DataFrame con i dati processati
+    """
+    return _df_voti_da_righe(_righe_testo(io.StringIO(testo, newline=''), separatore))
+
+
+def leggi_voti(filepath: str) -> pd.DataFrame:
+    """
+    Legge un file di voti scegliendo il lettore dall'estensione:
+    CSV/TSV/TXT con leggi_csv_voti, altrimenti Excel con leggi_excel_voti.
+    
+    Args:
+        filepath: percorso del file
+    
+    Returns:
+        pd.DataFrame: DataFrame con i dati processati
+    """
+    if str(filepath).lower().endswith(ESTENSIONI_TESTO):
+        return leggi_csv_voti(filepath)
+    return leggi_excel_voti(filepath)
+
+
+def _normalizza_df_voti(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizza un DataFrame di voti appena letto: nomi delle colonne,
+    colonne obbligatorie e opzionali, eventi numerici, voto base e nota.
+    
+    Args:
+        df: DataFrame con le colonne originali del file
+    
+    Returns:
+        pd.DataFrame: DataFrame con colonne standard
+    """
     # Normalizza i nomi delle colonne (rimuovi spazi, converti in minuscolo, rimuovi caratteri speciali)
     df.columns = df.columns.str.strip().str.lower().str.replace('[^a-z0-9]', '', regex=True)
     
@@ -154,14 +500,11 @@ def leggi_excel_voti(filepath: str) -> pd.DataFrame:
             df[col] = default
     
     # Converti le colonne numeriche
-    numeric_cols = ['gf', 'gs', 'rp', 'rf', 'rs', 'au', 'amm', 'esp', 'ass']
-    for col in numeric_cols:
+    for col in COLONNE_EVENTI:
         df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
     
     # Parsa i voti
-    df[['voto_base', 'nota']] = df['voto'].apply(
-        lambda x: pd.Series(parse_voto_excel(x))
-    )
+    df[['voto_base', 'nota']] = parse_voti_colonna(df['voto'])
     
     # Normalizza ruolo (maiuscolo, solo prima lettera)
     df['ruolo'] = df['ruolo'].str.strip().str.upper().str[0]
@@ -169,100 +512,172 @@ def leggi_excel_voti(filepath: str) -> pd.DataFrame:
     # Normalizza nome
     df['nome'] = df['nome'].str.strip()
     
+    # Solo le colonne usate nel calcolo: codici, squadra e altre colonne del file non servono
+    return compatta_df_voti(df[list(COLONNE_VOTI)])
+
+
+def compatta_df_voti(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte un DataFrame di voti normalizzato in tipi compatti, per tenere
+    in memoria (es. nella cache della sessione Streamlit) molti file insieme.
+    Gli eventi diventano il più piccolo intero che li contiene (int8 per i
+    file reali), voto_base float32 solo se tutti i voti restano esatti,
+    ruolo e nota categoriali.
+    
+    Args:
+        df: DataFrame con le colonne COLONNE_VOTI
+    
+    Returns:
+        pd.DataFrame: nuovo DataFrame con gli stessi valori e tipi compatti
+    """
+    df = df.copy()
+    
+    for col in COLONNE_EVENTI:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    
+    # I voti sono multipli di 0.25 o 0.5, esatti in float32; un voto strano resta float64
+    voto_base = df['voto_base'].astype(np.float32)
+    if (voto_base.astype(np.float64) == df['voto_base']).all():
+        df['voto_base'] = voto_base
+    
+    df['ruolo'] = df['ruolo'].astype('category')
+    df['nota'] = df['nota'].astype('category')
+    
     return df
 
 
-def calcola_bonus_malus_excel(row: pd.Series) -> float:
+def calcola_bonus_malus_excel(row: pd.Series, regolamento: RegolamentoCompilato = None) -> float:
     """
     Calcola il bonus/malus per una riga del DataFrame Excel.
     
     Args:
         row: riga del DataFrame con le colonne degli eventi
+        regolamento: regolamento da applicare (default: standard)
     
     Returns:
         float: bonus/malus totale
     """
-    return calcola_bonus_malus_da_eventi(
-        gol_fatti=int(row.get('gf', 0)),
-        gol_subiti=int(row.get('gs', 0)),
-        rigori_parati=int(row.get('rp', 0)),
-        rigori_fatti=int(row.get('rf', 0)),
-        rigori_sbagliati=int(row.get('rs', 0)),
-        autogol=int(row.get('au', 0)),
-        ammonizioni=int(row.get('amm', 0)),
-        espulsioni=int(row.get('esp', 0)),
-        assist=int(row.get('ass', 0)),
-        ruolo=row.get('ruolo', '')
-    )
+    eventi = {campo: int(row.get(colonna, 0)) for colonna, campo in CAMPI_EVENTI.items()}
+    return calcola_bonus_malus_da_eventi(**eventi, ruolo=row.get('ruolo', ''), regolamento=regolamento)
+
+
+def calcola_bonus_malus_colonne(df: pd.DataFrame, regolamento: RegolamentoCompilato = None) -> pd.Series:
+    """
+    Calcola il bonus/malus di tutte le righe del DataFrame Excel in un colpo solo.
+    Versione per colonne di calcola_bonus_malus_excel: applica le stesse regole
+    nello stesso ordine, quindi il risultato è identico riga per riga.
+    
+    Args:
+        df: DataFrame con le colonne degli eventi (gf, gs, rp, rf, rs, au, amm, esp, ass, ruolo)
+        regolamento: regolamento da applicare (default: standard)
+    
+    Returns:
+        pd.Series: bonus/malus totale per ogni riga
+    """
+    reg = risolvi_regolamento(regolamento)
+    
+    def colonna(nome):
+        if nome not in df.columns:
+            return np.zeros(len(df))
+        return df[nome].to_numpy(dtype=np.float64)
+    
+    bonus_malus = np.zeros(len(df))
+    for evento, peso in zip(EVENTI_BONUS_MALUS, reg.pesi_eventi):
+        bonus_malus += colonna(_COLONNA_EVENTO[evento]) * peso
+    
+    # Bonus/malus specifici per portiere
+    if 'ruolo' in df.columns:
+        gol_subiti = colonna(_COLONNA_EVENTO['gol_subiti'])
+        is_portiere = df['ruolo'].isin(['P']).to_numpy()
+        bonus_malus = np.where(is_portiere, bonus_malus + gol_subiti * reg.gol_subiti_portiere, bonus_malus)
+        bonus_malus = np.where(is_portiere & (gol_subiti == 0), bonus_malus + reg.porta_inviolata, bonus_malus)
+    
+    return pd.Series(bonus_malus, index=df.index)
 
 
 def applica_voti_excel_a_formazione(
     df_excel: pd.DataFrame,
-    formazione: List[Dict],
-    use_fallback: bool = True
-) -> List[Dict]:
+    formazione: List[Giocatore],
+    use_fallback: bool = True,
+    regolamento: RegolamentoCompilato = None,
+    da_confermare: Optional[List[Corrispondenza]] = None
+) -> List[GiocatorePunteggio]:
     """
     Applica i voti da Excel a una formazione.
+    Sono applicate solo le corrispondenze sicure (Corrispondenza.automatica):
+    quelle ambigue o poco affidabili sono trattate come non trovate.
     
     Args:
         df_excel: DataFrame con i voti da Excel
-        formazione: lista di giocatori della formazione
+        formazione: lista di giocatori della formazione (GiocatorePunteggio o dict)
         use_fallback: se True, applica fallback per giocatori non trovati
+        regolamento: regolamento da applicare (default: standard)
+        da_confermare: se indicata, vi vengono aggiunte le corrispondenze non
+            applicate, da confermare a mano
     
     Returns:
-        List[Dict]: formazione aggiornata con voti e bonus/malus
+        List[GiocatorePunteggio]: formazione aggiornata con voti e bonus/malus
     """
-    # Crea un dizionario nome -> dati per lookup veloce
-    voti_dict = {}
-    for _, row in df_excel.iterrows():
-        nome = row['nome'].strip().lower()
-        voti_dict[nome] = row
+    # Indice dei nomi del file: accenti, iniziali e refusi non impediscono l'abbinamento
+    indice = IndiceNomi(
+        df_excel['nome'],
+        df_excel['ruolo'] if 'ruolo' in df_excel.columns else None
+    )
     
     # Aggiorna la formazione
     formazione_aggiornata = []
     
     for giocatore in formazione:
-        nome_giocatore = giocatore['nome'].strip().lower()
+        if isinstance(giocatore, dict):
+            giocatore = GiocatorePunteggio.da_dict(giocatore)
+        
+        corrispondenza = indice.cerca(giocatore.nome, giocatore.ruolo)
         
-        if nome_giocatore in voti_dict:
+        # Le corrispondenze ambigue (es. due "Martinez") o poco sicure non vengono applicate
+        if corrispondenza is not None and not corrispondenza.automatica:
+            if da_confermare is not None:
+                da_confermare.append(corrispondenza)
+            corrispondenza = None
+        
+        if corrispondenza is not None:
             # Giocatore trovato nel file Excel
-            row = voti_dict[nome_giocatore]
-            
-            # Calcola bonus/malus
-            bonus_malus = calcola_bonus_malus_excel(row)
-            
-            giocatore_aggiornato = giocatore.copy()
-            giocatore_aggiornato['voto_base'] = float(row['voto_base'])
-            giocatore_aggiornato['bonus_malus'] = bonus_malus
-            giocatore_aggiornato['nota'] = row.get('nota', '')
-            giocatore_aggiornato['from_excel'] = True
+            row = df_excel.iloc[corrispondenza.indice]
             
-            # Salva anche gli eventi per trasparenza
-            giocatore_aggiornato['eventi'] = {
-                'gol_fatti': int(row.get('gf', 0)),
-                'gol_subiti': int(row.get('gs', 0)),
-                'rigori_parati': int(row.get('rp', 0)),
-                'rigori_fatti': int(row.get('rf', 0)),
-                'rigori_sbagliati': int(row.get('rs', 0)),
-                'autogol': int(row.get('au', 0)),
-                'ammonizioni': int(row.get('amm', 0)),
-                'espulsioni': int(row.get('esp', 0)),
-                'assist': int(row.get('ass', 0))
-            }
-            
-            formazione_aggiornata.append(giocatore_aggiornato)
+            formazione_aggiornata.append(GiocatorePunteggio(
+                nome=giocatore.nome,
+                ruolo=giocatore.ruolo,
+                voto_base=float(row['voto_base']),
+                bonus_malus=calcola_bonus_malus_excel(row, regolamento),
+                note=row.get('nota', ''),
+                id=giocatore.id,
+                # Salva anche gli eventi per trasparenza
+                eventi={
+                    'gol_fatti': int(row.get('gf', 0)),
+                    'gol_subiti': int(row.get('gs', 0)),
+                    'rigori_parati': int(row.get('rp', 0)),
+                    'rigori_fatti': int(row.get('rf', 0)),
+                    'rigori_sbagliati': int(row.get('rs', 0)),
+                    'autogol': int(row.get('au', 0)),
+                    'ammonizioni': int(row.get('amm', 0)),
+                    'espulsioni': int(row.get('esp', 0)),
+                    'assist': int(row.get('ass', 0))
+                },
+                da_excel=True
+            ))
         else:
             # Giocatore non trovato
             if use_fallback:
                 # Applica fallback: voto 6, bonus/malus 0, nota SV
-                giocatore_aggiornato = giocatore.copy()
-                giocatore_aggiornato['voto_base'] = 6.0
-                giocatore_aggiornato['bonus_malus'] = 0.0
-                giocatore_aggiornato['nota'] = 'SV'
-                giocatore_aggiornato['from_excel'] = False
-                giocatore_aggiornato['eventi'] = {}
-                
-                formazione_aggiornata.append(giocatore_aggiornato)
+                formazione_aggiornata.append(GiocatorePunteggio(
+                    nome=giocatore.nome,
+                    ruolo=giocatore.ruolo,
+                    voto_base=6.0,
+                    bonus_malus=0.0,
+                    note='SV',
+                    id=giocatore.id,
+                    eventi={},
+                    da_excel=False
+                ))
             else:
                 # Non applicare fallback, mantieni i dati esistenti
                 formazione_aggiornata.append(giocatore)
@@ -270,22 +685,88 @@ def applica_voti_excel_a_formazione(
     return formazione_aggiornata
 
 
-def importa_voti_excel(filepath: str) -> Dict[str, pd.DataFrame]:
+def importa_voti_excel(
+    filepath: str,
+    vettoriale: bool = True,
+    regolamento: RegolamentoCompilato = None,
+    usa_cache: bool = False,
+    fogli: List[str] = None
+) -> Dict[str, pd.DataFrame]:
     """
-    Importa i voti da un file Excel e restituisce il DataFrame processato.
+    Importa i voti da un file Excel (o CSV/TSV) e restituisce il DataFrame processato.
     
     Args:
-        filepath: percorso del file Excel
+        filepath: percorso del file Excel, o di un file .csv/.tsv/.txt
+        vettoriale: se True calcola i bonus/malus per colonne (calcola_bonus_malus_colonne),
+            altrimenti riga per riga con calcola_bonus_malus_excel
+        regolamento: regolamento da applicare (default: standard)
+        usa_cache: se True riusa i voti già letti da un file con lo stesso
+            contenuto (cache_voti), senza rileggere l'Excel
+        fogli: fogli da leggere con leggi_excel_fogli (colonna 'foglio');
+            default: solo il primo foglio
     
     Returns:
         Dict con 'df' (DataFrame processato) e 'summary' (sommario)
     """
     try:
         # Leggi e processa il file
-        df = leggi_excel_voti(filepath)
-        
+        if usa_cache:
+            from cache_voti import leggi_excel_voti_con_cache
+            df = leggi_excel_voti_con_cache(filepath, fogli=fogli)
+        elif fogli is not None:
+            df = leggi_excel_fogli(filepath, fogli)
+        else:
+            df = leggi_voti(filepath)
+    except Exception as e:
+        return _import_fallito(e)
+    
+    return _risultato_import(df, vettoriale, regolamento)
+
+
+def importa_voti_testo(
+    testo: str,
+    vettoriale: bool = True,
+    regolamento: RegolamentoCompilato = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Importa i voti da una tabella incollata come testo, come importa_voti_excel.
+    
+    Args:
+        testo: tabella con intestazione (colonne separate da tab, ; o ,)
+        vettoriale: se True calcola i bonus/malus per colonne
+        regolamento: regolamento da applicare (default: standard)
+    
+    Returns:
+        Dict con 'df' (DataFrame processato) e 'summary' (sommario)
+    """
+    try:
+        df = leggi_testo_voti(testo)
+    except Exception as e:
+        return _import_fallito(e)
+    
+    return _risultato_import(df, vettoriale, regolamento)
+
+
+def _import_fallito(errore: Exception) -> Dict:
+    """Risultato di un import non riuscito"""
+    return {
+        'df': None,
+        'summary': None,
+        'success': False,
+        'message': f"Errore durante l'import: {str(errore)}"
+    }
+
+
+def _risultato_import(df: pd.DataFrame, vettoriale: bool, regolamento: RegolamentoCompilato) -> Dict:
+    """Aggiunge bonus/malus e voto totale ai voti letti e prepara il sommario"""
+    try:
         # Calcola bonus/malus per ogni riga
-        df['bonus_malus_calcolato'] = df.apply(calcola_bonus_malus_excel, axis=1)
+        if vettoriale:
+            df['bonus_malus_calcolato'] = calcola_bonus_malus_colonne(df, regolamento)
+        else:
+            df['bonus_malus_calcolato'] = df.apply(
+                calcola_bonus_malus_excel, axis=1, regolamento=regolamento
+            )
         
         # Calcola voto totale
         df['voto_totale'] = df['voto_base'] + df['bonus_malus_calcolato']
@@ -307,12 +788,7 @@ def importa_voti_excel(filepath: str) -> Dict[str, pd.DataFrame]:
         }
         
     except Exception as e:
-        return {
-            'df': None,
-            'summary': None,
-            'success': False,
-            'message': f"Errore durante l'import: {str(e)}"
-        }
+        return _import_fallito(e)
 
 
 def esporta_template_excel(filepath: str = "template_voti.xlsx"):
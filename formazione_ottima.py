@@ -0,0 +1,391 @@
+"""
+Ottimizzatore della formazione.
+Sceglie modulo e 11 titolari da una rosa che massimizzano i gol attesi
+(differenza reti se l'avversario è noto) secondo le regole di calc.py
+(modificatori difesa, centrocampo e attacco e tabella dei gol compresi).
+"""
+
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+
+from calc import (
+    calcola_gol_da_punteggio,
+    cerca_in_tabella,
+    calcola_modificatore_difesa,
+    calcola_modificatore_centrocampo,
+    calcola_modificatore_attacco,
+    correzione_numero_difensori
+)
+from db import Formazione, Voto
+from regolamento import RegolamentoCompilato, risolvi_regolamento
+
+
+# Moduli ammessi: (difensori, centrocampisti, attaccanti) oltre al portiere
+MODULI = {
+    '3-4-3': (3, 4, 3),
+    '3-5-2': (3, 5, 2),
+    '4-3-3': (4, 3, 3),
+    '4-4-2': (4, 4, 2),
+    '4-5-1': (4, 5, 1),
+    '5-3-2': (5, 3, 2),
+    '5-4-1': (5, 4, 1)
+}
+
+
+def medie_storico(db) -> Dict[str, Tuple[float, float]]:
+    """
+    Voto base e bonus/malus medi di ogni giocatore sui voti già inseriti,
+    da usare come valori attesi della rosa.
+
+    Args:
+        db: DatabaseManager
+
+    Returns:
+        Dict: nome del giocatore (minuscolo) -> (voto base medio, bonus/malus medio)
+    """
+    session = db.get_session()
+    nome = func.lower(func.trim(Formazione.giocatore))
+    righe = (
+        session.query(nome, func.avg(Voto.voto_base), func.avg(Voto.bonus_malus_totale))
+        .join(Voto, Voto.formazione_id == Formazione.id)
+        # Esclude i voti di default mai compilati
+        .filter(or_(
+            Voto.voto_base != 6.0,
+            Voto.bonus_malus_totale != 0.0,
+            Voto.note != "",
+            Voto.is_manual_override.is_(True)
+        ))
+        .group_by(nome)
+        .all()
+    )
+    return {giocatore: (voto, bonus or 0.0) for giocatore, voto, bonus in righe}
+
+
+def _voto_totale(giocatore: Dict) -> float:
+    """Voto totale atteso di un giocatore (regolamento A)"""
+    return giocatore['voto_base'] + giocatore['bonus_malus']
+
+
+def _migliore_sottoinsieme(
+    candidati: List[Dict],
+    numero: int,
+    valuta: Callable[[float, float], float],
+    bonus_massimo: float
+) -> Tuple[float, List[Dict]]:
+    """
+    Branch and bound sui sottoinsiemi di un reparto.
+
+    Il valore di un sottoinsieme è valuta(somma voti totali, somma voti base),
+    che non supera mai somma voti totali + bonus_massimo. I candidati vengono
+    esplorati in ordine di voto totale decrescente: il primo ramo completo è
+    la scelta "golosa" e i rami successivi vengono tagliati appena la somma dei
+    migliori voti ancora disponibili più bonus_massimo non può battere il
+    migliore trovato.
+
+    Args:
+        candidati: giocatori del reparto
+        numero: quanti giocatori scegliere
+        valuta: funzione (somma_totali, somma_base) -> valore del reparto
+        bonus_massimo: limite superiore di valuta(t, b) - t
+
+    Returns:
+        Tuple: (valore, giocatori scelti)
+    """
+    ordinati = sorted(candidati, key=_voto_totale, reverse=True)
+    totali = [_voto_totale(g) for g in ordinati]
+    basi = [g['voto_base'] for g in ordinati]
+    # prefissi[i] = somma dei primi i voti totali: i migliori j da i in poi
+    # valgono prefissi[i + j] - prefissi[i]
+    prefissi = [0.0] + list(accumulate(totali))
+
+    migliore_valore = float('-inf')
+    migliore_scelta = []
+    scelta = []
+
+    def esplora(inizio, mancanti, somma_totali, somma_base):
+        nonlocal migliore_valore, migliore_scelta
+
+        if mancanti == 0:
+            valore = valuta(somma_totali, somma_base)
+            if valore > migliore_valore:
+                migliore_valore = valore
+                migliore_scelta = scelta.copy()
+            return
+
+        for i in range(inizio, len(ordinati) - mancanti + 1):
+            limite = somma_totali + prefissi[i + mancanti] - prefissi[i] + bonus_massimo
+            if limite <= migliore_valore:
+                # Da qui in avanti i voti totali sono solo più bassi
+                return
+            scelta.append(i)
+            esplora(i + 1, mancanti - 1, somma_totali + totali[i], somma_base + basi[i])
+            scelta.pop()
+
+    esplora(0, numero, 0.0, 0.0)
+
+    return migliore_valore, [ordinati[i] for i in migliore_scelta]
+
+
+def _migliori_per_modificatore(
+    candidati: List[Dict],
+    numero: int,
+    modificatore: Callable[[float], float],
+    valori: Iterable[float]
+) -> List[Tuple[float, float, List[Dict]]]:
+    """
+    Per ogni valore possibile del modificatore di un reparto, il sottoinsieme
+    con la somma dei voti totali più alta che lo ottiene (branch and bound
+    con il modificatore fissato). Fissato il modificatore, più voti totali
+    significano sempre più punteggio: queste sono le sole scelte del reparto
+    che possono dare il massimo dei gol attesi.
+
+    Args:
+        candidati: giocatori del reparto
+        numero: quanti giocatori scegliere
+        modificatore: funzione somma voti base -> modificatore del reparto
+        valori: valori possibili del modificatore
+
+    Returns:
+        List: (modificatore, somma voti totali, giocatori scelti)
+    """
+    migliori = []
+    for valore in sorted(set(valori)):
+        def valuta(somma_totali, somma_base, valore=valore):
+            return somma_totali if modificatore(somma_base) == valore else float('-inf')
+
+        somma, scelti = _migliore_sottoinsieme(candidati, numero, valuta, 0.0)
+        if scelti:
+            migliori.append((valore, somma, scelti))
+    return migliori
+
+
+def _difese(
+    difensori: List[Dict],
+    numero: int,
+    reg: RegolamentoCompilato
+) -> List[Tuple[float, float, List[Dict]]]:
+    """
+    Difese candidate, una per modificatore concesso all'avversario
+    (regolamento D): più basso è, meno punti prende l'avversario.
+    """
+    correzione = correzione_numero_difensori(numero, reg)
+
+    def modificatore(somma_base):
+        return cerca_in_tabella(reg.tabella_difesa, somma_base / numero) + correzione
+
+    return _migliori_per_modificatore(
+        difensori, numero, modificatore, (v + correzione for v in reg.tabella_difesa.valori)
+    )
+
+
+def _centrocampi(
+    centrocampisti: List[Dict],
+    numero: int,
+    voti_avversario: List[float],
+    reg: RegolamentoCompilato
+) -> List[Tuple[float, float, List[Dict]]]:
+    """
+    Centrocampi candidati, uno per modificatore centrocampo (regolamento E):
+    quanto guadagniamo noi lo perde l'avversario.
+    """
+    if voti_avversario is None:
+        somma, scelti = _migliore_sottoinsieme(centrocampisti, numero, lambda t, b: t, 0.0)
+        return [(0.0, somma, scelti)]
+
+    # Voto d'ufficio per i centrocampisti mancanti, come in calcola_modificatore_centrocampo
+    num_avversario = len(voti_avversario)
+    ufficio_nostro = reg.voto_ufficio_centrocampo * max(num_avversario - numero, 0)
+    somma_avversario = sum(voti_avversario) + reg.voto_ufficio_centrocampo * max(numero - num_avversario, 0)
+
+    def modificatore(somma_base):
+        somma_nostra = somma_base + ufficio_nostro
+        valore = cerca_in_tabella(reg.tabella_centrocampo, abs(somma_nostra - somma_avversario))
+        if somma_nostra > somma_avversario:
+            return valore
+        elif somma_nostra < somma_avversario:
+            return -valore
+        return 0.0
+
+    valori = [0.0, *reg.tabella_centrocampo.valori, *(-v for v in reg.tabella_centrocampo.valori)]
+    return _migliori_per_modificatore(centrocampisti, numero, modificatore, valori)
+
+
+def _migliore_attacco(
+    attaccanti: List[Dict],
+    numero: int,
+    reg: RegolamentoCompilato
+) -> Tuple[float, List[Dict]]:
+    """
+    Attacco migliore (regolamento F): il modificatore dipende solo dal singolo
+    attaccante, quindi bastano i migliori per voto totale più modificatore.
+    """
+    def valore(giocatore):
+        bonus = 0.0
+        if giocatore['bonus_malus'] == 0:
+            bonus = cerca_in_tabella(reg.tabella_attacco, giocatore['voto_base'])
+        return _voto_totale(giocatore) + bonus
+
+    scelti = sorted(attaccanti, key=valore, reverse=True)[:numero]
+    return sum(valore(g) for g in scelti), scelti
+
+
+def calcola_formazione_ottima(
+    rosa: List[Dict],
+    avversario: List[Dict] = None,
+    moduli: Dict[str, Tuple[int, int, int]] = None,
+    regolamento: RegolamentoCompilato = None,
+    casa: Optional[bool] = None
+) -> Dict:
+    """
+    Sceglie modulo e titolari che massimizzano i gol attesi.
+
+    I gol si ricavano dal punteggio con calcola_gol_da_punteggio (regolamento
+    H). Con un avversario conta la differenza fra gol fatti e subiti: il
+    punteggio avversario comprende il modificatore difesa che la nostra
+    difesa gli concede e il modificatore centrocampo che perde; senza
+    avversario contano solo i gol fatti. A parità di gol vince il margine
+    (punteggio della squadra meno quanto la formazione concede all'avversario:
+    voto squadra + modificatore attacco + 2 x modificatore centrocampo -
+    modificatore difesa generato). Il vantaggio casa si somma, come in
+    calc.py, al punteggio della squadra di casa prima della tabella dei gol.
+
+    La tabella dei gol è a gradini, quindi non guida la ricerca: per ogni
+    modulo portiere e attaccanti si scelgono ordinando, mentre difesa e
+    centrocampo danno con un branch and bound una scelta per ogni valore del
+    proprio modificatore (la più alta in voti totali); le combinazioni di
+    queste poche scelte vengono poi valutate in gol. Ogni reparto viene
+    risolto una sola volta per numero di giocatori e condiviso fra i moduli.
+
+    Args:
+        rosa: giocatori disponibili (dict con 'nome', 'ruolo', 'voto_base'
+            e 'bonus_malus' attesi)
+        avversario: formazione avversaria (stesso formato); senza avversario
+            il modificatore centrocampo non viene considerato
+        moduli: moduli ammessi (default: MODULI)
+        regolamento: regolamento da applicare (default: standard)
+        casa: True se giochiamo in casa, False se in casa gioca l'avversario,
+            None per ignorare il vantaggio casa (campo neutro)
+
+    Returns:
+        Dict con 'modulo', 'titolari' (ordinati P, D, C, A), 'gol_attesi',
+        'gol_subiti_attesi' (None senza avversario), 'margine', 'punteggio'
+        (voto squadra + modificatori propri), 'vantaggio_casa' (sommato ai
+        nostri gol attesi), i modificatori, 'gol_moduli'
+        (differenza reti, o gol fatti, della scelta migliore di ogni modulo
+        possibile) e 'margini_moduli' (margine della stessa scelta)
+    """
+    reg = risolvi_regolamento(regolamento)
+    if moduli is None:
+        moduli = MODULI
+
+    reparti = {'P': [], 'D': [], 'C': [], 'A': []}
+    for giocatore in rosa:
+        if giocatore['ruolo'] in reparti:
+            reparti[giocatore['ruolo']].append(giocatore)
+
+    if not reparti['P']:
+        raise ValueError("La rosa non contiene nessun portiere")
+
+    # Vantaggio casa (regolamento G) di ciascuna squadra
+    vantaggio = reg.vantaggio_casa if casa is True else 0.0
+    vantaggio_avversario = reg.vantaggio_casa if casa is False else 0.0
+
+    voti_avversario = None
+    # Parte del nostro punteggio dovuta all'avversario (e al campo) e punteggio
+    # avversario che non dipende dalla nostra formazione
+    mod_difesa_avversario = 0.0
+    punteggio_avversario = None
+    if avversario is not None:
+        voti_avversario = [g['voto_base'] for g in avversario if g['ruolo'] == 'C']
+        difensori_avversario = [g['voto_base'] for g in avversario if g['ruolo'] == 'D']
+        mod_difesa_avversario = calcola_modificatore_difesa(difensori_avversario, len(difensori_avversario), reg)
+        punteggio_avversario = (
+            sum(_voto_totale(g) for g in avversario) +
+            calcola_modificatore_attacco([g for g in avversario if g['ruolo'] == 'A'], reg) +
+            vantaggio_avversario
+        )
+
+    portiere = max(reparti['P'], key=_voto_totale)
+
+    # Ogni reparto si risolve una volta per numero di giocatori
+    difese = {}
+    centrocampi = {}
+    attacchi = {}
+
+    gol_moduli = {}
+    margini_moduli = {}
+    scelte = {}
+
+    for nome_modulo, (num_dif, num_cen, num_att) in moduli.items():
+        if (len(reparti['D']) < num_dif or
+                len(reparti['C']) < num_cen or
+                len(reparti['A']) < num_att):
+            continue
+
+        if num_dif not in difese:
+            difese[num_dif] = _difese(reparti['D'], num_dif, reg)
+        if num_cen not in centrocampi:
+            centrocampi[num_cen] = _centrocampi(reparti['C'], num_cen, voti_avversario, reg)
+        if num_att not in attacchi:
+            attacchi[num_att] = _migliore_attacco(reparti['A'], num_att, reg)
+
+        valore_attacco, attaccanti = attacchi[num_att]
+        migliore = None
+        for mod_difesa, somma_difesa, difensori in difese[num_dif]:
+            for mod_centrocampo, somma_centrocampo, centrocampisti in centrocampi[num_cen]:
+                punteggio = (
+                    _voto_totale(portiere) + somma_difesa + somma_centrocampo +
+                    mod_centrocampo + valore_attacco
+                )
+                gol = calcola_gol_da_punteggio(punteggio + mod_difesa_avversario + vantaggio, reg)
+                if punteggio_avversario is not None:
+                    gol -= calcola_gol_da_punteggio(
+                        punteggio_avversario - mod_centrocampo + mod_difesa, reg
+                    )
+                margine = punteggio + mod_centrocampo - mod_difesa
+                if migliore is None or (gol, margine) > migliore[:2]:
+                    migliore = (gol, margine, difensori, centrocampisti, attaccanti)
+
+        gol_moduli[nome_modulo], margini_moduli[nome_modulo] = migliore[:2]
+        scelte[nome_modulo] = migliore[2:]
+
+    if not scelte:
+        raise ValueError("La rosa non ha abbastanza giocatori per nessun modulo ammesso")
+
+    modulo = max(scelte, key=lambda m: (gol_moduli[m], margini_moduli[m]))
+    num_dif, num_cen, num_att = moduli[modulo]
+    difensori, centrocampisti, attaccanti = scelte[modulo]
+    titolari = [portiere] + difensori + centrocampisti + attaccanti
+
+    # Valori finali ricalcolati con il motore di calcolo
+    voto_squadra = sum(_voto_totale(g) for g in titolari)
+    mod_difesa = calcola_modificatore_difesa([g['voto_base'] for g in difensori], num_dif, reg)
+    mod_attacco = calcola_modificatore_attacco(attaccanti, reg)
+    mod_centrocampo = 0.0
+    if voti_avversario is not None:
+        mod_centrocampo, _ = calcola_modificatore_centrocampo(
+            [g['voto_base'] for g in centrocampisti], voti_avversario, reg
+        )
+    punteggio = voto_squadra + mod_centrocampo + mod_attacco
+
+    gol_subiti = None
+    if punteggio_avversario is not None:
+        gol_subiti = calcola_gol_da_punteggio(punteggio_avversario - mod_centrocampo + mod_difesa, reg)
+
+    return {
+        'modulo': modulo,
+        'titolari': titolari,
+        'gol_attesi': calcola_gol_da_punteggio(punteggio + mod_difesa_avversario + vantaggio, reg),
+        'gol_subiti_attesi': gol_subiti,
+        'margine': voto_squadra + mod_attacco + 2 * mod_centrocampo - mod_difesa,
+        'punteggio': punteggio,
+        'vantaggio_casa': vantaggio,
+        'voto_squadra': voto_squadra,
+        'modificatore_difesa_generato': mod_difesa,
+        'modificatore_centrocampo': mod_centrocampo,
+        'modificatore_attacco': mod_attacco,
+        'gol_moduli': gol_moduli,
+        'margini_moduli': margini_moduli
+    }
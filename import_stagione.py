@@ -0,0 +1,416 @@
+"""
+Import in blocco dei voti di più giornate.
+Legge una cartella (o un archivio zip) con un file Excel o CSV per giornata,
+analizza i file in parallelo con leggi_voti, salva i voti ufficiali di
+ogni giornata e scrive i voti di tutte le formazioni in un'unica transazione.
+
+Uso da riga di comando:
+    python import_stagione.py voti_2024/ --db fantacalcio.db
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from classifica import ricalcola_partite, ricostruisci_classifica
+from db import CAMPI_EVENTI, DatabaseManager, RisultatoPartita
+from excel_import import ESTENSIONI_VOTI, calcola_bonus_malus_colonne, leggi_voti
+from indice_nomi import IndiceNomi
+from regolamento import RegolamentoCompilato, risolvi_regolamento
+
+
+# Numero dopo "giornata", "giorn", "gg" o "g" all'inizio di una parola del nome
+# del file (es. "Voti_Giornata_05.xlsx", "g07.xlsx", ma non "big6")
+_RE_GIORNATA = re.compile(r'(?<![a-z])(?:giornata|giorn|gg|g)[\s_\-.]*(\d{1,2})(?!\d)', re.IGNORECASE)
+_RE_NUMERO = re.compile(r'(?<!\d)(\d{1,2})(?!\d)')
+
+def numero_giornata_da_nome(nome_file: str) -> Optional[int]:
+    """
+    Ricava il numero di giornata dal nome di un file di voti.
+    Cerca prima un numero preceduto da "giornata" (o "g"), altrimenti usa
+    l'ultimo numero di una o due cifre del nome ("2024_25_07.xlsx" -> 7).
+
+    Args:
+        nome_file: nome o percorso del file
+
+    Returns:
+        int: numero di giornata, oppure None se il nome non ne contiene
+    """
+    nome = os.path.splitext(os.path.basename(nome_file))[0]
+
+    trovato = _RE_GIORNATA.search(nome)
+    if trovato:
+        return int(trovato.group(1))
+
+    numeri = [int(n) for n in _RE_NUMERO.findall(nome) if int(n) > 0]
+    return numeri[-1] if numeri else None
+
+
+def elenca_file_voti(cartella: str) -> List[str]:
+    """Percorsi dei file di voti di una cartella (sottocartelle comprese), in ordine"""
+    file_voti = []
+    for radice, _, nomi in os.walk(cartella):
+        for nome in nomi:
+            if nome.lower().endswith(ESTENSIONI_VOTI) and not nome.startswith(('~$', '.')):
+                file_voti.append(os.path.join(radice, nome))
+    return sorted(file_voti)
+
+
+@contextmanager
+def _file_da_importare(percorso: str) -> Iterator[List[str]]:
+    """File di voti di una cartella o di un archivio zip (estratto in una cartella temporanea)"""
+    if os.path.isdir(percorso):
+        yield elenca_file_voti(percorso)
+    elif zipfile.is_zipfile(percorso):
+        with tempfile.TemporaryDirectory() as cartella:
+            with zipfile.ZipFile(percorso) as archivio:
+                archivio.extractall(cartella)
+            yield elenca_file_voti(cartella)
+    elif percorso.lower().endswith(ESTENSIONI_VOTI):
+        yield [percorso]
+    else:
+        raise ValueError(f"{percorso}: serve una cartella, un archivio zip o un file di voti")
+
+
+def _leggi_file_task(percorso: str) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """Legge un file di voti in un processo separato: (DataFrame, None) o (None, errore)"""
+    try:
+        return leggi_voti(percorso), None
+    except Exception as e:
+        return None, str(e)
+
+
+def leggi_file_voti(percorsi: List[str], num_processi: int = None) -> List[Tuple[Optional[pd.DataFrame], Optional[str]]]:
+    """
+    Legge più file di voti in parallelo.
+
+    Args:
+        percorsi: file di voti da leggere (Excel o CSV)
+        num_processi: processi in parallelo (default: numero di core)
+
+    Returns:
+        List: per ogni file (DataFrame normalizzato, None) oppure (None, messaggio di errore)
+    """
+    if num_processi is None:
+        num_processi = os.cpu_count() or 1
+    num_processi = min(num_processi, len(percorsi))
+
+    if num_processi > 1:
+        with ProcessPoolExecutor(max_workers=num_processi) as executor:
+            return list(executor.map(_leggi_file_task, percorsi))
+    return [_leggi_file_task(p) for p in percorsi]
+
+
+def voti_per_formazioni(
+    df: pd.DataFrame,
+    formazioni: List,
+    regolamento: RegolamentoCompilato = None
+) -> Tuple[List[Dict], List[str], List[str]]:
+    """
+    Abbina i giocatori schierati alle righe di un file di voti.
+    I giocatori non trovati, o con una corrispondenza ambigua o poco sicura
+    (vedi Corrispondenza.automatica), ricevono 6 SV come nell'import di una
+    singola partita; questi ultimi sono elencati fra gli ambigui, da confermare.
+
+    Args:
+        df: voti normalizzati di una giornata
+        formazioni: GiocatorePunteggio della giornata (con id della formazione)
+        regolamento: regolamento da applicare (default: standard)
+
+    Returns:
+        Tuple: (aggiornamenti per DatabaseManager.aggiorna_voti_bulk,
+        nomi non trovati, nomi ambigui o da confermare)
+    """
+    indice = IndiceNomi(df['nome'], df['ruolo'])
+    # Bonus/malus con il ruolo della formazione, come nell'import di una partita
+    bonus_malus = calcola_bonus_malus_colonne(df.assign(ruolo=''), regolamento).to_numpy()
+    bonus_malus_portiere = calcola_bonus_malus_colonne(df.assign(ruolo='P'), regolamento).to_numpy()
+    voti_base = df['voto_base'].to_numpy()
+    note = df['nota'].to_numpy()
+    eventi = {campo: df[colonna].to_numpy() for colonna, campo in CAMPI_EVENTI.items()}
+
+    aggiornamenti = []
+    non_trovati = []
+    ambigui = []
+
+    for giocatore in formazioni:
+        corrispondenza = indice.cerca(giocatore.nome, giocatore.ruolo)
+        if corrispondenza is not None and not corrispondenza.automatica:
+            ambigui.append(giocatore.nome)
+            corrispondenza = None
+
+        if corrispondenza is None:
+            non_trovati.append(giocatore.nome)
+            aggiornamenti.append({
+                'formazione_id': giocatore.id,
+                'voto_base': 6.0,
+                'bonus_malus_totale': 0.0,
+                'note': 'SV'
+            })
+            continue
+
+        i = corrispondenza.indice
+        aggiornamento = {
+            'formazione_id': giocatore.id,
+            'voto_base': float(voti_base[i]),
+            'bonus_malus_totale': float(bonus_malus_portiere[i] if giocatore.ruolo == 'P' else bonus_malus[i]),
+            'note': note[i]
+        }
+        for campo, valori in eventi.items():
+            aggiornamento[campo] = int(valori[i])
+        aggiornamenti.append(aggiornamento)
+
+    return aggiornamenti, non_trovati, ambigui
+
+
+def confronta_voti(aggiornamenti: List[Dict], attuali: Dict[int, Dict], preserva_manuali: bool = True) -> List[Dict]:
+    """
+    Tiene solo gli aggiornamenti che cambiano davvero un voto salvato.
+
+    Args:
+        aggiornamenti: voti nel formato di voti_per_formazioni
+        attuali: voti salvati (DatabaseManager.get_voti_formazioni)
+        preserva_manuali: se True ignora i voti con override manuale
+
+    Returns:
+        List: gli aggiornamenti da scrivere, ciascuno con 'modifiche'
+        (campo -> (valore salvato, nuovo valore))
+    """
+    modificati = []
+    for aggiornamento in aggiornamenti:
+        attuale = attuali.get(aggiornamento['formazione_id'])
+        if attuale is None:
+            modificati.append(dict(aggiornamento, modifiche={
+                campo: (None, valore) for campo, valore in aggiornamento.items() if campo != 'formazione_id'
+            }))
+            continue
+        if preserva_manuali and attuale['is_manual_override']:
+            continue
+
+        modifiche = {}
+        for campo, nuovo in aggiornamento.items():
+            if campo == 'formazione_id':
+                continue
+            vecchio = attuale[campo]
+            if vecchio is None:
+                vecchio = '' if campo == 'note' else 0
+            if vecchio != nuovo:
+                modifiche[campo] = (vecchio, nuovo)
+        if modifiche:
+            modificati.append(dict(aggiornamento, modifiche=modifiche))
+
+    return modificati
+
+
+def applica_voti_giornata(
+    db,
+    numero: int,
+    df: pd.DataFrame,
+    regolamento: RegolamentoCompilato = None,
+    preserva_manuali: bool = True,
+    solo_modifiche: bool = False
+) -> Dict:
+    """
+    Applica un file di voti a tutte le partite di una giornata.
+
+    L'indice dei nomi viene costruito una volta sola e i voti di tutte le
+    formazioni sono scritti con un unico UPDATE in blocco. Le partite già in
+    classifica sono ricalcolate in blocco nella stessa transazione.
+
+    Con solo_modifiche (es. file corretto ripubblicato in settimana) il file
+    viene confrontato con i voti salvati: si scrivono solo i voti cambiati e
+    si ricalcolano solo le partite che li contengono. Rieseguire lo stesso
+    file non scrive nulla.
+
+    Args:
+        db: DatabaseManager
+        numero: numero della giornata
+        df: voti normalizzati (excel_import.leggi_excel_voti)
+        regolamento: regolamento da applicare (default: standard)
+        preserva_manuali: se True non tocca i voti con override manuale
+        solo_modifiche: se True scrive solo i voti diversi da quelli salvati
+
+    Returns:
+        Dict con 'partite' (numero di partite), 'aggiornati', 'non_trovati',
+        'ambigui', 'voti_scritti', 'ricalcolate' (partite in classifica
+        ricalcolate) e 'modifiche' (con solo_modifiche: una voce per voto
+        cambiato con giocatore, partita_id e campi modificati)
+    """
+    reg = risolvi_regolamento(regolamento)
+    partite = db.get_formazioni_stagione(numero=numero)
+    partita_di = {}
+    formazioni = []
+    for dati in partite:
+        for lato in ('casa', 'trasferta'):
+            for giocatore in dati['formazioni'][lato]:
+                partita_di[giocatore.id] = dati['partita_id']
+                formazioni.append(giocatore)
+
+    voti, non_trovati, ambigui = voti_per_formazioni(df, formazioni, reg)
+    nomi = {giocatore.id: giocatore.nome for giocatore in formazioni}
+
+    modifiche = []
+    if solo_modifiche:
+        attuali = db.get_voti_formazioni(partita_di)
+        modificati = confronta_voti(voti, attuali, preserva_manuali)
+        modifiche = [
+            {
+                'giocatore': nomi[voto['formazione_id']],
+                'partita_id': partita_di[voto['formazione_id']],
+                'campi': voto['modifiche']
+            }
+            for voto in modificati
+        ]
+        voti = [{k: v for k, v in voto.items() if k != 'modifiche'} for voto in modificati]
+        coinvolte = {partita_di[voto['formazione_id']] for voto in voti}
+    else:
+        coinvolte = set(partita_di.values())
+
+    voti_scritti = db.aggiorna_voti_bulk(voti, preserva_manuali=preserva_manuali, commit=False)
+
+    # Solo le partite già conteggiate: le altre entrano in classifica al calcolo
+    in_classifica = [
+        partita_id for partita_id, in db.session.query(RisultatoPartita.partita_id)
+        .filter(RisultatoPartita.partita_id.in_(coinvolte))
+    ] if coinvolte else []
+    ricalcolate = ricalcola_partite(db, in_classifica, reg, commit=False) if in_classifica else 0
+    if voti_scritti or ricalcolate:
+        db.session.commit()
+
+    return {
+        'partite': len(partite),
+        'aggiornati': len(formazioni) - len(non_trovati),
+        'non_trovati': non_trovati,
+        'ambigui': ambigui,
+        'voti_scritti': voti_scritti,
+        'ricalcolate': ricalcolate,
+        'modifiche': modifiche
+    }
+
+
+def importa_stagione(
+    db,
+    percorso: str,
+    regolamento: RegolamentoCompilato = None,
+    num_processi: int = None,
+    aggiorna_classifica: bool = True
+) -> Dict:
+    """
+    Importa i voti di tutte le giornate contenute in una cartella o in un zip.
+
+    Ogni file viene associato alla giornata indicata dal suo nome; i file
+    sono letti in parallelo, i voti ufficiali salvati (VotoUfficiale) e i
+    voti di tutte le giornate scritti in una sola transazione. Se richiesto,
+    la classifica viene ricostruita con il motore vettoriale.
+
+    Args:
+        db: DatabaseManager
+        percorso: cartella, archivio zip o singolo file di voti
+        regolamento: regolamento da applicare (default: standard)
+        num_processi: processi per la lettura dei file (default: numero di core)
+        aggiorna_classifica: ricostruisce la classifica dopo l'import
+
+    Returns:
+        Dict con 'giornate' (numero -> file, giocatori aggiornati, non
+        trovati, ambigui), 'errori' (messaggi per file) e 'voti_scritti'
+    """
+    reg = risolvi_regolamento(regolamento)
+    errori = []
+
+    with _file_da_importare(percorso) as percorsi:
+        file_giornata = {}
+        for file_voti in percorsi:
+            numero = numero_giornata_da_nome(file_voti)
+            nome = os.path.basename(file_voti)
+            if numero is None:
+                errori.append(f"{nome}: numero di giornata non trovato nel nome del file")
+            elif numero in file_giornata:
+                errori.append(f"{nome}: giornata {numero} già presente ({os.path.basename(file_giornata[numero])})")
+            else:
+                file_giornata[numero] = file_voti
+
+        numeri = sorted(file_giornata)
+        letti = dict(zip(numeri, leggi_file_voti([file_giornata[n] for n in numeri], num_processi)))
+
+    formazioni = {}
+    for dati in db.get_formazioni_stagione():
+        for lato in ('casa', 'trasferta'):
+            formazioni.setdefault(dati['numero'], []).extend(dati['formazioni'][lato])
+
+    giornate = {}
+    aggiornamenti = []
+    for numero in numeri:
+        nome = os.path.basename(file_giornata[numero])
+        df, errore = letti[numero]
+        if errore is not None:
+            errori.append(f"{nome}: {errore}")
+            continue
+        # I voti ufficiali restano salvati anche per le formazioni inserite in seguito
+        duplicati = db.salva_voti_ufficiali(numero, df, commit=False)['duplicati']
+        if duplicati:
+            errori.append(f"{nome}: nomi ripetuti non salvati fra i voti ufficiali: {', '.join(duplicati)}")
+        if numero not in formazioni:
+            errori.append(f"{nome}: giornata {numero} senza formazioni nel database (voti ufficiali salvati)")
+            continue
+
+        voti, non_trovati, ambigui = voti_per_formazioni(df, formazioni[numero], reg)
+        aggiornamenti.extend(voti)
+        giornate[numero] = {
+            'file': nome,
+            'aggiornati': len(voti) - len(non_trovati),
+            'non_trovati': non_trovati,
+            'ambigui': ambigui
+        }
+
+    voti_scritti = db.aggiorna_voti_bulk(aggiornamenti, commit=False)
+    db.session.commit()
+
+    if aggiorna_classifica and voti_scritti:
+        ricostruisci_classifica(db, reg)
+
+    return {
+        'giornate': giornate,
+        'errori': errori,
+        'voti_scritti': voti_scritti
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa i voti di più giornate da una cartella o da un zip")
+    parser.add_argument('percorso', help="cartella, archivio zip o file Excel/CSV (un file per giornata)")
+    parser.add_argument('--db', default='fantacalcio.db', help="database (default: fantacalcio.db)")
+    parser.add_argument('--processi', type=int, default=None, help="processi per la lettura dei file")
+    parser.add_argument('--senza-classifica', action='store_true', help="non ricostruire la classifica")
+    argomenti = parser.parse_args()
+
+    db = DatabaseManager(argomenti.db)
+    try:
+        esito = importa_stagione(
+            db,
+            argomenti.percorso,
+            regolamento=db.get_regolamento(),
+            num_processi=argomenti.processi,
+            aggiorna_classifica=not argomenti.senza_classifica
+        )
+    finally:
+        db.close()
+
+    for numero, giornata in esito['giornate'].items():
+        print(f"Giornata {numero:2d} ({giornata['file']}): {giornata['aggiornati']} voti, "
+              f"{len(giornata['non_trovati'])} non trovati")
+        if giornata['ambigui']:
+            print(f"    ambigui: {', '.join(giornata['ambigui'])}")
+    for errore in esito['errori']:
+        print(f"Errore: {errore}")
+    print(f"Voti scritti: {esito['voti_scritti']}")
+
+
+if __name__ == "__main__":
+    main()
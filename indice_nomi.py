@@ -0,0 +1,283 @@
+"""
+Indice dei nomi dei giocatori per abbinare le formazioni ai voti.
+I nomi vengono normalizzati (minuscolo, senza accenti né punteggiatura) e
+indicizzati per nome completo, cognome + iniziale ("Martinez L."), singolo
+cognome e trigrammi, così accenti, iniziali e piccoli errori di battitura
+non fanno più cadere un giocatore sul 6 d'ufficio.
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+
+# Affidabilità di ciascun livello di ricerca, dal più al meno preciso
+PUNTEGGIO_ESATTO = 1.0
+PUNTEGGIO_COMPATTO = 0.95
+PUNTEGGIO_INIZIALE = 0.9
+PUNTEGGIO_COGNOME = 0.8
+
+# Somiglianza minima (coefficiente di Dice sui trigrammi) per l'ultimo livello
+SOGLIA_TRIGRAMMI = 0.6
+
+# Due candidati per trigrammi più vicini di così sono considerati ambigui
+MARGINE_AMBIGUITA = 0.05
+
+# Lunghezza minima di una parola per valere come cognome da sola
+LUNGHEZZA_MINIMA_COGNOME = 3
+
+# Affidabilità minima per applicare una corrispondenza senza conferma:
+# esatto, compatto e "cognome iniziale"; cognome singolo e trigrammi
+# restano da confermare a mano
+SOGLIA_AUTOMATICA = PUNTEGGIO_INIZIALE
+
+
+class Corrispondenza(NamedTuple):
+    """Risultato della ricerca di un nome nell'indice"""
+    nome: str                  # nome cercato
+    indice: int                # posizione del nome trovato nella lista indicizzata
+    nome_trovato: str
+    punteggio: float           # affidabilità da 0 a 1
+    metodo: str                # 'esatto', 'compatto', 'iniziale', 'cognome', 'trigrammi'
+    ambiguo: bool              # più candidati ugualmente plausibili
+    alternative: Tuple[Tuple[str, float], ...]  # altri candidati con la loro somiglianza
+
+    @property
+    def automatica(self) -> bool:
+        """True se la corrispondenza è abbastanza sicura da applicare senza conferma"""
+        return not self.ambiguo and self.punteggio >= SOGLIA_AUTOMATICA
+
+
+def normalizza_nome(nome: str) -> str:
+    """
+    Forma canonica di un nome: minuscolo, senza accenti, con la
+    punteggiatura sostituita da spazi ("Martínez L." -> "martinez l").
+
+    Args:
+        nome: nome del giocatore
+
+    Returns:
+        str: nome normalizzato
+    """
+    scomposto = unicodedata.normalize('NFKD', str(nome))
+    senza_accenti = ''.join(c for c in scomposto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', senza_accenti.lower()).split())
+
+
+def _chiavi_iniziale(parole: List[str], solo_iniziali: bool = False) -> Set[str]:
+    """
+    Chiavi "cognome iniziale" per le coppie di parole del nome.
+
+    Args:
+        parole: parole del nome normalizzato
+        solo_iniziali: usa solo le coppie in cui l'altra parola è già
+            un'iniziale ("martinez l"), non un nome proprio intero
+
+    Returns:
+        Set[str]: chiavi "cognome iniziale"
+    """
+    return {
+        f"{cognome} {altra[0]}"
+        for i, cognome in enumerate(parole) if len(cognome) > 1
+        for j, altra in enumerate(parole) if j != i and (len(altra) == 1 or not solo_iniziali)
+    }
+
+
+def _chiavi_cognome(parole: List[str]) -> Set[str]:
+    """Parole abbastanza lunghe da identificare un giocatore da sole"""
+    return {parola for parola in parole if len(parola) >= LUNGHEZZA_MINIMA_COGNOME}
+
+
+def _trigrammi(normalizzato: str) -> Set[str]:
+    """Trigrammi del nome compatto, con bordi per pesare inizio e fine"""
+    testo = f"  {normalizzato.replace(' ', '')} "
+    return {testo[i:i + 3] for i in range(len(testo) - 2)}
+
+
+def _dice(a: Set[str], b: Set[str]) -> float:
+    """Coefficiente di Dice fra due insiemi di trigrammi"""
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _parole_compatibili(a: str, b: str) -> bool:
+    """Stessa parola, iniziale o abbreviazione dell'altra, o piccolo errore di battitura"""
+    return a.startswith(b) or b.startswith(a) or _dice(_trigrammi(a), _trigrammi(b)) >= SOGLIA_TRIGRAMMI
+
+
+def _nomi_in_conflitto(parole: List[str], altre: List[str]) -> bool:
+    """
+    True se entrambi i nomi hanno parole senza corrispondenza nell'altro
+    ("Lucas Hernandez" e "Theo Hernandez": nomi propri diversi).
+    """
+    residue = [p for p in parole if not any(_parole_compatibili(p, a) for a in altre)]
+    residue_altre = [a for a in altre if not any(_parole_compatibili(a, p) for p in parole)]
+    return bool(residue) and bool(residue_altre)
+
+
+class IndiceNomi:
+    """
+    Indice prebuilt dei nomi di un file di voti (o di qualunque lista di nomi).
+    La ricerca prova i livelli in ordine di precisione e si ferma al primo
+    che trova candidati; il ruolo, se noto, scarta i candidati di altri reparti
+    (meglio nessuna corrispondenza che il voto di un altro giocatore).
+    """
+
+    def __init__(self, nomi: Iterable[str], ruoli: Iterable[Optional[str]] = None):
+        """
+        Args:
+            nomi: nomi da indicizzare (i valori vuoti o non testuali sono ignorati)
+            ruoli: ruolo di ciascun nome (P, D, C, A), opzionale
+        """
+        self.nomi = list(nomi)
+        self.ruoli = list(ruoli) if ruoli is not None else [None] * len(self.nomi)
+
+        self._esatti: Dict[str, List[int]] = {}
+        self._compatti: Dict[str, List[int]] = {}
+        self._iniziali: Dict[str, List[int]] = {}
+        self._abbreviati: Dict[str, List[int]] = {}
+        self._cognomi: Dict[str, List[int]] = {}
+        self._per_trigramma: Dict[str, List[int]] = {}
+        self._trigrammi: Dict[int, Set[str]] = {}
+        self._parole: Dict[int, List[str]] = {}
+
+        for i, nome in enumerate(self.nomi):
+            if not isinstance(nome, str) or not nome.strip():
+                continue
+            normalizzato = normalizza_nome(nome)
+            parole = normalizzato.split()
+            self._parole[i] = parole
+
+            self._esatti.setdefault(normalizzato, []).append(i)
+            self._compatti.setdefault(normalizzato.replace(' ', ''), []).append(i)
+            for chiave in _chiavi_iniziale(parole):
+                self._iniziali.setdefault(chiave, []).append(i)
+            for chiave in _chiavi_iniziale(parole, solo_iniziali=True):
+                self._abbreviati.setdefault(chiave, []).append(i)
+            for chiave in _chiavi_cognome(parole):
+                self._cognomi.setdefault(chiave, []).append(i)
+
+            trigrammi = _trigrammi(normalizzato)
+            self._trigrammi[i] = trigrammi
+            for trigramma in trigrammi:
+                self._per_trigramma.setdefault(trigramma, []).append(i)
+
+    def _somiglianza(self, trigrammi: Set[str], indice: int) -> float:
+        """Coefficiente di Dice fra i trigrammi cercati e quelli di un nome indicizzato"""
+        return _dice(trigrammi, self._trigrammi[indice])
+
+    def _filtra_ruolo(self, candidati: List[int], ruolo: Optional[str]) -> List[int]:
+        """
+        Tiene i candidati del ruolo indicato (o senza ruolo nell'indice): un
+        giocatore di un altro reparto non è mai una corrispondenza valida.
+        """
+        if not isinstance(ruolo, str):
+            return candidati
+        return [i for i in candidati if not isinstance(self.ruoli[i], str) or self.ruoli[i] == ruolo]
+
+    def cerca(self, nome: str, ruolo: str = None) -> Optional[Corrispondenza]:
+        """
+        Cerca un nome nell'indice.
+
+        Args:
+            nome: nome da cercare (es. dalla formazione)
+            ruolo: ruolo del giocatore, usato per scegliere fra omonimi
+
+        Returns:
+            Corrispondenza o None se nessun nome è abbastanza simile
+        """
+        if not isinstance(nome, str) or not nome.strip():
+            return None
+
+        normalizzato = normalizza_nome(nome)
+        parole = normalizzato.split()
+        trigrammi = _trigrammi(normalizzato)
+
+        # Il livello "iniziale" richiede un'iniziale da almeno una parte:
+        # "Martinez L." trova "Lautaro Martinez" e viceversa, ma "Lucas
+        # Martinez" non trova "Lautaro Martinez" solo perché iniziano per L
+        livelli = (
+            ('esatto', PUNTEGGIO_ESATTO, ((self._esatti, {normalizzato}),)),
+            ('compatto', PUNTEGGIO_COMPATTO, ((self._compatti, {normalizzato.replace(' ', '')}),)),
+            ('iniziale', PUNTEGGIO_INIZIALE, (
+                (self._iniziali, _chiavi_iniziale(parole, solo_iniziali=True)),
+                (self._abbreviati, _chiavi_iniziale(parole))
+            )),
+            ('cognome', PUNTEGGIO_COGNOME, ((self._cognomi, _chiavi_cognome(parole)),))
+        )
+
+        for metodo, punteggio, ricerche in livelli:
+            candidati = sorted({i for mappa, chiavi in ricerche for chiave in chiavi for i in mappa.get(chiave, ())})
+            if not candidati:
+                continue
+
+            candidati = self._filtra_ruolo(candidati, ruolo)
+            if not candidati:
+                continue
+            classificati = sorted(
+                ((self._somiglianza(trigrammi, i), i) for i in candidati),
+                key=lambda x: (-x[0], x[1])
+            )
+            # Più candidati allo stesso livello, o un cognome con nome proprio
+            # diverso: si sceglie il più simile, ma la corrispondenza resta da confermare
+            ambiguo = len(classificati) > 1 or (
+                metodo in ('iniziale', 'cognome') and _nomi_in_conflitto(parole, self._parole[classificati[0][1]])
+            )
+            return self._corrispondenza(nome, classificati, punteggio, metodo, ambiguo)
+
+        # Ultimo livello: somiglianza sui trigrammi
+        condivisi = {i for trigramma in trigrammi for i in self._per_trigramma.get(trigramma, ())}
+        classificati = sorted(
+            (
+                (self._somiglianza(trigrammi, i), i)
+                for i in self._filtra_ruolo(list(condivisi), ruolo)
+            ),
+            key=lambda x: (-x[0], x[1])
+        )
+        classificati = [(somiglianza, i) for somiglianza, i in classificati if somiglianza >= SOGLIA_TRIGRAMMI]
+        if not classificati:
+            return None
+
+        ambiguo = (
+            len(classificati) > 1 and classificati[0][0] - classificati[1][0] < MARGINE_AMBIGUITA
+            or _nomi_in_conflitto(parole, self._parole[classificati[0][1]])
+        )
+        return self._corrispondenza(nome, classificati, classificati[0][0], 'trigrammi', ambiguo)
+
+    def _corrispondenza(
+        self,
+        nome: str,
+        classificati: List[Tuple[float, int]],
+        punteggio: float,
+        metodo: str,
+        ambiguo: bool
+    ) -> Corrispondenza:
+        """Costruisce il risultato dal candidato migliore e dalle alternative"""
+        _, migliore = classificati[0]
+        return Corrispondenza(
+            nome=nome,
+            indice=migliore,
+            nome_trovato=self.nomi[migliore],
+            punteggio=round(punteggio, 3),
+            metodo=metodo,
+            ambiguo=ambiguo,
+            alternative=tuple((self.nomi[i], round(s, 3)) for s, i in classificati[1:])
+        )
+
+    def risolvi(
+        self,
+        nomi: Iterable[str],
+        ruoli: Iterable[Optional[str]] = None
+    ) -> Dict[str, Optional[Corrispondenza]]:
+        """
+        Cerca una lista di nomi (es. tutte le formazioni di una giornata).
+
+        Args:
+            nomi: nomi da cercare
+            ruoli: ruolo di ciascun nome, opzionale
+
+        Returns:
+            Dict: nome cercato -> Corrispondenza (o None se non trovato)
+        """
+        nomi = list(nomi)
+        ruoli = list(ruoli) if ruoli is not None else [None] * len(nomi)
+        return {nome: self.cerca(nome, ruolo) for nome, ruolo in zip(nomi, ruoli)}
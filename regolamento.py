@@ -0,0 +1,471 @@
+"""
+Modulo per la gestione del regolamento di calcolo.
+Carica regole personalizzate (bonus/malus, modificatori, soglie gol) da file
+TOML/JSON o dal database e le compila una sola volta in vettori di pesi e
+tabelle a soglie pronti per il motore di calcolo.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from typing import Dict, NamedTuple, Tuple, Union
+
+import numpy as np
+
+
+class TabellaSoglie(NamedTuple):
+    """
+    Tabella a soglie di un regolamento.
+    Il valore valori[i] si applica ai punteggi >= soglie[i-1] e < soglie[i]:
+    valori ha sempre un elemento in più di soglie.
+    """
+    soglie: Tuple[float, ...]
+    valori: Tuple[float, ...]
+
+
+# Regolamento D: media voto base difensori -> modificatore
+TABELLA_MODIFICATORE_DIFESA = TabellaSoglie(
+    soglie=(5.00, 5.25, 5.50, 5.75, 6.00, 6.25, 6.50, 6.75, 7.00),
+    valori=(4, 3, 2, 1, 0, -1, -2, -3, -4, -5)
+)
+
+# Regolamento E: differenza somme centrocampisti -> modificatore
+TABELLA_MODIFICATORE_CENTROCAMPO = TabellaSoglie(
+    soglie=(1, 2, 3, 4, 5, 6, 7, 8),
+    valori=(0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0)
+)
+
+# Regolamento F: voto base attaccante (senza bonus/malus) -> modificatore
+TABELLA_MODIFICATORE_ATTACCO = TabellaSoglie(
+    soglie=(6.50, 7.00, 7.50),
+    valori=(0.0, 0.5, 1.0, 1.5)
+)
+
+# Regolamento H: punteggio squadra -> gol (fino alla soglia dei gol extra)
+TABELLA_GOL = TabellaSoglie(
+    soglie=(66, 72, 77, 81),
+    valori=(0, 1, 2, 3, 4)
+)
+
+# Ordine in cui gli eventi vengono sommati nel bonus/malus (regolamento B).
+# L'ordine è parte del regolamento: cambiarlo altera gli arrotondamenti.
+EVENTI_BONUS_MALUS = (
+    'gol_fatti',
+    'assist',
+    'rigori_fatti',
+    'rigori_parati',
+    'rigori_sbagliati',
+    'autogol',
+    'ammonizioni',
+    'espulsioni'
+)
+
+# Punti in classifica per vittoria e pareggio
+PUNTI_VITTORIA = 3
+PUNTI_PAREGGIO = 1
+
+# Numero massimo di difensori per cui precalcolare la correzione del modificatore
+MAX_DIFENSORI = 11
+
+# Unità della modalità a punto fisso: punteggi interi in quarti di punto
+SCALA_PUNTO_FISSO = 4
+
+
+@dataclass(frozen=True)
+class Regolamento:
+    """
+    Regole di calcolo di una lega.
+    I valori predefiniti corrispondono al regolamento standard (A-H).
+    """
+    nome: str = "Standard"
+
+    # Regolamento B: bonus/malus per evento
+    gol_fatti: float = 3
+    assist: float = 1
+    rigori_fatti: float = 3
+    rigori_parati: float = 3
+    rigori_sbagliati: float = -3
+    autogol: float = -2
+    ammonizioni: float = -0.5
+    espulsioni: float = -1
+
+    # Regolamento B: bonus/malus specifici per portiere
+    gol_subiti_portiere: float = -1
+    porta_inviolata: float = 1
+
+    # Regolamento D: modificatore difesa
+    tabella_difesa: TabellaSoglie = TABELLA_MODIFICATORE_DIFESA
+    correzioni_numero_difensori: Tuple[Tuple[int, float], ...] = ((3, 1), (4, 0), (5, -1))
+    difensori_senza_penalita: int = 4
+    penalita_difensore_extra: float = 1
+
+    # Regolamento E: modificatore centrocampo
+    tabella_centrocampo: TabellaSoglie = TABELLA_MODIFICATORE_CENTROCAMPO
+    voto_ufficio_centrocampo: float = 5.0
+
+    # Regolamento F: modificatore attacco
+    tabella_attacco: TabellaSoglie = TABELLA_MODIFICATORE_ATTACCO
+
+    # Vantaggio casa
+    vantaggio_casa: float = 2.0
+
+    # Regolamento H: conversione punteggio -> gol
+    tabella_gol: TabellaSoglie = TABELLA_GOL
+    soglia_gol_extra: float = 85
+    punti_per_gol_extra: float = 4
+
+    descrizione: str = field(default="", compare=False)
+
+
+class RegolamentoCompilato(NamedTuple):
+    """
+    Regolamento pronto per il motore di calcolo: pesi degli eventi in vettore
+    e correzioni difesa precalcolate per numero di difensori.
+    """
+    regolamento: Regolamento
+    pesi_eventi: Tuple[float, ...]
+    pesi_eventi_array: np.ndarray
+    gol_subiti_portiere: float
+    porta_inviolata: float
+    tabella_difesa: TabellaSoglie
+    correzioni_difesa: Tuple[float, ...]
+    correzioni_difesa_array: np.ndarray
+    tabella_centrocampo: TabellaSoglie
+    voto_ufficio_centrocampo: float
+    tabella_attacco: TabellaSoglie
+    vantaggio_casa: float
+    tabella_gol: TabellaSoglie
+    soglia_gol_extra: float
+    punti_per_gol_extra: float
+    # Unità dei valori: 1 = punti in float, SCALA_PUNTO_FISSO = interi a punto fisso
+    scala: int = 1
+
+
+def _valida_tabella(nome: str, tabella: TabellaSoglie):
+    """Verifica la coerenza di una tabella a soglie"""
+    if len(tabella.valori) != len(tabella.soglie) + 1:
+        raise ValueError(
+            f"Tabella '{nome}': servono {len(tabella.soglie) + 1} valori "
+            f"per {len(tabella.soglie)} soglie, trovati {len(tabella.valori)}"
+        )
+    if list(tabella.soglie) != sorted(tabella.soglie):
+        raise ValueError(f"Tabella '{nome}': le soglie devono essere in ordine crescente")
+
+
+@lru_cache(maxsize=32)
+def compila_regolamento(regolamento: Regolamento) -> RegolamentoCompilato:
+    """
+    Compila un regolamento in pesi e tabelle per il motore di calcolo.
+    Il risultato è in cache: compilare di nuovo un regolamento uguale
+    (anche se riletto da file o dal database) non costa nulla.
+
+    Args:
+        regolamento: regolamento da compilare
+
+    Returns:
+        RegolamentoCompilato: regolamento pronto per calc e calc_batch
+    """
+    _valida_tabella('modificatore_difesa', regolamento.tabella_difesa)
+    _valida_tabella('modificatore_centrocampo', regolamento.tabella_centrocampo)
+    _valida_tabella('modificatore_attacco', regolamento.tabella_attacco)
+    _valida_tabella('gol', regolamento.tabella_gol)
+
+    if regolamento.punti_per_gol_extra <= 0:
+        raise ValueError("punti_per_gol_extra deve essere positivo")
+
+    pesi_eventi = tuple(getattr(regolamento, evento) for evento in EVENTI_BONUS_MALUS)
+
+    # Correzione complessiva per numero di difensori (correzione fissa + penalità extra)
+    correzioni = dict(regolamento.correzioni_numero_difensori)
+    correzioni_difesa = tuple(
+        correzioni.get(n, 0) -
+        max(n - regolamento.difensori_senza_penalita, 0) * regolamento.penalita_difensore_extra
+        for n in range(MAX_DIFENSORI + 1)
+    )
+
+    return RegolamentoCompilato(
+        regolamento=regolamento,
+        pesi_eventi=pesi_eventi,
+        pesi_eventi_array=np.asarray(pesi_eventi, dtype=np.float64),
+        gol_subiti_portiere=regolamento.gol_subiti_portiere,
+        porta_inviolata=regolamento.porta_inviolata,
+        tabella_difesa=regolamento.tabella_difesa,
+        correzioni_difesa=correzioni_difesa,
+        correzioni_difesa_array=np.asarray(correzioni_difesa, dtype=np.float64),
+        tabella_centrocampo=regolamento.tabella_centrocampo,
+        voto_ufficio_centrocampo=regolamento.voto_ufficio_centrocampo,
+        tabella_attacco=regolamento.tabella_attacco,
+        vantaggio_casa=regolamento.vantaggio_casa,
+        tabella_gol=regolamento.tabella_gol,
+        soglia_gol_extra=regolamento.soglia_gol_extra,
+        punti_per_gol_extra=regolamento.punti_per_gol_extra
+    )
+
+
+def in_punto_fisso(valore: float, scala: int = SCALA_PUNTO_FISSO) -> int:
+    """
+    Converte un punteggio in unità intere di 1/scala di punto.
+
+    Args:
+        valore: punteggio in punti (es. 6.5)
+        scala: unità per punto (default: quarti di punto)
+
+    Returns:
+        int: punteggio a punto fisso (es. 26)
+
+    Raises:
+        ValueError: se il punteggio non è un multiplo esatto dell'unità
+    """
+    unita = valore * scala
+    if not float(unita).is_integer():
+        raise ValueError(f"Il valore {valore} non è un multiplo di 1/{scala} di punto")
+    return int(unita)
+
+
+def _tabella_punto_fisso(tabella: TabellaSoglie, scala: int, valori_in_punti: bool = True) -> TabellaSoglie:
+    """Tabella a soglie con soglie (e valori, se sono punti) in unità intere"""
+    return TabellaSoglie(
+        soglie=tuple(in_punto_fisso(soglia, scala) for soglia in tabella.soglie),
+        valori=tuple(
+            in_punto_fisso(valore, scala) if valori_in_punti else int(valore)
+            for valore in tabella.valori
+        )
+    )
+
+
+@lru_cache(maxsize=32)
+def compila_regolamento_punto_fisso(
+    regolamento: Regolamento,
+    scala: int = SCALA_PUNTO_FISSO
+) -> RegolamentoCompilato:
+    """
+    Compila un regolamento per la modalità a punto fisso: tutti i punteggi
+    (pesi degli eventi, soglie e valori delle tabelle, vantaggio casa, voto
+    d'ufficio) diventano interi in unità di 1/scala di punto, così il motore
+    di calcolo lavora solo con somme e confronti esatti fra interi.
+
+    Args:
+        regolamento: regolamento da compilare
+        scala: unità per punto (default: quarti di punto)
+
+    Returns:
+        RegolamentoCompilato: regolamento con scala = scala
+
+    Raises:
+        ValueError: se un valore del regolamento non è un multiplo di 1/scala
+    """
+    base = compila_regolamento(regolamento)
+    punti = partial(in_punto_fisso, scala=scala)
+
+    pesi_eventi = tuple(map(punti, base.pesi_eventi))
+    correzioni_difesa = tuple(map(punti, base.correzioni_difesa))
+    # La tabella gol restituisce numeri di gol, non punti
+    tabella_gol = _tabella_punto_fisso(base.tabella_gol, scala, valori_in_punti=False)
+
+    return base._replace(
+        pesi_eventi=pesi_eventi,
+        pesi_eventi_array=np.asarray(pesi_eventi, dtype=np.int64),
+        gol_subiti_portiere=punti(base.gol_subiti_portiere),
+        porta_inviolata=punti(base.porta_inviolata),
+        tabella_difesa=_tabella_punto_fisso(base.tabella_difesa, scala),
+        correzioni_difesa=correzioni_difesa,
+        correzioni_difesa_array=np.asarray(correzioni_difesa, dtype=np.int64),
+        tabella_centrocampo=_tabella_punto_fisso(base.tabella_centrocampo, scala),
+        voto_ufficio_centrocampo=punti(base.voto_ufficio_centrocampo),
+        tabella_attacco=_tabella_punto_fisso(base.tabella_attacco, scala),
+        vantaggio_casa=punti(base.vantaggio_casa),
+        tabella_gol=tabella_gol,
+        soglia_gol_extra=punti(base.soglia_gol_extra),
+        punti_per_gol_extra=punti(base.punti_per_gol_extra),
+        scala=scala
+    )
+
+
+REGOLAMENTO_STANDARD = Regolamento()
+REGOLAMENTO_STANDARD_COMPILATO = compila_regolamento(REGOLAMENTO_STANDARD)
+
+
+def risolvi_regolamento(
+    regolamento: Union[Regolamento, RegolamentoCompilato, None] = None,
+    punto_fisso: bool = False
+) -> RegolamentoCompilato:
+    """
+    Restituisce il regolamento compilato da usare nei calcoli.
+
+    Args:
+        regolamento: None (standard), Regolamento o RegolamentoCompilato
+        punto_fisso: se True restituisce la versione a punto fisso
+
+    Returns:
+        RegolamentoCompilato: regolamento pronto per il calcolo
+    """
+    if regolamento is None:
+        regolamento = REGOLAMENTO_STANDARD_COMPILATO
+    elif not isinstance(regolamento, RegolamentoCompilato):
+        regolamento = compila_regolamento(regolamento)
+
+    if punto_fisso and regolamento.scala == 1:
+        return compila_regolamento_punto_fisso(regolamento.regolamento)
+    return regolamento
+
+
+def _tabella_da_dict(dati: Dict, predefinita: TabellaSoglie) -> TabellaSoglie:
+    """Costruisce una tabella a soglie da una sezione del file di regolamento"""
+    return TabellaSoglie(
+        soglie=tuple(dati.get('soglie', predefinita.soglie)),
+        valori=tuple(dati.get('valori', predefinita.valori))
+    )
+
+
+def regolamento_da_dict(dati: Dict) -> Regolamento:
+    """
+    Costruisce un regolamento da un dizionario (es. file TOML/JSON).
+    Le voci mancanti assumono il valore del regolamento standard.
+
+    Formato:
+        nome = "Lega"
+        vantaggio_casa = 2.0
+        [bonus]            gol_fatti, assist, rigori_fatti, ..., espulsioni
+        [portiere]         gol_subiti, porta_inviolata
+        [modificatore_difesa]       soglie, valori, correzioni, difensori_senza_penalita,
+                                    penalita_difensore_extra
+        [modificatore_centrocampo]  soglie, valori, voto_ufficio
+        [modificatore_attacco]      soglie, valori
+        [gol]                       soglie, valori, soglia_extra, punti_per_gol_extra
+
+    Args:
+        dati: dizionario con le regole
+
+    Returns:
+        Regolamento: regolamento costruito
+    """
+    base = REGOLAMENTO_STANDARD
+
+    bonus = dati.get('bonus', {})
+    eventi_sconosciuti = set(bonus) - set(EVENTI_BONUS_MALUS)
+    if eventi_sconosciuti:
+        raise ValueError(f"Eventi bonus/malus sconosciuti: {', '.join(sorted(eventi_sconosciuti))}")
+
+    portiere = dati.get('portiere', {})
+    difesa = dati.get('modificatore_difesa', {})
+    centrocampo = dati.get('modificatore_centrocampo', {})
+    attacco = dati.get('modificatore_attacco', {})
+    gol = dati.get('gol', {})
+
+    if 'correzioni' in difesa:
+        correzioni = tuple(sorted((int(n), v) for n, v in difesa['correzioni'].items()))
+    else:
+        correzioni = base.correzioni_numero_difensori
+
+    return Regolamento(
+        nome=dati.get('nome', base.nome),
+        descrizione=dati.get('descrizione', ''),
+        **{evento: bonus.get(evento, getattr(base, evento)) for evento in EVENTI_BONUS_MALUS},
+        gol_subiti_portiere=portiere.get('gol_subiti', base.gol_subiti_portiere),
+        porta_inviolata=portiere.get('porta_inviolata', base.porta_inviolata),
+        tabella_difesa=_tabella_da_dict(difesa, base.tabella_difesa),
+        correzioni_numero_difensori=correzioni,
+        difensori_senza_penalita=difesa.get('difensori_senza_penalita', base.difensori_senza_penalita),
+        penalita_difensore_extra=difesa.get('penalita_difensore_extra', base.penalita_difensore_extra),
+        tabella_centrocampo=_tabella_da_dict(centrocampo, base.tabella_centrocampo),
+        voto_ufficio_centrocampo=centrocampo.get('voto_ufficio', base.voto_ufficio_centrocampo),
+        tabella_attacco=_tabella_da_dict(attacco, base.tabella_attacco),
+        vantaggio_casa=dati.get('vantaggio_casa', base.vantaggio_casa),
+        tabella_gol=_tabella_da_dict(gol, base.tabella_gol),
+        soglia_gol_extra=gol.get('soglia_extra', base.soglia_gol_extra),
+        punti_per_gol_extra=gol.get('punti_per_gol_extra', base.punti_per_gol_extra)
+    )
+
+
+def regolamento_a_dict(regolamento: Regolamento) -> Dict:
+    """
+    Converte un regolamento nel dizionario usato dai file TOML/JSON e dal database.
+
+    Args:
+        regolamento: regolamento da convertire
+
+    Returns:
+        Dict: regole nel formato di regolamento_da_dict
+    """
+    return {
+        'nome': regolamento.nome,
+        'descrizione': regolamento.descrizione,
+        'vantaggio_casa': regolamento.vantaggio_casa,
+        'bonus': {evento: getattr(regolamento, evento) for evento in EVENTI_BONUS_MALUS},
+        'portiere': {
+            'gol_subiti': regolamento.gol_subiti_portiere,
+            'porta_inviolata': regolamento.porta_inviolata
+        },
+        'modificatore_difesa': {
+            'soglie': list(regolamento.tabella_difesa.soglie),
+            'valori': list(regolamento.tabella_difesa.valori),
+            'correzioni': {str(n): v for n, v in regolamento.correzioni_numero_difensori},
+            'difensori_senza_penalita': regolamento.difensori_senza_penalita,
+            'penalita_difensore_extra': regolamento.penalita_difensore_extra
+        },
+        'modificatore_centrocampo': {
+            'soglie': list(regolamento.tabella_centrocampo.soglie),
+            'valori': list(regolamento.tabella_centrocampo.valori),
+            'voto_ufficio': regolamento.voto_ufficio_centrocampo
+        },
+        'modificatore_attacco': {
+            'soglie': list(regolamento.tabella_attacco.soglie),
+            'valori': list(regolamento.tabella_attacco.valori)
+        },
+        'gol': {
+            'soglie': list(regolamento.tabella_gol.soglie),
+            'valori': list(regolamento.tabella_gol.valori),
+            'soglia_extra': regolamento.soglia_gol_extra,
+            'punti_per_gol_extra': regolamento.punti_per_gol_extra
+        }
+    }
+
+
+def leggi_regolamento_testo(testo: str, formato: str = 'toml') -> Regolamento:
+    """
+    Legge un regolamento dal contenuto testuale di un file TOML o JSON.
+
+    Args:
+        testo: contenuto del file
+        formato: 'toml' oppure 'json'
+
+    Returns:
+        Regolamento: regolamento letto
+    """
+    if formato == 'json':
+        dati = json.loads(testo)
+    elif formato == 'toml':
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        dati = tomllib.loads(testo)
+    else:
+        raise ValueError(f"Formato regolamento non supportato: {formato}")
+
+    return regolamento_da_dict(dati)
+
+
+@lru_cache(maxsize=32)
+def _leggi_regolamento_file(percorso: str, mtime_ns: int, dimensione: int) -> Regolamento:
+    """Legge un file di regolamento (in cache finché il file non cambia)"""
+    formato = 'json' if percorso.lower().endswith('.json') else 'toml'
+    with open(percorso, 'r', encoding='utf-8') as f:
+        return leggi_regolamento_testo(f.read(), formato)
+
+
+def carica_regolamento(percorso: str) -> RegolamentoCompilato:
+    """
+    Carica e compila un regolamento da file TOML o JSON.
+    Rileggere lo stesso file non modificato non ripete né il parsing né la compilazione.
+
+    Args:
+        percorso: percorso del file (.toml o .json)
+
+    Returns:
+        RegolamentoCompilato: regolamento pronto per il calcolo
+    """
+    stat = os.stat(percorso)
+    regolamento = _leggi_regolamento_file(os.path.abspath(percorso), stat.st_mtime_ns, stat.st_size)
+    return compila_regolamento(regolamento)
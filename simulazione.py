@@ -0,0 +1,384 @@
+"""
+Simulatore Monte Carlo della stagione.
+Gioca il calendario rimanente decine di migliaia di volte estraendo voto base
+e bonus/malus di ogni giocatore dal suo storico nella tabella voti, e stima le
+probabilità di ogni posizione finale in classifica (titolo, retrocessione, ...).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from calc_batch import CODICI_RUOLO, RUOLO_ALTRO, calcola_partite_batch, codifica_formazioni
+from regolamento import PUNTI_VITTORIA, PUNTI_PAREGGIO, RegolamentoCompilato, risolvi_regolamento
+
+
+# Simulazioni per blocco: ogni blocco ha il suo seed, quindi i risultati
+# non dipendono dal numero di processi usati
+DIMENSIONE_BLOCCO = 1000
+
+# Voto assegnato ai giocatori senza storico (come un SV)
+VOTO_SENZA_STORICO = 6.0
+
+
+class ModelloStagione(NamedTuple):
+    """
+    Dati della stagione pronti per la simulazione vettoriale.
+    Le formazioni del calendario rimanente sono indici nel vettore dei
+    giocatori; lo storico di ogni giocatore è la fetta
+    pool_voti[offset[g]:offset[g] + conteggio[g]].
+    """
+    squadre: Tuple[str, ...]
+    casa: np.ndarray                 # (partite,) indice squadra di casa
+    trasferta: np.ndarray            # (partite,) indice squadra in trasferta
+    giocatori: np.ndarray            # (partite, 2, 11) indice giocatore
+    ruoli: np.ndarray                # (partite, 2, 11) codice ruolo
+    pool_voti: np.ndarray            # storico voti base concatenato
+    pool_bonus: np.ndarray           # storico bonus/malus concatenato
+    offset: np.ndarray               # (giocatori,) inizio dello storico
+    conteggio: np.ndarray            # (giocatori,) lunghezza dello storico
+    punti: np.ndarray                # (squadre,) classifica attuale
+    gol_fatti: np.ndarray
+    gol_subiti: np.ndarray
+    punteggio_totale: np.ndarray
+
+
+def _normalizza(nome: str) -> str:
+    """Chiave con cui un giocatore viene riconosciuto nello storico"""
+    return nome.strip().lower()
+
+
+def prepara_modello_stagione(
+    db,
+    dalla_giornata: int = None,
+    regolamento: RegolamentoCompilato = None
+) -> Tuple[ModelloStagione, Dict]:
+    """
+    Costruisce il modello della stagione leggendo giornate, formazioni e voti.
+
+    Le giornate con numero < dalla_giornata sono considerate giocate: i loro
+    risultati formano la classifica attuale e i loro voti lo storico dei
+    giocatori. Come in classifica, le partite ancora senza voti non contano:
+    i loro 6 d'ufficio falserebbero lo storico. Le altre compongono il calendario da simulare; se una partita
+    non ha ancora le formazioni, ogni squadra schiera la sua ultima formazione.
+
+    Args:
+        db: DatabaseManager
+        dalla_giornata: prima giornata da simulare (default: la prima senza voti)
+        regolamento: regolamento da applicare (default: standard)
+
+    Returns:
+        Tuple: (modello, info) con info su giornate e partite escluse
+    """
+    partite = db.get_formazioni_stagione()
+    for dati in partite:
+        for formazione in dati['formazioni'].values():
+            for g in formazione:
+                g.nome = _normalizza(g.nome)
+
+    ultima_giornata_con_voti = max((d['numero'] for d in partite if d['con_voti']), default=0)
+
+    if dalla_giornata is None:
+        dalla_giornata = ultima_giornata_con_voti + 1
+
+    squadre = sorted({d['casa'] for d in partite} | {d['trasferta'] for d in partite})
+    indice_squadra = {nome: i for i, nome in enumerate(squadre)}
+
+    storico = {}
+    ultima_formazione = {}
+    giocate = []
+    da_giocare = []
+    escluse = []
+    senza_voti = []
+
+    for dati in partite:
+        complete = all(len(dati['formazioni'][lato]) == 11 for lato in ('casa', 'trasferta'))
+
+        if dati['numero'] < dalla_giornata:
+            if not complete:
+                escluse.append(f"{dati['casa']} vs {dati['trasferta']} (giornata {dati['numero']})")
+                continue
+            if not dati['con_voti']:
+                senza_voti.append(f"{dati['casa']} vs {dati['trasferta']} (giornata {dati['numero']})")
+            else:
+                giocate.append(dati)
+                for lato in ('casa', 'trasferta'):
+                    for g in dati['formazioni'][lato]:
+                        storico.setdefault(g.nome, []).append((g.voto_base, g.bonus_malus))
+        else:
+            formazioni = {}
+            for lato in ('casa', 'trasferta'):
+                squadra = dati[lato]
+                if len(dati['formazioni'][lato]) == 11:
+                    formazioni[lato] = dati['formazioni'][lato]
+                elif squadra in ultima_formazione:
+                    formazioni[lato] = ultima_formazione[squadra]
+                else:
+                    raise ValueError(
+                        f"Nessuna formazione disponibile per {squadra} "
+                        f"(giornata {dati['numero']}): inserisci almeno una formazione."
+                    )
+            da_giocare.append((dati['casa'], dati['trasferta'], formazioni))
+
+        for lato in ('casa', 'trasferta'):
+            if len(dati['formazioni'][lato]) == 11:
+                ultima_formazione[dati[lato]] = dati['formazioni'][lato]
+
+    # ===== CLASSIFICA ATTUALE =====
+
+    num_squadre = len(squadre)
+    punti = np.zeros(num_squadre)
+    gol_fatti = np.zeros(num_squadre)
+    gol_subiti = np.zeros(num_squadre)
+    punteggio_totale = np.zeros(num_squadre)
+
+    if giocate:
+        risultati = calcola_partite_batch(
+            *codifica_formazioni([(d['formazioni']['casa'], d['formazioni']['trasferta']) for d in giocate]),
+            regolamento=regolamento
+        )
+        for i, dati in enumerate(giocate):
+            casa = indice_squadra[dati['casa']]
+            trasferta = indice_squadra[dati['trasferta']]
+            gol_casa, gol_trasferta = risultati['gol'][i]
+            punti_casa, punti_trasferta = _punti_partita(gol_casa, gol_trasferta)
+
+            punti[casa] += punti_casa
+            punti[trasferta] += punti_trasferta
+            gol_fatti[casa] += gol_casa
+            gol_fatti[trasferta] += gol_trasferta
+            gol_subiti[casa] += gol_trasferta
+            gol_subiti[trasferta] += gol_casa
+            punteggio_totale[casa] += risultati['punteggio_totale'][i][0]
+            punteggio_totale[trasferta] += risultati['punteggio_totale'][i][1]
+
+    # ===== STORICO GIOCATORI =====
+
+    nomi_giocatori = sorted({g.nome for _, _, f in da_giocare for lato in f.values() for g in lato})
+    indice_giocatore = {nome: i for i, nome in enumerate(nomi_giocatori)}
+
+    pool_voti = []
+    pool_bonus = []
+    offset = np.zeros(len(nomi_giocatori), dtype=np.int64)
+    conteggio = np.zeros(len(nomi_giocatori), dtype=np.int64)
+
+    for i, nome in enumerate(nomi_giocatori):
+        voti = storico.get(nome) or [(VOTO_SENZA_STORICO, 0.0)]
+        offset[i] = len(pool_voti)
+        conteggio[i] = len(voti)
+        pool_voti.extend(v for v, _ in voti)
+        pool_bonus.extend(b for _, b in voti)
+
+    # ===== CALENDARIO RIMANENTE =====
+
+    num_partite = len(da_giocare)
+    giocatori = np.zeros((num_partite, 2, 11), dtype=np.int64)
+    ruoli = np.zeros((num_partite, 2, 11), dtype=np.int8)
+    for i, (_, _, formazioni) in enumerate(da_giocare):
+        for lato, nome_lato in enumerate(('casa', 'trasferta')):
+            for k, g in enumerate(formazioni[nome_lato]):
+                giocatori[i, lato, k] = indice_giocatore[g.nome]
+                ruoli[i, lato, k] = CODICI_RUOLO.get(g.ruolo, RUOLO_ALTRO)
+
+    modello = ModelloStagione(
+        squadre=tuple(squadre),
+        casa=np.array([indice_squadra[c] for c, _, _ in da_giocare], dtype=np.int64),
+        trasferta=np.array([indice_squadra[t] for _, t, _ in da_giocare], dtype=np.int64),
+        giocatori=giocatori,
+        ruoli=ruoli,
+        pool_voti=np.array(pool_voti, dtype=np.float64),
+        pool_bonus=np.array(pool_bonus, dtype=np.float64),
+        offset=offset,
+        conteggio=conteggio,
+        punti=punti,
+        gol_fatti=gol_fatti,
+        gol_subiti=gol_subiti,
+        punteggio_totale=punteggio_totale
+    )
+
+    info = {
+        'dalla_giornata': dalla_giornata,
+        'partite_giocate': len(giocate),
+        'partite_da_giocare': num_partite,
+        'partite_escluse': escluse,
+        'partite_senza_voti': senza_voti
+    }
+
+    return modello, info
+
+
+def _punti_partita(gol_casa, gol_trasferta):
+    """Punti in classifica di casa e trasferta (funziona anche su array)"""
+    punti_casa = np.where(
+        gol_casa > gol_trasferta, PUNTI_VITTORIA,
+        np.where(gol_casa == gol_trasferta, PUNTI_PAREGGIO, 0)
+    )
+    punti_trasferta = np.where(
+        gol_trasferta > gol_casa, PUNTI_VITTORIA,
+        np.where(gol_casa == gol_trasferta, PUNTI_PAREGGIO, 0)
+    )
+    return punti_casa, punti_trasferta
+
+
+def _simula_blocco(
+    modello: ModelloStagione,
+    num_simulazioni: int,
+    seed: np.random.SeedSequence,
+    regolamento: RegolamentoCompilato
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simula un blocco di stagioni in modo vettoriale.
+
+    Returns:
+        Tuple: (conteggio posizioni (squadre, posizioni), somma punti finali per squadra)
+    """
+    rng = np.random.default_rng(seed)
+    num_squadre = len(modello.squadre)
+    forma = (num_simulazioni,) + modello.giocatori.shape
+
+    # Estrae per ogni giocatore una giornata a caso dal suo storico
+    conteggio = modello.conteggio[modello.giocatori]
+    estratti = (rng.random(forma) * conteggio).astype(np.int64)
+    indici = modello.offset[modello.giocatori] + estratti
+
+    risultati = calcola_partite_batch(
+        modello.pool_voti[indici],
+        modello.pool_bonus[indici],
+        np.broadcast_to(modello.ruoli, forma),
+        regolamento
+    )
+
+    gol_casa = risultati['gol'][..., 0]
+    gol_trasferta = risultati['gol'][..., 1]
+    punti_casa, punti_trasferta = _punti_partita(gol_casa, gol_trasferta)
+
+    # Matrici partita -> squadra per sommare i risultati con un prodotto matriciale
+    matrice_casa = np.zeros((len(modello.casa), num_squadre))
+    matrice_casa[np.arange(len(modello.casa)), modello.casa] = 1.0
+    matrice_trasferta = np.zeros((len(modello.trasferta), num_squadre))
+    matrice_trasferta[np.arange(len(modello.trasferta)), modello.trasferta] = 1.0
+
+    punti = modello.punti + punti_casa @ matrice_casa + punti_trasferta @ matrice_trasferta
+    gol_fatti = modello.gol_fatti + gol_casa @ matrice_casa + gol_trasferta @ matrice_trasferta
+    gol_subiti = modello.gol_subiti + gol_trasferta @ matrice_casa + gol_casa @ matrice_trasferta
+    punteggio_totale = (
+        modello.punteggio_totale +
+        risultati['punteggio_totale'][..., 0] @ matrice_casa +
+        risultati['punteggio_totale'][..., 1] @ matrice_trasferta
+    )
+
+    # Classifica: punti, differenza reti, gol fatti, punteggio totale, sorteggio
+    sorteggio = rng.random((num_simulazioni, num_squadre))
+    ordine = np.lexsort(
+        (sorteggio, -punteggio_totale, -gol_fatti, -(gol_fatti - gol_subiti), -punti),
+        axis=-1
+    )
+
+    posizioni = np.empty_like(ordine)
+    np.put_along_axis(
+        posizioni, ordine,
+        np.broadcast_to(np.arange(num_squadre), ordine.shape),
+        axis=-1
+    )
+
+    squadra = np.broadcast_to(np.arange(num_squadre), posizioni.shape)
+    conteggi = np.bincount(
+        (squadra * num_squadre + posizioni).ravel(),
+        minlength=num_squadre * num_squadre
+    ).reshape(num_squadre, num_squadre)
+
+    return conteggi, punti.sum(axis=0)
+
+
+def _simula_blocco_task(argomenti):
+    """Adattatore per ProcessPoolExecutor.map"""
+    return _simula_blocco(*argomenti)
+
+
+def simula_stagione(
+    modello: ModelloStagione,
+    num_simulazioni: int = 10000,
+    seed: int = None,
+    num_processi: int = None,
+    regolamento: RegolamentoCompilato = None
+) -> Dict:
+    """
+    Simula il calendario rimanente num_simulazioni volte.
+
+    Le simulazioni sono divise in blocchi da DIMENSIONE_BLOCCO, ciascuno con
+    un seed derivato da quello principale: a parità di seed il risultato è
+    identico qualunque sia il numero di processi.
+
+    Args:
+        modello: modello della stagione (vedi prepara_modello_stagione)
+        num_simulazioni: numero di stagioni da simulare
+        seed: seed del generatore casuale (None = non riproducibile)
+        num_processi: processi in parallelo (default: numero di core)
+        regolamento: regolamento da applicare (default: standard)
+
+    Returns:
+        Dict con 'squadre', 'probabilita' (matrice squadre x posizioni),
+        'punti_medi' e 'num_simulazioni'
+    """
+    if num_simulazioni <= 0:
+        raise ValueError("Il numero di simulazioni deve essere positivo")
+
+    reg = risolvi_regolamento(regolamento)
+
+    blocchi = [DIMENSIONE_BLOCCO] * (num_simulazioni // DIMENSIONE_BLOCCO)
+    if num_simulazioni % DIMENSIONE_BLOCCO:
+        blocchi.append(num_simulazioni % DIMENSIONE_BLOCCO)
+
+    semi = np.random.SeedSequence(seed).spawn(len(blocchi))
+    argomenti = [(modello, n, s, reg) for n, s in zip(blocchi, semi)]
+
+    if num_processi is None:
+        num_processi = os.cpu_count() or 1
+    num_processi = min(num_processi, len(blocchi))
+
+    if num_processi > 1:
+        with ProcessPoolExecutor(max_workers=num_processi) as executor:
+            parziali = list(executor.map(_simula_blocco_task, argomenti))
+    else:
+        parziali = [_simula_blocco_task(a) for a in argomenti]
+
+    conteggi = sum(c for c, _ in parziali)
+    somma_punti = sum(p for _, p in parziali)
+
+    return {
+        'squadre': list(modello.squadre),
+        'probabilita': conteggi / num_simulazioni,
+        'punti_medi': somma_punti / num_simulazioni,
+        'num_simulazioni': num_simulazioni
+    }
+
+
+def tabella_probabilita(risultato: Dict, retrocessioni: int = 0) -> pd.DataFrame:
+    """
+    Converte il risultato della simulazione in una tabella leggibile.
+
+    Args:
+        risultato: output di simula_stagione
+        retrocessioni: numero di squadre retrocesse (0 = nessuna colonna)
+
+    Returns:
+        pd.DataFrame: una riga per squadra ordinata per punti medi, con le
+        probabilità di ogni posizione finale
+    """
+    probabilita = risultato['probabilita']
+    num_squadre = len(risultato['squadre'])
+
+    df = pd.DataFrame(
+        probabilita,
+        columns=[f"{i}°" for i in range(1, num_squadre + 1)]
+    )
+    df.insert(0, 'Squadra', risultato['squadre'])
+    df.insert(1, 'Punti medi', risultato['punti_medi'].round(1))
+    df['Titolo'] = probabilita[:, 0]
+    if retrocessioni:
+        df['Retrocessione'] = probabilita[:, num_squadre - retrocessioni:].sum(axis=1)
+
+    return df.sort_values('Punti medi', ascending=False).reset_index(drop=True)
@@ -0,0 +1,71 @@
+"""
+Test per la cache su disco dei voti letti da Excel.
+Verifica chiave per contenuto, riuso dei dati e pulizia LRU.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from cache_voti import (
+    chiave_contenuto,
+    leggi_cache,
+    leggi_excel_voti_con_cache,
+    pulisci_cache,
+    salva_cache
+)
+from excel_import import COLONNE_VOTI, leggi_excel_voti
+
+
+def test_cache_voti():
+    """Test cache: stesso contenuto, stessi dati senza rileggere l'Excel"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        cache = os.path.join(cartella, 'cache')
+        copia = os.path.join(cartella, 'copia.xlsx')
+        shutil.copy('esempio_voti.xlsx', copia)
+
+        print("Test 1: Primo caricamento salva in cache")
+        df = leggi_excel_voti_con_cache('esempio_voti.xlsx', cache)
+        atteso = leggi_excel_voti('esempio_voti.xlsx')[list(COLONNE_VOTI)]
+        pd.testing.assert_frame_equal(df, atteso)
+        assert len(os.listdir(cache)) == 1
+        print("✓ DataFrame normalizzato salvato")
+
+        print("\nTest 2: Stesso contenuto con un altro nome usa la cache")
+        with open(copia, 'rb') as f:
+            chiave = chiave_contenuto(f.read())
+        assert leggi_cache(chiave, cache) is not None
+        pd.testing.assert_frame_equal(leggi_excel_voti_con_cache(copia, cache), atteso)
+        assert len(os.listdir(cache)) == 1
+        print("✓ Cache trovata per contenuto")
+
+        print("\nTest 3: Pulizia dei file usati meno di recente")
+        piccolo = pd.DataFrame({'nome': ['A'], 'voto_base': [6.0]})
+        salva_cache('vecchio', piccolo, cache)
+        # Il file appena scritto deve risultare il meno recente
+        passato = time.time() - 60
+        for nome in os.listdir(cache):
+            if nome.startswith('vecchio'):
+                os.utime(os.path.join(cache, nome), (passato, passato))
+        dimensioni = {nome: os.path.getsize(os.path.join(cache, nome)) for nome in os.listdir(cache)}
+        eliminati = pulisci_cache(cache, sum(dimensioni.values()) - 1)
+        assert eliminati == 1
+        assert leggi_cache('vecchio', cache) is None
+        assert leggi_cache(chiave, cache) is not None
+        print("✓ Eliminato il file meno recente")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST CACHE VOTI")
+    print("=" * 60)
+
+    test_cache_voti()
+
+    print("\n" + "=" * 60)
+    print("✅ TUTTI I TEST SUPERATI!")
+    print("=" * 60)
@@ -4,6 +4,7 @@ Verifica il corretto funzionamento di tutte le regole.
 """
 
 from calc import (
+    GiocatorePunteggio,
     calcola_bonus_malus_da_eventi,
     calcola_voto_totale,
     calcola_voto_totale_squadra,
@@ -11,8 +12,19 @@ from calc import (
     calcola_modificatore_centrocampo,
     calcola_modificatore_attacco,
     calcola_gol_da_punteggio,
+    calcola_gol_da_punteggio_array,
     calcola_risultato_partita
 )
+from calc_batch import calcola_risultati_partite
+from regolamento import (
+    Regolamento,
+    TabellaSoglie,
+    compila_regolamento,
+    carica_regolamento,
+    regolamento_a_dict,
+    regolamento_da_dict,
+    risolvi_regolamento
+)
 
 
 def test_bonus_malus_da_eventi():
@@ -174,6 +186,12 @@ def test_gol_da_punteggio():
         gol = calcola_gol_da_punteggio(punteggio)
         assert gol == gol_attesi, f"Punteggio {punteggio}: attesi {gol_attesi} gol, ottenuti {gol}"
         print(f"✓ Punteggio {punteggio:.2f} -> {gol} gol")
+    
+    print("\nTest versione vettoriale su 10000 punteggi")
+    punteggi = [50 + i * 0.005 for i in range(10000)]
+    gol_array = calcola_gol_da_punteggio_array(punteggi)
+    assert gol_array.tolist() == [calcola_gol_da_punteggio(p) for p in punteggi]
+    print(f"✓ {len(punteggi)} punteggi convertiti in una chiamata")
 
 
 def test_partita_completa():
@@ -244,6 +262,219 @@ def test_partita_completa():
     print(f"{'='*60}")
 
 
+def _formazione_casuale(rng, modulo):
+    """Genera una formazione casuale con voti a mezzo punto"""
+    num_d, num_c, num_a = modulo
+    ruoli = ['P'] + ['D'] * num_d + ['C'] * num_c + ['A'] * num_a
+    return [
+        {
+            'nome': f'Giocatore {i}',
+            'ruolo': ruolo,
+            'voto_base': rng.choice([4.5, 5.0, 5.5, 6.0, 6.5, 7.0, 7.5, 8.0]),
+            'bonus_malus': rng.choice([-2.0, -1.0, -0.5, 0.0, 0.0, 0.0, 1.0, 3.0, 6.0])
+        }
+        for i, ruolo in enumerate(ruoli)
+    ]
+
+
+def test_batch_identico_a_scalare():
+    """Test motore vettoriale: risultati identici al calcolo scalare"""
+    import random
+
+    print("\n\nTest Motore Vettoriale:")
+
+    rng = random.Random(42)
+    moduli = [(3, 4, 3), (3, 5, 2), (4, 3, 3), (4, 4, 2), (4, 5, 1), (5, 3, 2), (5, 4, 1)]
+    partite = [
+        (
+            _formazione_casuale(rng, rng.choice(moduli)),
+            _formazione_casuale(rng, rng.choice(moduli))
+        )
+        for _ in range(500)
+    ]
+
+    risultati_batch = calcola_risultati_partite(partite)
+
+    for (casa, trasferta), risultato_batch in zip(partite, risultati_batch):
+        assert risultato_batch == calcola_risultato_partita(casa, trasferta)
+
+    print(f"✓ {len(partite)} partite identiche al calcolo scalare")
+
+
+def test_batch_ruolo_sconosciuto():
+    """Test ruolo non riconosciuto: conta nel voto squadra come nel calcolo scalare"""
+    import random
+
+    print("\n\nTest Ruolo Sconosciuto:")
+
+    rng = random.Random(3)
+    partite = []
+    for ruolo in ('X', '', None, 'p', 'Por'):
+        casa = _formazione_casuale(rng, (4, 4, 2))
+        trasferta = _formazione_casuale(rng, (3, 4, 3))
+        casa[5]['ruolo'] = ruolo
+        partite.append((casa, trasferta))
+
+    for punto_fisso in (False, True):
+        risultati_batch = calcola_risultati_partite(partite, punto_fisso=punto_fisso)
+        for (casa, trasferta), risultato_batch in zip(partite, risultati_batch):
+            assert risultato_batch == calcola_risultato_partita(casa, trasferta, punto_fisso=punto_fisso)
+
+    print(f"✓ {len(partite)} partite con ruoli non validi identiche al calcolo scalare")
+
+
+def test_giocatore_punteggio_identico_a_dict():
+    """Test record GiocatorePunteggio: stessi risultati delle formazioni come dict"""
+    import random
+
+    print("\n\nTest Record GiocatorePunteggio:")
+
+    rng = random.Random(17)
+    moduli = [(3, 4, 3), (3, 5, 2), (4, 3, 3), (4, 4, 2), (4, 5, 1), (5, 3, 2), (5, 4, 1)]
+
+    for _ in range(300):
+        casa = _formazione_casuale(rng, rng.choice(moduli))
+        trasferta = _formazione_casuale(rng, rng.choice(moduli))
+        record_casa = [GiocatorePunteggio.da_dict(g) for g in casa]
+        record_trasferta = [GiocatorePunteggio.da_dict(g) for g in trasferta]
+
+        assert calcola_risultato_partita(record_casa, record_trasferta) == calcola_risultato_partita(casa, trasferta)
+        assert calcola_risultati_partite([(record_casa, record_trasferta)]) == calcola_risultati_partite([(casa, trasferta)])
+
+        # Formazioni miste: record e dict nella stessa lista
+        mista_casa = [r if i % 2 else g for i, (g, r) in enumerate(zip(casa, record_casa))]
+        mista_trasferta = [g if i % 2 else r for i, (g, r) in enumerate(zip(trasferta, record_trasferta))]
+        atteso = calcola_risultato_partita(casa, trasferta)
+        assert calcola_risultato_partita(mista_casa, mista_trasferta) == atteso
+        assert calcola_risultato_partita(mista_casa, mista_trasferta, punto_fisso=True) == \
+            calcola_risultato_partita(casa, trasferta, punto_fisso=True)
+        assert calcola_risultati_partite([(mista_casa, mista_trasferta)]) == [atteso]
+
+    attaccanti = [GiocatorePunteggio('A1', 'A', 7.0, 0.0), GiocatorePunteggio('A2', 'A', 8.0, 3.0)]
+    assert calcola_modificatore_attacco(attaccanti) == 1.0
+    assert not hasattr(attaccanti[0], '__dict__')
+
+    print("✓ 300 partite identiche con record, dict e formazioni miste")
+
+
+def test_regolamento_personalizzato():
+    """Test regolamento configurabile e compilazione in cache"""
+    
+    print("\n\nTest Regolamento Personalizzato:")
+    
+    regolamento = Regolamento(
+        nome="Lega Test",
+        assist=1.5,
+        ammonizioni=-1,
+        vantaggio_casa=1.0,
+        tabella_gol=TabellaSoglie(soglie=(60, 70), valori=(0, 1, 2)),
+        soglia_gol_extra=80,
+        punti_per_gol_extra=5
+    )
+    compilato = compila_regolamento(regolamento)
+    
+    # Compilazione in cache: un regolamento uguale restituisce lo stesso oggetto
+    riletto = regolamento_da_dict(regolamento_a_dict(regolamento))
+    assert compila_regolamento(riletto) is compilato
+    print("✓ Compilazione in cache anche dopo la rilettura")
+    
+    bonus = calcola_bonus_malus_da_eventi(assist=2, ammonizioni=1, regolamento=compilato)
+    assert bonus == 2.0, f"Atteso 2.0, ottenuto {bonus}"
+    print(f"✓ Bonus con assist +1.5 e ammonizione -1: {bonus}")
+    
+    assert calcola_gol_da_punteggio(65, compilato) == 1
+    assert calcola_gol_da_punteggio(84.9, compilato) == 2
+    assert calcola_gol_da_punteggio(85, compilato) == 3
+    print("✓ Soglie gol personalizzate")
+    
+    import random
+    rng = random.Random(3)
+    partite = [
+        (_formazione_casuale(rng, (4, 4, 2)), _formazione_casuale(rng, (3, 5, 2)))
+        for _ in range(100)
+    ]
+    for (casa, trasferta), risultato in zip(partite, calcola_risultati_partite(partite, compilato)):
+        assert risultato == calcola_risultato_partita(casa, trasferta, compilato)
+        assert risultato['casa']['vantaggio_casa'] == 1.0
+    print("✓ Motore vettoriale e scalare coerenti con il regolamento personalizzato")
+
+
+def test_punto_fisso():
+    """Test modalità a punto fisso: stessi risultati, soglie esatte"""
+    import random
+
+    print("\n\nTest Punto Fisso:")
+
+    rng = random.Random(11)
+    moduli = [(3, 4, 3), (4, 4, 2), (5, 3, 2), (5, 4, 1)]
+    partite = []
+    for _ in range(200):
+        casa = _formazione_casuale(rng, rng.choice(moduli))
+        trasferta = _formazione_casuale(rng, rng.choice(moduli))
+        # Anche voti in quarti di punto
+        for giocatore in casa + trasferta:
+            giocatore['voto_base'] += rng.choice([0.0, 0.25, -0.25])
+        partite.append((casa, trasferta))
+
+    risultati_batch = calcola_risultati_partite(partite, punto_fisso=True)
+    for (casa, trasferta), risultato_batch in zip(partite, risultati_batch):
+        risultato = calcola_risultato_partita(casa, trasferta)
+        assert calcola_risultato_partita(casa, trasferta, punto_fisso=True) == risultato
+        assert risultato_batch == risultato
+    print(f"✓ {len(partite)} partite identiche al calcolo in float (scalare e batch)")
+
+    # Media difesa esattamente sulla soglia 6.25 (18.75 / 3) e punteggio esattamente 66
+    difesa = [
+        {'ruolo': 'D', 'voto_base': 6.0, 'bonus_malus': 0.0},
+        {'ruolo': 'D', 'voto_base': 6.5, 'bonus_malus': 0.0},
+        {'ruolo': 'D', 'voto_base': 6.25, 'bonus_malus': 0.0}
+    ]
+    casa = [{'ruolo': 'P', 'voto_base': 6.0, 'bonus_malus': 0.0}] + difesa
+    trasferta = [{'ruolo': 'P', 'voto_base': 58.0, 'bonus_malus': 0.0}]
+    risultato = calcola_risultato_partita(casa, trasferta, punto_fisso=True)
+    # Media 6.25 (fascia da 6.25 a 6.50) -> -2, correzione 3 difensori +1
+    assert risultato['casa']['modificatore_difesa_generato'] == -1.0
+    assert risultato['trasferta']['punteggio_totale'] == 57.0
+    assert risultato['casa']['punteggio_totale'] == 26.75
+    assert calcola_risultati_partite([(casa, trasferta)], punto_fisso=True) == [risultato]
+    print("✓ Media difesa sulla soglia valutata in modo esatto")
+
+    compilato = risolvi_regolamento(punto_fisso=True)
+    assert compilato.scala == 4
+    assert calcola_gol_da_punteggio(66 * 4, compilato) == 1
+    assert calcola_gol_da_punteggio(66 * 4 - 1, compilato) == 0
+    assert calcola_gol_da_punteggio(93 * 4, compilato) == 6
+    assert calcola_gol_da_punteggio_array([66 * 4 - 1, 66 * 4, 93 * 4], compilato).tolist() == [0, 1, 6]
+    print("✓ Soglie gol confrontate fra interi")
+
+    # Valori non rappresentabili in quarti di punto vengono rifiutati
+    sbagliato = [{'ruolo': 'P', 'voto_base': 6.1, 'bonus_malus': 0.0}]
+    for calcolo in (
+        lambda: calcola_risultato_partita(sbagliato, trasferta, punto_fisso=True),
+        lambda: calcola_risultati_partite([(sbagliato, trasferta)], punto_fisso=True),
+        lambda: risolvi_regolamento(Regolamento(assist=1.1), punto_fisso=True)
+    ):
+        try:
+            calcolo()
+            assert False, "Atteso ValueError"
+        except ValueError:
+            pass
+    print("✓ Voti e regolamenti non in quarti di punto rifiutati")
+
+
+def test_regolamento_esempio():
+    """Test caricamento del regolamento di esempio da TOML"""
+    
+    compilato = carica_regolamento('regolamento_esempio.toml')
+    assert compilato.regolamento.nome == "Lega Esempio"
+    assert compilato.regolamento.assist == 1.5
+    assert compilato.vantaggio_casa == 1.0
+    # Stesse tabelle del regolamento standard
+    assert compilato.tabella_difesa == Regolamento().tabella_difesa
+    assert carica_regolamento('regolamento_esempio.toml') is compilato
+    print("✓ Regolamento di esempio caricato")
+
+
 if __name__ == "__main__":
     print("="*60)
     print("TEST MOTORE DI CALCOLO FANTACALCIO")
@@ -255,6 +486,12 @@ if __name__ == "__main__":
     test_modificatore_attacco()
     test_gol_da_punteggio()
     test_partita_completa()
+    test_batch_identico_a_scalare()
+    test_batch_ruolo_sconosciuto()
+    test_giocatore_punteggio_identico_a_dict()
+    test_regolamento_personalizzato()
+    test_punto_fisso()
+    test_regolamento_esempio()
     
     print("\n" + "="*60)
     print("✅ TUTTI I TEST COMPLETATI CON SUCCESSO!")
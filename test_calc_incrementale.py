@@ -0,0 +1,139 @@
+"""
+Test per il calcolo incrementale.
+Verifica che ogni aggiornamento dia lo stesso risultato del calcolo completo.
+"""
+
+import random
+
+from calc import calcola_risultato_partita
+from calc_incrementale import PartitaIncrementale, RegistroLive
+from regolamento import risolvi_regolamento
+from test_calc import _formazione_casuale
+
+
+MODULI = [(3, 4, 3), (3, 5, 2), (4, 3, 3), (4, 4, 2), (4, 5, 1), (5, 3, 2), (5, 4, 1)]
+
+
+def test_aggiornamenti_identici_a_calcolo_completo():
+    """Test aggiornamenti: risultato identico a calcola_risultato_partita"""
+
+    rng = random.Random(8)
+
+    print("Test 1: Voti a quarti di punto e voti qualsiasi")
+    for prova in range(100):
+        casa = _formazione_casuale(rng, rng.choice(MODULI))
+        trasferta = _formazione_casuale(rng, rng.choice(MODULI))
+        partita = PartitaIncrementale(casa, trasferta)
+        assert partita.risultato() == calcola_risultato_partita(casa, trasferta)
+
+        for _ in range(20):
+            lato = rng.choice(['casa', 'trasferta'])
+            formazione = casa if lato == 'casa' else trasferta
+            indice = rng.randrange(len(formazione))
+            if prova % 3 == 0:
+                # Valori non multipli di 0.25: somme ricalcolate in ordine
+                voto_base = rng.choice([5.0, 5.75, 6.1, 6.25, 7.3])
+                bonus_malus = rng.choice([0.0, 0.3, 1.0, -0.5])
+            else:
+                voto_base = rng.choice([4.5, 5.0, 5.25, 6.0, 6.75, 7.5])
+                bonus_malus = rng.choice([0.0, 0.0, 1.0, -0.5, 3.0])
+
+            formazione[indice]['voto_base'] = voto_base
+            formazione[indice]['bonus_malus'] = bonus_malus
+            gol = partita.aggiorna_voto(lato, indice, voto_base, bonus_malus)
+
+            atteso = calcola_risultato_partita(casa, trasferta)
+            assert gol == (atteso['casa']['gol'], atteso['trasferta']['gol'])
+            assert partita.risultato() == atteso
+    print("✓ 2000 aggiornamenti identici al calcolo completo")
+
+
+def test_punto_fisso_identico_a_calcolo_completo():
+    """Test regolamento a punto fisso: risultato in punti, identico al calcolo completo"""
+
+    rng = random.Random(10)
+    reg = risolvi_regolamento(punto_fisso=True)
+
+    print("\nTest 1: Aggiornamenti con il regolamento a punto fisso")
+    for _ in range(50):
+        casa = _formazione_casuale(rng, rng.choice(MODULI))
+        trasferta = _formazione_casuale(rng, rng.choice(MODULI))
+        partita = PartitaIncrementale(casa, trasferta, reg)
+        assert partita.risultato() == calcola_risultato_partita(casa, trasferta, reg)
+
+        for _ in range(10):
+            lato = rng.choice(['casa', 'trasferta'])
+            formazione = casa if lato == 'casa' else trasferta
+            indice = rng.randrange(len(formazione))
+            formazione[indice]['voto_base'] = rng.choice([4.5, 5.0, 5.25, 6.0, 6.75, 7.5])
+            formazione[indice]['bonus_malus'] = rng.choice([0.0, 0.0, 1.0, -0.5, 3.0])
+            partita.aggiorna_voto(lato, indice, formazione[indice]['voto_base'], formazione[indice]['bonus_malus'])
+            assert partita.risultato() == calcola_risultato_partita(casa, trasferta, reg)
+    print("✓ 500 aggiornamenti identici al calcolo completo")
+
+    print("\nTest 2: Registro live e voti fuori dal quarto di punto")
+    for i, giocatore in enumerate(casa + trasferta):
+        giocatore['id'] = 100 + i
+    registro = RegistroLive()
+    registro.registra_partita(1, casa, trasferta, reg)
+    casa[1]['voto_base'] = 8.0
+    partita = registro.ottieni(1, casa, trasferta, reg)
+    assert partita.risultato() == calcola_risultato_partita(casa, trasferta, reg)
+    try:
+        partita.aggiorna_voto('casa', 1, voto_base=6.1)
+        assert False, "voto non multiplo di un quarto accettato"
+    except ValueError:
+        pass
+    print("✓ Riallineamento in unità intere, voti non rappresentabili rifiutati")
+
+
+def test_registro_live():
+    """Test registro: aggiornamento per id e riallineamento delle formazioni"""
+
+    rng = random.Random(9)
+    casa = _formazione_casuale(rng, (4, 4, 2))
+    trasferta = _formazione_casuale(rng, (3, 4, 3))
+    for i, giocatore in enumerate(casa + trasferta):
+        giocatore['id'] = 100 + i
+
+    registro = RegistroLive()
+    registro.registra_partita(1, casa, trasferta)
+
+    print("\nTest 2: Aggiornamento tramite id della formazione")
+    trasferta[5]['voto_base'] = 8.0
+    partita_id, gol = registro.aggiorna_voto(trasferta[5]['id'], voto_base=8.0)
+    atteso = calcola_risultato_partita(casa, trasferta)
+    assert partita_id == 1
+    assert gol == (atteso['casa']['gol'], atteso['trasferta']['gol'])
+    assert registro.aggiorna_voto(999, voto_base=7.0) is None
+    print("✓ Gol aggiornati")
+
+    print("\nTest 3: Voti cambiati fuori dal registro")
+    casa[2]['voto_base'] = 4.0
+    casa[9]['bonus_malus'] = 3.0
+    partita = registro.ottieni(1, casa, trasferta)
+    assert partita.risultato() == calcola_risultato_partita(casa, trasferta)
+    print("✓ Partita riallineata")
+
+    print("\nTest 4: Formazione cambiata")
+    casa[0] = dict(casa[0], id=500)
+    partita = registro.ottieni(1, casa, trasferta)
+    assert registro.aggiorna_voto(100, voto_base=5.0) is None
+    assert registro.aggiorna_voto(500, voto_base=5.0) is not None
+    casa[0]['voto_base'] = 5.0
+    assert partita.risultato() == calcola_risultato_partita(casa, trasferta)
+    print("✓ Partita registrata di nuovo")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST CALCOLO INCREMENTALE")
+    print("=" * 60)
+
+    test_aggiornamenti_identici_a_calcolo_completo()
+    test_punto_fisso_identico_a_calcolo_completo()
+    test_registro_live()
+
+    print("\n" + "=" * 60)
+    print("✅ TUTTI I TEST SUPERATI!")
+    print("=" * 60)
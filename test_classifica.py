@@ -0,0 +1,132 @@
+"""
+Test per la classifica materializzata.
+Verifica che gli aggiornamenti incrementali coincidano con la ricostruzione.
+"""
+
+import os
+import random
+import tempfile
+
+from sqlalchemy import text
+
+from classifica import ricalcola_partita, ricalcola_partite, ricostruisci_classifica, tabella_classifica
+from test_simulazione import MODULO, _crea_stagione
+
+
+def _righe(db):
+    """Classifica come lista di tuple confrontabili"""
+    return [
+        (r.squadra, r.punti, r.giocate, r.vinte, r.pareggiate, r.perse,
+         r.gol_fatti, r.gol_subiti, r.differenza_reti, r.punteggio_totale)
+        for r in db.get_classifica()
+    ]
+
+
+def test_classifica_incrementale():
+    """Test classifica: aggiornamenti incrementali, ricostruzione e lettura"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = _crea_stagione(os.path.join(cartella, 'classifica.db'), giornate=6, giocate=4)
+        rng = random.Random(4)
+        partite_giocate = [
+            p.id for g in db.get_all_giornate() if g.numero <= 4 for p in g.partite
+        ]
+
+        print("Test 1: Risultati registrati uno alla volta")
+        for partita_id in partite_giocate:
+            ricalcola_partita(db, partita_id)
+        incrementale = _righe(db)
+        assert sum(r[2] for r in incrementale) == 2 * len(partite_giocate)
+        assert sum(r[1] for r in incrementale) <= 3 * len(partite_giocate)
+
+        ricostruisci_classifica(db)
+        assert _righe(db) == incrementale
+        print("✓ Identica alla ricostruzione completa")
+
+        print("\nTest 2: Voti corretti e partita ricalcolata")
+        for _ in range(30):
+            partita_id = rng.choice(partite_giocate)
+            formazione = db.get_formazione_partita(partita_id, rng.choice(['casa', 'trasferta']))
+            giocatore = rng.choice(formazione)
+            db.update_voto(giocatore.id, voto_base=rng.choice([4.0, 5.5, 7.0, 9.0]), bonus_malus=rng.choice([0.0, 3.0, 6.0]))
+            ricalcola_partita(db, partita_id)
+        incrementale = _righe(db)
+
+        ricostruisci_classifica(db)
+        assert _righe(db) == incrementale
+        print("✓ Identica alla ricostruzione dopo 30 correzioni")
+
+        print("\nTest 3: Partita eliminata")
+        db.delete_partita(partite_giocate[0])
+        incrementale = _righe(db)
+        ricostruisci_classifica(db)
+        assert _righe(db) == incrementale
+        print("✓ Risultato stornato")
+
+        print("\nTest 4: Lettura con l'indice della classifica")
+        piano = db.get_session().execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM classifica WHERE giocate > 0 "
+            "ORDER BY punti DESC, differenza_reti DESC, gol_fatti DESC, punteggio_totale DESC, squadra"
+        )).fetchall()
+        dettaglio = ' '.join(str(riga[-1]) for riga in piano)
+        assert 'ix_classifica_ordine' in dettaglio and 'TEMP B-TREE' not in dettaglio, dettaglio
+
+        df = tabella_classifica(db)
+        assert list(df['Pos']) == list(range(1, len(df) + 1))
+        assert list(df['Squadra']) == [r[0] for r in incrementale]
+        print("✓ Nessun ordinamento in memoria")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+def test_partita_senza_voti():
+    """Test partita con formazioni complete ma senza voti: fuori classifica in ogni percorso"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = _crea_stagione(os.path.join(cartella, 'senza_voti.db'), num_squadre=4, giornate=5, giocate=4)
+        partite_giocate = [p.id for g in db.get_all_giornate() if g.numero <= 4 for p in g.partite]
+        senza_voti = [p.id for g in db.get_all_giornate() if g.numero == 5 for p in g.partite]
+        for partita_id in senza_voti:
+            partita = db.get_partita(partita_id)
+            for lato, squadra in (('casa', partita.squadra_casa), ('trasferta', partita.squadra_trasferta)):
+                db.add_formazione_bulk(partita_id, lato, [
+                    {'nome': f"{squadra} G{k}", 'ruolo': ruolo} for k, ruolo in enumerate(MODULO, 1)
+                ])
+
+        print("Test 1: Aggiornamenti incrementali, una partita alla volta e in blocco")
+        assert ricalcola_partita(db, senza_voti[0]) is None
+        assert ricalcola_partite(db, partite_giocate + senza_voti[1:]) == len(partite_giocate)
+        assert all(db.get_partita(partita_id).risultato is None for partita_id in senza_voti)
+        incrementale = _righe(db)
+        assert sum(r[2] for r in incrementale) == 2 * len(partite_giocate)
+
+        ricostruisci_classifica(db)
+        assert _righe(db) == incrementale
+        print("✓ Identica alla ricostruzione")
+
+        print("\nTest 2: Il primo voto porta la partita in classifica")
+        formazione = db.get_formazione_partita(senza_voti[0], 'casa')
+        db.update_voto(formazione[0].id, voto_base=7.0)
+        assert ricalcola_partita(db, senza_voti[0]) is not None
+        incrementale = _righe(db)
+        assert sum(r[2] for r in incrementale) == 2 * (len(partite_giocate) + 1)
+        ricostruisci_classifica(db)
+        assert _righe(db) == incrementale
+        print("✓ Partita conteggiata dopo il primo voto")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST CLASSIFICA")
+    print("=" * 60)
+
+    test_classifica_incrementale()
+    test_partita_senza_voti()
+
+    print("\n" + "=" * 60)
+    print("✅ TUTTI I TEST SUPERATI!")
+    print("=" * 60)
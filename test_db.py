@@ -0,0 +1,178 @@
+"""
+Test per le operazioni in blocco del DatabaseManager.
+Verifica inserimento e sostituzione delle formazioni e aggiornamento dei
+voti in un'unica transazione, profilo SQLite e backup in modalità WAL.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from sqlalchemy import event
+
+from classifica import ricalcola_partita
+from db import (
+    PROFILO_SQLITE, VOTO_AGGIORNATO, VOTO_CREATO, VOTO_MANUALE, VOTO_NON_TROVATO,
+    DatabaseManager, Voto
+)
+
+
+MODULO = ['P'] + ['D'] * 4 + ['C'] * 4 + ['A'] * 2
+
+
+def _giocatori(squadra, n=11):
+    return [{'nome': f" {squadra} G{k} ", 'ruolo': ruolo} for k, ruolo in enumerate(MODULO[:n], 1)]
+
+
+def test_add_formazioni_bulk():
+    """Test formazioni inserite e sostituite in blocco"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = DatabaseManager(os.path.join(cartella, 'formazioni.db'))
+        giornata = db.create_giornata(1)
+        partite = [db.create_partita(giornata.id, 'A', 'B'), db.create_partita(giornata.id, 'C', 'D')]
+
+        print("Test 1: Tutta la giornata in un commit")
+        commit = []
+
+        def conta_commit(sessione):
+            commit.append(sessione)
+
+        event.listen(db.session, 'after_commit', conta_commit)
+        ids = db.add_formazioni_giornata([
+            (partita.id, lato, _giocatori(squadra))
+            for partita in partite
+            for lato, squadra in (('casa', partita.squadra_casa), ('trasferta', partita.squadra_trasferta))
+        ])
+        event.remove(db.session, 'after_commit', conta_commit)
+        assert len(commit) == 1
+        assert len(ids) == 44
+        formazione = db.get_formazione_partita(partite[0].id, 'casa')
+        assert [f.posizione for f in formazione] == list(range(1, 12))
+        assert (formazione[0].giocatore, formazione[0].ruolo) == ('A G1', 'P')
+        assert formazione[0].voto.voto_base == 6.0
+        print(f"✓ {len(ids)} giocatori con voto iniziale")
+
+        print("\nTest 2: Sostituzione di una formazione")
+        ricalcola_partita(db, partite[0].id)
+        vecchi = [f.id for f in formazione]
+        db.add_formazione_bulk(partite[0].id, 'casa', _giocatori('E', 5), sostituisci=True)
+        nuova = db.get_formazione_partita(partite[0].id, 'casa')
+        assert [f.giocatore for f in nuova] == [f"E G{k}" for k in range(1, 6)]
+        assert all(f.voto.voto_base == 6.0 for f in nuova)
+        assert db.session.query(Voto).filter(Voto.formazione_id.in_(vecchi)).count() == 0
+        assert db.session.query(Voto).count() == 44 - 11 + 5
+        assert len(db.get_formazione_partita(partite[0].id, 'trasferta')) == 11
+        assert db.get_partita(partite[0].id).risultato is None
+        print("✓ Vecchia formazione eliminata, partita fuori classifica")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+def test_aggiorna_voti_batch():
+    """Test voti aggiornati in blocco con esito per riga"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = DatabaseManager(os.path.join(cartella, 'voti.db'))
+        giornata = db.create_giornata(1)
+        partita = db.create_partita(giornata.id, 'A', 'B')
+        ids = db.add_formazione_bulk(partita.id, 'casa', _giocatori('A', 4))
+        db.update_voto(ids[2], voto_base=8.0, is_manual=True)
+        db.session.query(Voto).filter_by(formazione_id=ids[3]).delete()
+        db.session.commit()
+
+        print("Test 1: Esito di ogni riga")
+        commit = []
+
+        def conta_commit(sessione):
+            commit.append(sessione)
+
+        event.listen(db.session, 'after_commit', conta_commit)
+        stati = db.aggiorna_voti_batch(pd.DataFrame({
+            'formazione_id': ids + [9999],
+            'voto_base': [7.0, np.nan, 5.0, 6.5, 6.0],
+            'gol_fatti': np.array([1, 2, 0, 0, 0], dtype='int8'),
+            'note': ['', None, '', 'SV', '']
+        }))
+        event.remove(db.session, 'after_commit', conta_commit)
+        assert len(commit) == 1
+        assert stati == [VOTO_AGGIORNATO, VOTO_AGGIORNATO, VOTO_MANUALE, VOTO_CREATO, VOTO_NON_TROVATO]
+        print(f"✓ Esiti: {stati}")
+
+        print("\nTest 2: Valori scritti")
+        voti = db.get_voti_formazioni(ids)
+        assert (voti[ids[0]]['voto_base'], voti[ids[0]]['gol_fatti']) == (7.0, 1)
+        # NaN e None lasciano il valore esistente
+        assert (voti[ids[1]]['voto_base'], voti[ids[1]]['gol_fatti']) == (6.0, 2)
+        assert voti[ids[2]]['voto_base'] == 8.0
+        assert (voti[ids[3]]['voto_base'], voti[ids[3]]['note']) == (6.5, 'SV')
+        print("✓ Voti aggiornati, creati e manuali preservati")
+
+        print("\nTest 3: Nomi dei parametri di update_voto")
+        stati = db.aggiorna_voti_batch(
+            [{'formazione_id': ids[2], 'bonus_malus': 3.0, 'is_manual': True}],
+            preserva_manuali=False
+        )
+        assert stati == [VOTO_AGGIORNATO]
+        voto = db.get_voti_formazioni([ids[2]])[ids[2]]
+        assert (voto['bonus_malus_totale'], voto['is_manual_override']) == (3.0, True)
+        try:
+            db.aggiorna_voti_batch([{'formazione_id': ids[0], 'voto': 6.0}])
+            assert False, "campo sconosciuto accettato"
+        except ValueError:
+            pass
+        print("✓ Alias accettati, campi sconosciuti rifiutati")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+def test_profilo_sqlite_e_backup():
+    """Test pragma applicati alla connessione e backup/ripristino con WAL"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = DatabaseManager(os.path.join(cartella, 'wal.db'))
+
+        print("Test 1: Pragma del profilo")
+        connessione = db.session.connection()
+        assert connessione.exec_driver_sql("PRAGMA journal_mode").scalar() == 'wal'
+        assert connessione.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert connessione.exec_driver_sql("PRAGMA busy_timeout").scalar() == PROFILO_SQLITE['busy_timeout']
+        assert connessione.exec_driver_sql("PRAGMA temp_store").scalar() == 2
+        print("✓ WAL, synchronous=NORMAL, temp_store=MEMORY")
+
+        print("\nTest 2: Il backup contiene i commit ancora nel WAL")
+        giornata = db.create_giornata(1)
+        partita_id = db.create_partita(giornata.id, 'A', 'B').id
+        ids = db.add_formazione_bulk(partita_id, 'casa', _giocatori('A'))
+        db.aggiorna_voti_batch([{'formazione_id': ids[0], 'voto_base': 7.5}])
+        backup = db.backup_database(os.path.join(cartella, 'backup.db'))
+        db.aggiorna_voti_batch([{'formazione_id': ids[0], 'voto_base': 4.0}])
+        assert os.path.exists(db.db_path + '-wal')
+        print("✓ Backup creato")
+
+        print("\nTest 3: Ripristino senza il vecchio WAL")
+        assert db.restore_database(backup)
+        assert db.get_voti_formazioni([ids[0]])[ids[0]]['voto_base'] == 7.5
+        assert len(db.get_formazione_partita(partita_id, 'casa')) == 11
+        print("✓ Dati del backup ripristinati")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST DATABASE")
+    print("=" * 60)
+
+    test_add_formazioni_bulk()
+    test_aggiorna_voti_batch()
+    test_profilo_sqlite_e_backup()
+
+    print("\n" + "=" * 60)
+    print("✅ TUTTI I TEST SUPERATI!")
+    print("=" * 60)
@@ -0,0 +1,68 @@
+"""
+Test per l'export della stagione in Excel e CSV.
+Verifica fogli per giornata, righe, fantavoti e risultati registrati.
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+from classifica import ricostruisci_classifica
+from db import RisultatoPartita
+from esporta_stagione import COLONNE_EXPORT, esporta_stagione
+from test_simulazione import _crea_stagione
+
+
+def test_esporta_stagione():
+    """Test export: un foglio per giornata e stessi dati nel CSV"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = _crea_stagione(os.path.join(cartella, 'export.db'), giornate=6, giocate=4)
+        ricostruisci_classifica(db)
+
+        print("Test 1: Excel con un foglio per giornata")
+        percorso = os.path.join(cartella, 'stagione.xlsx')
+        esportate = esporta_stagione(db, percorso)
+        # 4 giornate giocate x 3 partite x 22 giocatori
+        assert esportate == 4 * 3 * 22
+        fogli = pd.read_excel(percorso, sheet_name=None)
+        assert list(fogli) == [f"Giornata {n}" for n in range(1, 5)]
+        assert all(list(df.columns) == list(COLONNE_EXPORT) for df in fogli.values())
+        assert all(len(df) == 66 for df in fogli.values())
+        print(f"✓ {esportate} righe in {len(fogli)} fogli")
+
+        print("\nTest 2: Fantavoti e risultati registrati")
+        df = pd.concat(fogli.values(), ignore_index=True)
+        assert (df['Fantavoto'] - (df['Voto'] + df['Bonus/Malus'])).abs().max() < 1e-9
+        for risultato in db.session.query(RisultatoPartita):
+            partita = db.get_partita(risultato.partita_id)
+            righe = df[(df['Partita'] == f"{partita.squadra_casa} - {partita.squadra_trasferta}") &
+                       (df['Giornata'] == partita.giornata.numero)]
+            casa = righe[righe['Lato'] == 'casa'].iloc[0]
+            assert (casa['Gol'], casa['Gol subiti'], casa['Punteggio']) == (
+                risultato.gol_casa, risultato.gol_trasferta, risultato.punteggio_casa
+            )
+        print("✓ Gol e punteggi come in classifica")
+
+        print("\nTest 3: CSV con le stesse righe")
+        percorso_csv = os.path.join(cartella, 'stagione.csv')
+        assert esporta_stagione(db, percorso_csv) == esportate
+        csv = pd.read_csv(percorso_csv, encoding='utf-8-sig', keep_default_na=False, na_values=[''])
+        pd.testing.assert_frame_equal(csv, df, check_dtype=False)
+        print("✓ CSV identico all'Excel")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST EXPORT STAGIONE")
+    print("=" * 60)
+
+    test_esporta_stagione()
+
+    print("\n" + "=" * 60)
+    print("✅ TUTTI I TEST SUPERATI!")
+    print("=" * 60)
@@ -0,0 +1,292 @@
+"""
+Test per l'import dei voti da Excel.
+Verifica parsing, normalizzazione e calcolo dei bonus/malus.
+"""
+
+import os
+import random
+import tempfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from calc import GiocatorePunteggio
+from regolamento import EVENTI_BONUS_MALUS, Regolamento, compila_regolamento
+from excel_import import (
+    COLONNE_EVENTI,
+    COLONNE_VOTI,
+    applica_voti_excel_a_formazione,
+    calcola_bonus_malus_excel,
+    calcola_bonus_malus_colonne,
+    elenca_fogli,
+    leggi_csv_voti,
+    leggi_excel_fogli,
+    leggi_excel_voti,
+    leggi_testo_voti,
+    leggi_voti,
+    parse_voto_excel,
+    parse_voti_colonna,
+    _normalizza_df_voti
+)
+
+
+def _df_eventi_casuali(num_righe, seed=7):
+    """Crea un DataFrame con eventi casuali per tutti i ruoli"""
+    rng = random.Random(seed)
+    righe = []
+    for i in range(num_righe):
+        riga = {'nome': f'Giocatore {i}', 'ruolo': rng.choice(['P', 'D', 'C', 'A'])}
+        for col in COLONNE_EVENTI:
+            riga[col] = rng.choice([0, 0, 0, 1, 2, 3])
+        righe.append(riga)
+    return pd.DataFrame(righe)
+
+
+def test_bonus_malus_colonne_identico_a_scalare():
+    """Test bonus/malus per colonne identico al calcolo riga per riga"""
+    
+    print("\nTest Bonus/Malus Vettoriale:")
+    
+    df = _df_eventi_casuali(600)
+    
+    scalare = df.apply(calcola_bonus_malus_excel, axis=1)
+    vettoriale = calcola_bonus_malus_colonne(df)
+    
+    assert scalare.tolist() == vettoriale.tolist()
+    print(f"✓ {len(df)} righe identiche al calcolo scalare")
+    
+    # Un peso diverso per ogni evento: uno scambio di colonne cambia il risultato
+    regolamento = compila_regolamento(Regolamento(
+        **{evento: 0.5 * k for k, evento in enumerate(EVENTI_BONUS_MALUS, 1)},
+        gol_subiti_portiere=-1.5, porta_inviolata=0.5
+    ))
+    scalare = df.apply(calcola_bonus_malus_excel, axis=1, regolamento=regolamento)
+    vettoriale = calcola_bonus_malus_colonne(df, regolamento)
+    
+    assert scalare.tolist() == vettoriale.tolist()
+    print("✓ Identico anche con un regolamento personalizzato")
+
+
+def test_bonus_malus_colonne_portiere():
+    """Test porta inviolata e gol subiti solo per i portieri"""
+    
+    df = pd.DataFrame([
+        {'ruolo': 'P', 'gs': 0, 'rp': 1},
+        {'ruolo': 'P', 'gs': 2, 'rp': 0},
+        {'ruolo': 'D', 'gs': 0, 'rp': 0},
+        {'ruolo': None, 'gs': 0, 'rp': 0},
+    ])
+    
+    bonus = calcola_bonus_malus_colonne(df).tolist()
+    assert bonus == [4.0, -2.0, 0.0, 0.0], f"Ottenuto {bonus}"
+    print(f"✓ Bonus portieri: {bonus}")
+
+
+def test_applica_voti_excel_a_formazione():
+    """Test applicazione voti: restituisce record GiocatorePunteggio"""
+    
+    df = pd.DataFrame([
+        {'nome': 'Lautaro', 'ruolo': 'A', 'voto_base': 7.5, 'gf': 2, 'ass': 1, 'nota': ''},
+        {'nome': 'Theo Hernandez', 'ruolo': 'D', 'voto_base': 7.0, 'gf': 1, 'ass': 0, 'nota': ''},
+    ])
+    formazione = [
+        {'nome': 'Lautaro ', 'ruolo': 'A', 'voto_base': 6.0, 'bonus_malus': 0.0},
+        GiocatorePunteggio('Sommer', 'P', id=7),
+        GiocatorePunteggio('Lucas Hernandez', 'D', id=8)
+    ]
+    
+    da_confermare = []
+    aggiornata = applica_voti_excel_a_formazione(df, formazione, da_confermare=da_confermare)
+    
+    assert all(isinstance(g, GiocatorePunteggio) for g in aggiornata)
+    assert (aggiornata[0].voto_base, aggiornata[0].bonus_malus, aggiornata[0].da_excel) == (7.5, 7.0, True)
+    assert aggiornata[0].eventi['gol_fatti'] == 2
+    assert (aggiornata[1].note, aggiornata[1].id, aggiornata[1].da_excel) == ('SV', 7, False)
+    # Stesso cognome, nome proprio diverso: 6 SV e corrispondenza da confermare
+    assert (aggiornata[2].voto_base, aggiornata[2].note, aggiornata[2].da_excel) == (6.0, 'SV', False)
+    assert [c.nome_trovato for c in da_confermare] == ['Theo Hernandez']
+    print("✓ Formazione aggiornata con record")
+
+
+def test_parse_voti_colonna_identico_a_scalare():
+    """Test parsing vettoriale dei voti identico a parse_voto_excel"""
+    
+    print("\nTest Parsing Voti Vettoriale:")
+    
+    rng = random.Random(5)
+    valori = [6.5, 6, '6*', ' 7.5 ', None, float('nan'), 'abc', '', '*', '5.5*', '6,5', True, 7]
+    voti = pd.Series([rng.choice(valori) for _ in range(500)], dtype=object)
+    
+    atteso = [parse_voto_excel(v) for v in voti]
+    parsati = parse_voti_colonna(voti)
+    
+    assert list(zip(parsati['voto_base'], parsati['nota'])) == atteso
+    print(f"✓ {len(voti)} voti identici al parsing riga per riga")
+    
+    numerici = parse_voti_colonna(pd.Series([6.5, None, 7.0]))
+    assert numerici['voto_base'].tolist() == [6.5, 6.0, 7.0]
+    assert numerici['nota'].tolist() == ['', 'SV', '']
+    print("✓ Colonna numerica: celle vuote SV")
+
+
+def test_leggi_excel_fantacalcio():
+    """Test lettura in un solo passaggio: file standard e Fantacalcio.it"""
+    
+    print("\nTest Lettura Excel:")
+    
+    # File standard: stesso risultato della lettura con pandas
+    letto = leggi_excel_voti('esempio_voti.xlsx')
+    atteso = _normalizza_df_voti(pd.read_excel('esempio_voti.xlsx'))
+    pd.testing.assert_frame_equal(letto, atteso, check_dtype=False)
+    print(f"✓ File standard: {len(letto)} giocatori come pandas.read_excel")
+    
+    # File Fantacalcio.it: titolo, riga vuota e intestazione con "Cod."
+    workbook = Workbook()
+    foglio = workbook.active
+    foglio.append(['Voti Fantacalcio Stagione 2024-25 Giornata 5'])
+    foglio.append([])
+    foglio.append(['Cod.', 'Ruolo', 'Nome', 'Voto', 'Gf', 'Gs', 'Rp', 'Rs', 'Rf', 'Au', 'Amm', 'Esp', 'Ass'])
+    foglio.append([1, 'P', 'Sommer ', 6.5, 0, 1, 0, 0, 0, 0, 0, 0, 0])
+    foglio.append([2, 'D', 'Bastoni', '6*', 0, 0, 0, 0, 0, 0, 1, 0, 0])
+    foglio.append([3, 'A', 'Lautaro', 8, 2, 0, 0, 0, 0, 0, 0, 0, 1])
+    
+    with tempfile.TemporaryDirectory() as cartella:
+        percorso = os.path.join(cartella, 'voti.xlsx')
+        workbook.save(percorso)
+        df = leggi_excel_voti(percorso)
+    
+    assert df['nome'].tolist() == ['Sommer', 'Bastoni', 'Lautaro']
+    assert df['ruolo'].tolist() == ['P', 'D', 'A']
+    assert df['voto_base'].tolist() == [6.5, 6.0, 8.0]
+    assert df['nota'].tolist() == ['', 'SV', '']
+    assert df['gf'].tolist() == [0, 0, 2]
+    print("✓ File Fantacalcio.it: intestazione trovata in streaming")
+    
+    # Solo le colonne del calcolo, con tipi compatti
+    assert list(df.columns) == list(COLONNE_VOTI)
+    assert all(df[col].dtype == np.int8 for col in COLONNE_EVENTI)
+    assert df['voto_base'].dtype == np.float32
+    assert isinstance(df['ruolo'].dtype, pd.CategoricalDtype)
+    assert isinstance(df['nota'].dtype, pd.CategoricalDtype)
+    print("✓ Colonne ridotte: eventi int8, voto float32, ruolo e nota categoriali")
+    
+    # Un voto non esatto in float32 resta float64
+    irregolare = _normalizza_df_voti(pd.DataFrame({'Ruolo': ['C'], 'Nome': ['Barella'], 'Voto': [6.1]}))
+    assert irregolare['voto_base'].dtype == np.float64
+    assert irregolare['voto_base'].tolist() == [6.1]
+    print("✓ Voto non rappresentabile in float32 lasciato in float64")
+    
+    # Intestazione assente: errore esplicito
+    workbook = Workbook()
+    workbook.active.append(['Voti Fantacalcio'])
+    workbook.active.append(['Cod.', 'Squadra'])
+    with tempfile.TemporaryDirectory() as cartella:
+        percorso = os.path.join(cartella, 'senza_header.xlsx')
+        workbook.save(percorso)
+        try:
+            leggi_excel_voti(percorso)
+            assert False, "Atteso ValueError"
+        except ValueError as e:
+            assert "header" in str(e)
+    print("✓ Intestazione mancante segnalata")
+
+
+def test_leggi_csv_e_testo():
+    """Test lettura da CSV e da testo incollato: stessi voti del file Excel"""
+    
+    print("\nTest Lettura CSV e testo:")
+    
+    atteso = leggi_excel_voti('esempio_voti.xlsx')
+    
+    with tempfile.TemporaryDirectory() as cartella:
+        # CSV "all'italiana": punto e virgola e virgola decimale
+        percorso = os.path.join(cartella, 'voti.csv')
+        pd.read_excel('esempio_voti.xlsx').to_csv(percorso, sep=';', decimal=',', index=False)
+        pd.testing.assert_frame_equal(leggi_csv_voti(percorso), atteso)
+        pd.testing.assert_frame_equal(leggi_voti(percorso), atteso)
+        print("✓ CSV con ; e virgola decimale identico all'Excel")
+        
+        # Salvato da Excel per Windows: codifica cp1252
+        percorso = os.path.join(cartella, 'accenti.csv')
+        with open(percorso, 'w', encoding='cp1252', newline='') as f:
+            f.write('Ruolo,Nome,Voto,Gf\r\nA,Nicolò Zaniolo,"6,5",1\r\n')
+        df = leggi_csv_voti(percorso)
+        assert df['nome'].tolist() == ['Nicolò Zaniolo']
+        assert df['voto_base'].tolist() == [6.5]
+        print("✓ CSV in cp1252 con voto fra virgolette")
+    
+    # Tabella copiata da una pagina web: tab, titolo sopra l'intestazione
+    testo = (
+        "Voti Fantacalcio Giornata 5\n"
+        "Cod.\tRuolo\tNome\tVoto\tGf\tGs\tAmm\n"
+        "1\tP\tSommer\t6,5\t0\t1\t0\n"
+        "2\tD\tBastoni\t6*\t0\t0\t1\n"
+        "\n"
+        "3\tA\tLautaro\t8\t2\t0\t0\n"
+    )
+    df = leggi_testo_voti(testo)
+    assert df['nome'].tolist() == ['Sommer', 'Bastoni', 'Lautaro']
+    assert df['voto_base'].tolist() == [6.5, 6.0, 8.0]
+    assert df['nota'].tolist() == ['', 'SV', '']
+    assert df['gf'].tolist() == [0, 0, 2]
+    assert df['amm'].tolist() == [0, 1, 0]
+    print("✓ Testo incollato con tab e riga vuota")
+
+
+def test_leggi_excel_fogli():
+    """Test cartella di lavoro con più fogli: un solo DataFrame con la colonna foglio"""
+    
+    print("\nTest Lettura di più fogli:")
+    
+    workbook = Workbook()
+    foglio = workbook.active
+    foglio.title = 'Fantacalcio'
+    foglio.append(['Voti Fantacalcio Giornata 5'])
+    foglio.append(['Cod.', 'Ruolo', 'Nome', 'Voto', 'Gf', 'Ass'])
+    foglio.append([1, 'A', 'Lautaro', 8, 2, 1])
+    foglio.append([2, 'C', 'Barella', '6*', 0, 0])
+    foglio = workbook.create_sheet('Statistico')
+    foglio.append(['Ruolo', 'Nome', 'Voto', 'Gf'])
+    foglio.append(['A', 'Lautaro', 7.5, 2])
+    workbook.create_sheet('Note').append(['Voti aggiornati al lunedì'])
+    
+    with tempfile.TemporaryDirectory() as cartella:
+        percorso = os.path.join(cartella, 'voti.xlsx')
+        workbook.save(percorso)
+        
+        assert elenca_fogli(percorso) == ['Fantacalcio', 'Statistico', 'Note']
+        
+        # Tutti i fogli: quelli senza intestazione di voti vengono saltati
+        df = leggi_excel_fogli(percorso, num_thread=2)
+        assert df['foglio'].tolist() == ['Fantacalcio', 'Fantacalcio', 'Statistico']
+        assert df['voto_base'].tolist() == [8.0, 6.0, 7.5]
+        assert df['ass'].tolist() == [1, 0, 0]
+        assert list(df['foglio'].cat.categories) == ['Fantacalcio', 'Statistico']
+        print(f"✓ {len(df)} voti da 2 fogli, foglio 'Note' saltato")
+        
+        # Un foglio scelto: stessi voti della lettura del foglio singolo
+        statistico = leggi_excel_fogli(percorso, ['Statistico'])
+        assert statistico['nome'].tolist() == ['Lautaro']
+        primo = leggi_excel_fogli(percorso, ['Fantacalcio']).drop(columns='foglio')
+        pd.testing.assert_frame_equal(primo, leggi_excel_voti(percorso))
+        print("✓ Fogli scelti identici alla lettura singola")
+        
+        # Un foglio scelto senza voti è un errore
+        try:
+            leggi_excel_fogli(percorso, ['Note'])
+            assert False, "Atteso ValueError"
+        except ValueError as e:
+            assert 'Note' in str(e)
+        print("✓ Foglio senza voti segnalato")
+
+
+if __name__ == "__main__":
+    test_bonus_malus_colonne_identico_a_scalare()
+    test_bonus_malus_colonne_portiere()
+    test_applica_voti_excel_a_formazione()
+    test_parse_voti_colonna_identico_a_scalare()
+    test_leggi_excel_fantacalcio()
+    test_leggi_csv_e_testo()
+    test_leggi_excel_fogli()
+    print("\n✅ TUTTI I TEST COMPLETATI CON SUCCESSO!")
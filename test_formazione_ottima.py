@@ -0,0 +1,145 @@
+"""
+Test per l'ottimizzatore della formazione.
+Confronta il risultato (gol attesi, poi margine) con l'enumerazione completa
+di moduli e titolari.
+"""
+
+import random
+import time
+from itertools import combinations
+
+from calc import (
+    calcola_gol_da_punteggio,
+    calcola_modificatore_difesa,
+    calcola_modificatore_centrocampo,
+    calcola_modificatore_attacco
+)
+from formazione_ottima import MODULI, calcola_formazione_ottima
+from regolamento import REGOLAMENTO_STANDARD
+
+
+def _rosa_casuale(rng, numeri=(3, 8, 8, 6)):
+    """Crea una rosa con valori attesi casuali (numeri = giocatori per ruolo P, D, C, A)"""
+    rosa = []
+    for ruolo, numero in zip('PDCA', numeri):
+        for i in range(numero):
+            rosa.append({
+                'nome': f'{ruolo}{i}',
+                'ruolo': ruolo,
+                'voto_base': rng.choice([5.0, 5.5, 5.75, 6.0, 6.25, 6.5, 7.0, 7.5]),
+                'bonus_malus': rng.choice([0.0, 0.0, 0.5, 1.0, -0.5, 2.5])
+            })
+    return rosa
+
+
+def _valuta(titolari, avversario, casa=None):
+    """(gol attesi o differenza reti, margine) di una formazione calcolati direttamente con calc.py"""
+    vantaggio = REGOLAMENTO_STANDARD.vantaggio_casa
+    nostro = vantaggio if casa is True else 0.0
+    dell_avversario = vantaggio if casa is False else 0.0
+    difensori = [g['voto_base'] for g in titolari if g['ruolo'] == 'D']
+    centrocampisti = [g['voto_base'] for g in titolari if g['ruolo'] == 'C']
+    attaccanti = [g for g in titolari if g['ruolo'] == 'A']
+    voto_squadra = sum(g['voto_base'] + g['bonus_malus'] for g in titolari)
+    mod_difesa = calcola_modificatore_difesa(difensori, len(difensori))
+    mod_attacco = calcola_modificatore_attacco(attaccanti)
+
+    if avversario is None:
+        return calcola_gol_da_punteggio(voto_squadra + mod_attacco + nostro), voto_squadra + mod_attacco - mod_difesa
+
+    difensori_avversario = [g['voto_base'] for g in avversario if g['ruolo'] == 'D']
+    mod_centrocampo, mod_centrocampo_avversario = calcola_modificatore_centrocampo(
+        centrocampisti, [g['voto_base'] for g in avversario if g['ruolo'] == 'C']
+    )
+    punteggio = (
+        voto_squadra + mod_centrocampo + mod_attacco + nostro +
+        calcola_modificatore_difesa(difensori_avversario, len(difensori_avversario))
+    )
+    punteggio_avversario = (
+        sum(g['voto_base'] + g['bonus_malus'] for g in avversario) + mod_centrocampo_avversario +
+        calcola_modificatore_attacco([g for g in avversario if g['ruolo'] == 'A']) + mod_difesa +
+        dell_avversario
+    )
+    gol = calcola_gol_da_punteggio(punteggio) - calcola_gol_da_punteggio(punteggio_avversario)
+    return gol, voto_squadra + mod_attacco + 2 * mod_centrocampo - mod_difesa
+
+
+def _forza_bruta(rosa, avversario, casa=None):
+    """Migliore (gol, margine) provando tutte le combinazioni di tutti i moduli"""
+    reparti = {r: [g for g in rosa if g['ruolo'] == r] for r in 'PDCA'}
+    portiere = max(reparti['P'], key=lambda g: g['voto_base'] + g['bonus_malus'])
+
+    migliore = (float('-inf'), float('-inf'))
+    for num_dif, num_cen, num_att in MODULI.values():
+        for difensori in combinations(reparti['D'], num_dif):
+            for centrocampisti in combinations(reparti['C'], num_cen):
+                for attaccanti in combinations(reparti['A'], num_att):
+                    titolari = [portiere, *difensori, *centrocampisti, *attaccanti]
+                    valore = _valuta(titolari, avversario, casa)
+                    # Margini uguali a meno degli arrotondamenti
+                    if valore[0] > migliore[0] or (valore[0] == migliore[0] and valore[1] > migliore[1] + 1e-9):
+                        migliore = valore
+    return migliore
+
+
+def test_formazione_ottima():
+    """Test ottimizzatore: stesso margine dell'enumerazione completa"""
+
+    rng = random.Random(11)
+
+    print("Test 1: Confronto con forza bruta (con e senza avversario, in casa e fuori)")
+    for prova in range(12):
+        rosa = _rosa_casuale(rng, (2, 6, 6, 4))
+        avversario = None
+        if prova % 2:
+            avversario = _rosa_casuale(rng, (1, 4, rng.choice([3, 4, 5]), 2))
+        casa = (None, True, False)[prova // 2 % 3]
+
+        risultato = calcola_formazione_ottima(rosa, avversario, casa=casa)
+        gol_atteso, margine_atteso = _forza_bruta(rosa, avversario, casa)
+        gol, margine = _valuta(risultato['titolari'], avversario, casa)
+
+        assert len(risultato['titolari']) == 11
+        assert gol == gol_atteso, f"Attesi {gol_atteso} gol, ottenuti {gol}"
+        assert abs(margine - margine_atteso) < 1e-9, f"Atteso {margine_atteso}, ottenuto {margine}"
+        assert abs(risultato['margine'] - margine) < 1e-9
+        if avversario is not None:
+            assert risultato['gol_attesi'] - risultato['gol_subiti_attesi'] == gol
+        else:
+            assert (risultato['gol_attesi'], risultato['gol_subiti_attesi']) == (gol, None)
+    print("✓ Gol attesi e margine ottimi in tutte le prove")
+
+    print("\nTest 2: Modulo coerente con i titolari")
+    num_dif, num_cen, num_att = MODULI[risultato['modulo']]
+    ruoli = [g['ruolo'] for g in risultato['titolari']]
+    assert ruoli == ['P'] + ['D'] * num_dif + ['C'] * num_cen + ['A'] * num_att
+    print(f"✓ Modulo {risultato['modulo']}")
+
+    print("\nTest 3: Tempo di risposta")
+    rosa = _rosa_casuale(rng, (3, 10, 10, 7))
+    avversario = _rosa_casuale(rng, (1, 4, 5, 2))
+    inizio = time.perf_counter()
+    calcola_formazione_ottima(rosa, avversario)
+    durata = time.perf_counter() - inizio
+    assert durata < 0.1, f"Troppo lento: {durata * 1000:.1f} ms"
+    print(f"✓ {durata * 1000:.1f} ms")
+
+    print("\nTest 4: Rosa insufficiente")
+    try:
+        calcola_formazione_ottima([g for g in rosa if g['ruolo'] != 'P'])
+        assert False, "Attesa ValueError"
+    except ValueError:
+        pass
+    print("✓ Errore sollevato")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST FORMAZIONE OTTIMA")
+    print("=" * 60)
+
+    test_formazione_ottima()
+
+    print("\n" + "=" * 60)
+    print("✅ TUTTI I TEST SUPERATI!")
+    print("=" * 60)
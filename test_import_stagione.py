@@ -0,0 +1,304 @@
+"""
+Test per l'import in blocco dei voti di più giornate.
+Verifica numero di giornata dal nome del file, lettura da cartella e zip,
+scrittura dei voti, voti ufficiali salvati e ricostruzione della classifica.
+"""
+
+import os
+import tempfile
+import zipfile
+
+import pandas as pd
+from openpyxl import Workbook
+
+from calc import calcola_bonus_malus_da_eventi
+from sqlalchemy import event
+
+from classifica import ricalcola_partita
+from db import DatabaseManager, Formazione, Voto
+from excel_import import COLONNE_EVENTI, COLONNE_VOTI, leggi_excel_voti
+from import_stagione import applica_voti_giornata, elenca_file_voti, importa_stagione, numero_giornata_da_nome
+
+
+MODULO = ['P'] + ['D'] * 4 + ['C'] * 4 + ['A'] * 2
+SQUADRE = ('Squadra A', 'Squadra B')
+
+
+def _salva_voti(percorso, numero):
+    """File di voti in formato Fantacalcio.it per i giocatori di una giornata"""
+    workbook = Workbook()
+    foglio = workbook.active
+    foglio.append([f'Voti Fantacalcio Giornata {numero}'])
+    foglio.append(['Cod.', 'Ruolo', 'Nome', 'Voto', 'Gf', 'Gs', 'Rp', 'Rs', 'Rf', 'Au', 'Amm', 'Esp', 'Ass'])
+    for squadra in SQUADRE:
+        for k, ruolo in enumerate(MODULO, 1):
+            # Il primo attaccante segna, l'ultimo giocatore manca dal file
+            if k == 11:
+                continue
+            gol = 1 if k == 10 else 0
+            foglio.append([k, ruolo, f"{squadra} G{k}", 6.5, gol, 0, 0, 0, 0, 0, 0, 0, 0])
+    workbook.save(percorso)
+
+
+def test_numero_giornata_da_nome():
+    """Test numero di giornata ricavato dal nome del file"""
+
+    assert numero_giornata_da_nome('Voti_Fantacalcio_Stagione_2024_25_Giornata_5.xlsx') == 5
+    assert numero_giornata_da_nome('cartella/giornata12.xlsx') == 12
+    assert numero_giornata_da_nome('g07.xls') == 7
+    assert numero_giornata_da_nome('2024_25_07.xlsx') == 7
+    assert numero_giornata_da_nome('voti.xlsx') is None
+    # "g" in mezzo a una parola non indica la giornata
+    assert numero_giornata_da_nome('Voti_big6_giornata_12.xlsx') == 12
+    assert numero_giornata_da_nome('ranking_big6_2024_25_07.xlsx') == 7
+    print("✓ Numeri di giornata riconosciuti")
+
+
+def test_elenca_file_voti():
+    """Test file di una cartella: tutte le estensioni lette da leggi_voti"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        for nome in ('g01.xlsx', 'g02.csv', 'g03.txt', 'g04.tsv', 'note.pdf', '~$g01.xlsx'):
+            open(os.path.join(cartella, nome), 'w').close()
+        trovati = [os.path.basename(f) for f in elenca_file_voti(cartella)]
+        assert trovati == ['g01.xlsx', 'g02.csv', 'g03.txt', 'g04.tsv']
+    print("✓ File di voti riconosciuti, anche .txt")
+
+
+def test_importa_stagione():
+    """Test import di più giornate da zip: voti scritti e classifica"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = DatabaseManager(os.path.join(cartella, 'stagione.db'))
+        for numero in (1, 2):
+            giornata = db.create_giornata(numero)
+            partita = db.create_partita(giornata.id, *SQUADRE)
+            for lato, squadra in zip(('casa', 'trasferta'), SQUADRE):
+                for k, ruolo in enumerate(MODULO, 1):
+                    db.add_formazione(partita.id, lato, f"{squadra} G{k}", ruolo, k)
+
+        file_voti = os.path.join(cartella, 'file')
+        os.makedirs(file_voti)
+        for numero in (1, 2, 3):
+            _salva_voti(os.path.join(file_voti, f'Voti_Giornata_{numero:02d}.xlsx'), numero)
+        _salva_voti(os.path.join(file_voti, 'senza_numero.xlsx'), 0)
+
+        archivio = os.path.join(cartella, 'stagione.zip')
+        with zipfile.ZipFile(archivio, 'w') as zip_voti:
+            for nome in os.listdir(file_voti):
+                zip_voti.write(os.path.join(file_voti, nome), nome)
+
+        print("Test 1: Import da zip con più processi")
+        esito = importa_stagione(db, archivio, num_processi=2)
+        assert sorted(esito['giornate']) == [1, 2]
+        assert esito['voti_scritti'] == 2 * 2 * 11
+        for giornata in esito['giornate'].values():
+            assert giornata['aggiornati'] == 20
+            assert sorted(giornata['non_trovati']) == ['Squadra A G11', 'Squadra B G11']
+        # File senza numero e giornata senza formazioni segnalati
+        assert len(esito['errori']) == 2
+        print(f"✓ {esito['voti_scritti']} voti scritti, errori: {len(esito['errori'])}")
+
+        print("\nTest 2: Voti nel database")
+        voti = {
+            nome: (voto_base, bonus, note)
+            for nome, voto_base, bonus, note in db.session.query(
+                Formazione.giocatore, Voto.voto_base, Voto.bonus_malus_totale, Voto.note
+            ).join(Voto, Voto.formazione_id == Formazione.id)
+        }
+        assert voti['Squadra A G10'] == (6.5, 3.0, '')
+        assert voti['Squadra A G11'] == (6.0, 0.0, 'SV')
+        print("✓ Voti, bonus e SV scritti")
+
+        print("\nTest 3: Classifica ricostruita")
+        classifica = db.get_classifica()
+        assert [r.giocate for r in classifica] == [2, 2]
+        print("✓ Partite conteggiate in classifica")
+
+        print("\nTest 4: Le modifiche manuali non vengono sovrascritte")
+        formazione = db.session.query(Formazione).filter_by(giocatore='Squadra B G2').first()
+        db.update_voto(formazione.id, voto_base=8.0, is_manual=True)
+        importa_stagione(db, file_voti, num_processi=1)
+        assert db.session.query(Voto).filter_by(formazione_id=formazione.id).one().voto_base == 8.0
+        print("✓ Override manuale preservato")
+
+        print("\nTest 5: Formazione inserita dopo l'import riceve i voti ufficiali")
+        assert len(db.get_voti_ufficiali(3)) == 20
+        giornata = db.create_giornata(3)
+        partita = db.create_partita(giornata.id, *SQUADRE)
+        for k, ruolo in enumerate(MODULO, 1):
+            # Nomi scritti in modo diverso dal file: maiuscole e spazi mancanti
+            nome = f"SQUADRA A G{k}" if k != 2 else "SquadraA G2"
+            db.add_formazione(partita.id, 'casa', nome, ruolo, k)
+        esito = db.applica_voti_ufficiali(3)
+        assert esito['esatti'] == 9
+        assert esito['approssimati'] == [('SquadraA G2', 'Squadra A G2')]
+        assert esito['non_trovati'] == ['SQUADRA A G11']
+        voti = {
+            f.giocatore: v
+            for f, v in db.session.query(Formazione, Voto).join(Voto).filter(Formazione.partita_id == partita.id)
+        }
+        assert (voti['SQUADRA A G10'].voto_base, voti['SQUADRA A G10'].gol_fatti) == (6.5, 1)
+        assert voti['SQUADRA A G10'].bonus_malus_totale == calcola_bonus_malus_da_eventi(gol_fatti=1, ruolo='A')
+        assert voti['SQUADRA A G1'].bonus_malus_totale == calcola_bonus_malus_da_eventi(ruolo='P')
+        assert (voti['SQUADRA A G11'].voto_base, voti['SQUADRA A G11'].note) == (6.0, 'SV')
+        print(f"✓ {esito['esatti']} voti dalla join, {len(esito['approssimati'])} approssimato")
+
+        print("\nTest 6: Solo nomi esatti, gli altri da confermare")
+        partita = db.create_partita(giornata.id, *SQUADRE)
+        db.add_formazione_bulk(partita.id, 'casa', [
+            {'nome': 'Squadra A G3', 'ruolo': 'D'},
+            {'nome': 'SquadraA G2', 'ruolo': 'D'}
+        ])
+        esito = db.applica_voti_ufficiali(partita_id=partita.id, solo_esatti=True)
+        assert esito['esatti'] == 1 and esito['approssimati'] == []
+        [conferma] = esito['da_confermare']
+        assert (conferma['giocatore'], conferma['nome_trovato']) == ('SquadraA G2', 'Squadra A G2')
+        voti = db.get_voti_formazioni([conferma['formazione_id']])
+        assert (voti[conferma['formazione_id']]['voto_base'], voti[conferma['formazione_id']]['note']) == (6.0, 'SV')
+        assert db.conferma_voti_ufficiali([(conferma['formazione_id'], conferma['voto_ufficiale_id'])]) == 1
+        assert db.get_voti_formazioni([conferma['formazione_id']])[conferma['formazione_id']]['voto_base'] == 6.5
+        print("✓ Abbinamento per somiglianza applicato solo dopo conferma")
+
+        print("\nTest 7: Omonimi di ruoli diversi")
+        voti_omonimi = pd.DataFrame(
+            [
+                ['D', 'Omonimo', 5.5, '', *[0] * len(COLONNE_EVENTI)],
+                ['A', 'Omonimo', 7.0, '', *[0] * len(COLONNE_EVENTI)],
+                ['C', 'Doppio', 6.0, '', *[0] * len(COLONNE_EVENTI)],
+                ['C', 'Doppio', 6.5, '', *[0] * len(COLONNE_EVENTI)],
+                [None, 'Senza Ruolo', 6.0, '', *[0] * len(COLONNE_EVENTI)],
+                ['C', 'Senza Ruolo', 6.5, '', *[0] * len(COLONNE_EVENTI)],
+            ],
+            columns=COLONNE_VOTI
+        )
+        salvati = db.salva_voti_ufficiali(4, voti_omonimi)
+        assert salvati == {'salvati': 2, 'duplicati': ['Doppio', 'Senza Ruolo']}
+        partita = db.create_partita(db.create_giornata(4).id, *SQUADRE)
+        ids = db.add_formazione_bulk(partita.id, 'casa', [
+            {'nome': 'Omonimo', 'ruolo': 'A'},
+            {'nome': 'Omonimo', 'ruolo': 'D'},
+            {'nome': 'Omonimo', 'ruolo': 'C'}
+        ])
+        esito = db.applica_voti_ufficiali(4)
+        assert esito['esatti'] == 2 and esito['non_trovati'] == ['Omonimo']
+        voti = db.get_voti_formazioni(ids)
+        assert [(voti[i]['voto_base'], voti[i]['note']) for i in ids] == [(7.0, ''), (5.5, ''), (6.0, 'SV')]
+        print("✓ Ogni omonimo riceve il voto del proprio ruolo")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+def test_applica_voti_giornata():
+    """Test voti applicati a tutte le partite di una giornata in una transazione"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = DatabaseManager(os.path.join(cartella, 'giornata.db'))
+        giornata = db.create_giornata(1)
+        partite = [db.create_partita(giornata.id, *SQUADRE), db.create_partita(giornata.id, *reversed(SQUADRE))]
+        for partita in partite:
+            for lato, squadra in zip(('casa', 'trasferta'), (partita.squadra_casa, partita.squadra_trasferta)):
+                for k, ruolo in enumerate(MODULO, 1):
+                    db.add_formazione(partita.id, lato, f"{squadra} G{k}", ruolo, k)
+        # Solo la prima partita è già in classifica (serve almeno un voto inserito)
+        db.update_voto(db.get_formazione_partita(partite[0].id, 'casa')[0].id, voto_base=6.5)
+        assert ricalcola_partita(db, partite[0].id) is not None
+
+        file_voti = os.path.join(cartella, 'voti.xlsx')
+        _salva_voti(file_voti, 1)
+        df = leggi_excel_voti(file_voti)
+
+        print("Test 1: Un solo commit per tutta la giornata")
+        commit = []
+
+        def conta_commit(sessione):
+            commit.append(sessione)
+
+        event.listen(db.session, 'after_commit', conta_commit)
+        esito = applica_voti_giornata(db, 1, df)
+        event.remove(db.session, 'after_commit', conta_commit)
+        assert len(commit) == 1
+        assert esito['partite'] == 2
+        assert esito['voti_scritti'] == 44
+        assert esito['aggiornati'] == 40
+        assert sorted(set(esito['non_trovati'])) == ['Squadra A G11', 'Squadra B G11']
+        print(f"✓ {esito['voti_scritti']} voti in un commit")
+
+        print("\nTest 2: Ricalcolate solo le partite già in classifica")
+        assert esito['ricalcolate'] == 1
+        assert db.get_partita(partite[1].id).risultato is None
+        risultato = db.get_partita(partite[0].id).risultato
+        atteso = ricalcola_partita(db, partite[0].id)
+        assert (risultato.gol_casa, risultato.punteggio_casa) == (
+            atteso['casa']['gol'], atteso['casa']['punteggio_totale']
+        )
+        print("✓ Risultato identico al ricalcolo della singola partita")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+def test_applica_voti_giornata_solo_modifiche():
+    """Test reimport di un file corretto: scritti e ricalcolati solo i voti cambiati"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = DatabaseManager(os.path.join(cartella, 'correzioni.db'))
+        giornata = db.create_giornata(1)
+        partite = [db.create_partita(giornata.id, *SQUADRE), db.create_partita(giornata.id, 'Squadra C', 'Squadra D')]
+        for partita in partite:
+            for lato, squadra in zip(('casa', 'trasferta'), (partita.squadra_casa, partita.squadra_trasferta)):
+                for k, ruolo in enumerate(MODULO, 1):
+                    db.add_formazione(partita.id, lato, f"{squadra} G{k}", ruolo, k)
+
+        file_voti = os.path.join(cartella, 'voti.xlsx')
+        _salva_voti(file_voti, 1)
+        df = leggi_excel_voti(file_voti)
+        applica_voti_giornata(db, 1, df)
+        for partita in partite:
+            ricalcola_partita(db, partita.id)
+
+        print("Test 1: Stesso file, nessuna scrittura")
+        esito = applica_voti_giornata(db, 1, df, solo_modifiche=True)
+        assert esito['voti_scritti'] == 0 and esito['modifiche'] == [] and esito['ricalcolate'] == 0
+        print("✓ Reimport idempotente")
+
+        print("\nTest 2: File corretto, solo i voti cambiati")
+        corretto = df.copy()
+        corretto.loc[corretto['nome'] == 'Squadra A G10', 'gf'] = 2
+        corretto.loc[corretto['nome'] == 'Squadra B G3', 'voto_base'] = 5.5
+        esito = applica_voti_giornata(db, 1, corretto, solo_modifiche=True)
+        assert esito['voti_scritti'] == 2
+        assert esito['ricalcolate'] == 1
+        modifiche = {m['giocatore']: m['campi'] for m in esito['modifiche']}
+        assert modifiche['Squadra A G10'] == {'bonus_malus_totale': (3.0, 6.0), 'gol_fatti': (1, 2)}
+        assert modifiche['Squadra B G3'] == {'voto_base': (6.5, 5.5)}
+        assert {m['partita_id'] for m in esito['modifiche']} == {partite[0].id}
+        print(f"✓ {esito['voti_scritti']} voti scritti, {esito['ricalcolate']} partita ricalcolata")
+
+        print("\nTest 3: Classifica uguale al ricalcolo completo")
+        risultato = db.get_partita(partite[0].id).risultato
+        atteso = ricalcola_partita(db, partite[0].id)
+        assert (risultato.gol_casa, risultato.punteggio_casa, risultato.punteggio_trasferta) == (
+            atteso['casa']['gol'], atteso['casa']['punteggio_totale'], atteso['trasferta']['punteggio_totale']
+        )
+        print("✓ Risultato aggiornato")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST IMPORT STAGIONE")
+    print("=" * 60)
+
+    test_numero_giornata_da_nome()
+    test_elenca_file_voti()
+    test_importa_stagione()
+    test_applica_voti_giornata()
+    test_applica_voti_giornata_solo_modifiche()
+
+    print("\n" + "=" * 60)
+    print("✅ TUTTI I TEST SUPERATI!")
+    print("=" * 60)
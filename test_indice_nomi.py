@@ -0,0 +1,122 @@
+"""
+Test per l'indice dei nomi dei giocatori.
+Verifica normalizzazione, livelli di ricerca, ambiguità e tempi.
+"""
+
+import random
+import time
+
+from indice_nomi import IndiceNomi, normalizza_nome
+
+
+NOMI_EXCEL = [
+    'Martinez L.', 'Martinez J.', 'Maignan', 'Theo Hernandez', "Dell'Orco",
+    'Çalhanoğlu', 'Kvaratskhelia', 'Pellegrini Lo.', 'Pellegrini Lu.', 'Bastoni'
+]
+RUOLI_EXCEL = ['A', 'P', 'P', 'D', 'D', 'C', 'A', 'C', 'D', 'D']
+
+
+def test_ricerca_nomi():
+    """Test livelli di ricerca: esatto, compatto, iniziale, cognome, trigrammi"""
+
+    print("Test 1: Normalizzazione")
+    assert normalizza_nome(' Martínez  L. ') == 'martinez l'
+    assert normalizza_nome("Dell'Orco") == 'dell orco'
+    print("✓ Accenti e punteggiatura rimossi")
+
+    indice = IndiceNomi(NOMI_EXCEL, RUOLI_EXCEL)
+
+    print("\nTest 2: Livelli di ricerca")
+    casi = [
+        ('Calhanoglu', 'C', 'Çalhanoğlu', 'esatto'),
+        ('Dellorco', 'D', "Dell'Orco", 'compatto'),
+        ('Lautaro Martinez', 'A', 'Martinez L.', 'iniziale'),
+        ('Maignam', 'P', 'Maignan', 'trigrammi'),
+        ('Kvaratskelia', None, 'Kvaratskhelia', 'trigrammi')
+    ]
+    for nome, ruolo, atteso, metodo in casi:
+        trovato = indice.cerca(nome, ruolo)
+        assert trovato.nome_trovato == atteso, (nome, trovato)
+        assert trovato.metodo == metodo, (nome, trovato)
+        assert not trovato.ambiguo
+        assert 0 < trovato.punteggio <= 1
+    print(f"✓ {len(casi)} nomi trovati al livello atteso")
+
+    print("\nTest 3: Ambiguità e ruolo")
+    martinez = indice.cerca('Martinez')
+    assert martinez.ambiguo and len(martinez.alternative) == 1
+    # Il ruolo scioglie l'ambiguità fra omonimi
+    assert indice.cerca('Martinez', 'P').nome_trovato == 'Martinez J.'
+    assert not indice.cerca('Pellegrini', 'C').ambiguo
+    assert indice.cerca('Rossi', 'C') is None
+    assert indice.cerca(None) is None
+    print("✓ Omonimi segnalati come ambigui, risolti dal ruolo")
+
+
+def test_nessun_voto_di_altri_giocatori():
+    """Test giocatore assente dal file: nessun voto di un altro reparto o di un omonimo"""
+
+    indice = IndiceNomi(['Sandro Tonali', 'Lautaro Martinez', 'Theo Hernandez'], ['C', 'A', 'D'])
+
+    print("Test 1: Mai un candidato di un altro ruolo")
+    assert indice.cerca('Martinez', 'P') is None
+    assert indice.cerca('Alex Sandro', 'D') is None
+    assert indice.cerca('Martinez', 'A').nome_trovato == 'Lautaro Martinez'
+    print("✓ Candidati di altri reparti scartati")
+
+    print("\nTest 2: Cognome con nome proprio diverso")
+    lucas = indice.cerca('Lucas Hernandez', 'D')
+    assert lucas.nome_trovato == 'Theo Hernandez'
+    assert lucas.ambiguo and not lucas.automatica
+    # Solo il cognome: nessun conflitto, ma la corrispondenza va confermata
+    hernandez = indice.cerca('Hernandez', 'D')
+    assert not hernandez.ambiguo and not hernandez.automatica
+    assert indice.cerca('Theo Hernandez', 'D').automatica
+    print("✓ Omonimi per cognome da confermare")
+
+    print("\nTest 3: Stessa iniziale, nome proprio diverso")
+    indice = IndiceNomi(['Lautaro Martinez', 'Lorenzo Pellegrini', 'Theo Hernandez', 'Leao'])
+    for cercato, trovato in (
+        ('Luca Pellegrini', 'Lorenzo Pellegrini'),
+        ('Lucas Martinez', 'Lautaro Martinez'),
+        ('Lautaro Messi', 'Lautaro Martinez'),
+    ):
+        corrispondenza = indice.cerca(cercato)
+        assert corrispondenza.nome_trovato == trovato
+        assert corrispondenza.metodo != 'iniziale'
+        assert corrispondenza.ambiguo and not corrispondenza.automatica, corrispondenza
+    # Un'iniziale vera, da una parte o dall'altra, resta automatica
+    for cercato in ('Martinez L.', 'L Martinez'):
+        assert indice.cerca(cercato).automatica, cercato
+    assert IndiceNomi(['Martinez L.']).cerca('Lautaro Martinez').automatica
+    print("✓ Nessun voto applicato per la sola iniziale in comune")
+
+
+def test_indice_nomi_giornata():
+    """Test tempi: ~440 nomi di formazione contro ~600 righe Excel"""
+
+    rng = random.Random(1)
+    nomi = [f"Giocatore{rng.randrange(10 ** 6)} {chr(65 + rng.randrange(26))}." for _ in range(600)]
+    cercati = [nome.replace('.', '') for nome in nomi[:400]] + [f"Sconosciuto {i}" for i in range(40)]
+
+    inizio = time.perf_counter()
+    risultati = IndiceNomi(nomi).risolvi(cercati)
+    durata = time.perf_counter() - inizio
+
+    assert sum(1 for c in risultati.values() if c is not None and c.metodo == 'esatto') == 400
+    assert durata < 0.5, f"Indice troppo lento: {durata:.3f}s"
+    print(f"✓ {len(cercati)} nomi risolti in {durata * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST INDICE NOMI")
+    print("=" * 60)
+
+    test_ricerca_nomi()
+    test_nessun_voto_di_altri_giocatori()
+    test_indice_nomi_giornata()
+
+    print("\n" + "=" * 60)
+    print("✅ TUTTI I TEST SUPERATI!")
+    print("=" * 60)
@@ -0,0 +1,128 @@
+"""
+Test per il simulatore Monte Carlo della stagione.
+Verifica classifica attuale, riproducibilità e coerenza delle probabilità.
+"""
+
+import os
+import random
+import tempfile
+
+import numpy as np
+
+from db import DatabaseManager
+from simulazione import prepara_modello_stagione, simula_stagione, tabella_probabilita
+
+
+MODULO = ['P'] + ['D'] * 4 + ['C'] * 4 + ['A'] * 2
+
+
+def _crea_stagione(path, num_squadre=6, giornate=10, giocate=4, seed=3):
+    """Crea un database con un calendario e voti casuali per le prime giornate"""
+    rng = random.Random(seed)
+    db = DatabaseManager(path)
+    squadre = [f"Squadra {i}" for i in range(num_squadre)]
+
+    for numero in range(1, giornate + 1):
+        giornata = db.create_giornata(numero)
+        ordine = squadre[:]
+        rng.shuffle(ordine)
+        for i in range(0, num_squadre, 2):
+            partita = db.create_partita(giornata.id, ordine[i], ordine[i + 1])
+            if numero > giocate:
+                continue
+            for lato, squadra in (('casa', ordine[i]), ('trasferta', ordine[i + 1])):
+                for k, ruolo in enumerate(MODULO, 1):
+                    formazione = db.add_formazione(partita.id, lato, f"{squadra} G{k}", ruolo, k)
+                    db.update_voto(
+                        formazione.id,
+                        voto_base=rng.choice([5.0, 5.5, 6.0, 6.5, 7.0, 7.5]),
+                        bonus_malus=rng.choice([0.0, 0.0, 0.0, 3.0, -0.5, 1.0])
+                    )
+    return db
+
+
+def test_simulazione_stagione():
+    """Test simulazione: modello, riproducibilità e somma delle probabilità"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = _crea_stagione(os.path.join(cartella, 'stagione.db'))
+
+        print("Test 1: Modello della stagione")
+        modello, info = prepara_modello_stagione(db)
+        assert info['dalla_giornata'] == 5
+        assert info['partite_giocate'] == 12
+        assert info['partite_da_giocare'] == 18
+        # 4 giornate da 3 partite: 12 vittorie/pareggi distribuiti
+        assert modello.punti.sum() <= 12 * 3
+        print(f"✓ {info['partite_giocate']} giocate, {info['partite_da_giocare']} da simulare")
+
+        print("\nTest 2: Stesso seed, stesso risultato (sequenziale e parallelo)")
+        sequenziale = simula_stagione(modello, num_simulazioni=2500, seed=42, num_processi=1)
+        parallelo = simula_stagione(modello, num_simulazioni=2500, seed=42, num_processi=2)
+        assert np.array_equal(sequenziale['probabilita'], parallelo['probabilita'])
+        assert np.array_equal(sequenziale['punti_medi'], parallelo['punti_medi'])
+        print("✓ Risultati identici")
+
+        print("\nTest 3: Probabilità coerenti")
+        probabilita = sequenziale['probabilita']
+        assert np.allclose(probabilita.sum(axis=0), 1.0)
+        assert np.allclose(probabilita.sum(axis=1), 1.0)
+        # Le giornate rimanenti danno almeno i punti già conquistati
+        assert np.all(sequenziale['punti_medi'] >= modello.punti)
+        print("✓ Righe e colonne sommano a 1")
+
+        print("\nTest 4: Tabella probabilità")
+        df = tabella_probabilita(sequenziale, retrocessioni=2)
+        assert len(df) == 6
+        assert 'Retrocessione' in df.columns
+        assert np.isclose(df['Retrocessione'].sum(), 2.0)
+        print("✓ Tabella generata")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+def test_partite_senza_voti_e_ruolo_sconosciuto():
+    """Test storico senza i 6 d'ufficio delle partite senza voti, ruoli sconosciuti ammessi"""
+
+    with tempfile.TemporaryDirectory() as cartella:
+        db = DatabaseManager(os.path.join(cartella, 'senza_voti.db'))
+        for numero in (1, 2, 3):
+            partita = db.create_partita(db.create_giornata(numero).id, 'Squadra A', 'Squadra B')
+            for lato, squadra in (('casa', 'Squadra A'), ('trasferta', 'Squadra B')):
+                for k, ruolo in enumerate(MODULO, 1):
+                    # Un ruolo non riconosciuto nella formazione da simulare
+                    if numero == 3 and k == 11:
+                        ruolo = 'X'
+                    formazione = db.add_formazione(partita.id, lato, f"{squadra} G{k}", ruolo, k)
+                    if numero == 2:
+                        db.update_voto(formazione.id, voto_base=7.0, bonus_malus=1.0)
+
+        print("Test 1: Partita senza voti esclusa da classifica e storico")
+        modello, info = prepara_modello_stagione(db, dalla_giornata=3)
+        assert info['partite_giocate'] == 1
+        assert info['partite_senza_voti'] == ['Squadra A vs Squadra B (giornata 1)']
+        assert modello.punti.sum() in (2, 3)
+        assert np.all(modello.pool_voti == 7.0) and np.all(modello.pool_bonus == 1.0)
+        print("✓ Storico composto solo da voti inseriti")
+
+        print("\nTest 2: Ruolo sconosciuto")
+        risultato = simula_stagione(modello, num_simulazioni=100, seed=1, num_processi=1)
+        assert np.allclose(risultato['probabilita'].sum(axis=0), 1.0)
+        print("✓ Simulazione completata")
+
+        db.session.close()
+        db.engine.dispose()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TEST SIMULATORE STAGIONE")
+    print("=" * 60)
+
+    test_simulazione_stagione()
+    test_partite_senza_voti_e_ruolo_sconosciuto()
+
+    print("\n" + "=" * 60)
+    print("✅ TUTTI I TEST SUPERATI!")
+    print("=" * 60)